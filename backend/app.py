@@ -1,47 +1,70 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from pymongo import MongoClient
 from bson import ObjectId
-import os
 from dotenv import load_dotenv
-import re
 from datetime import datetime
+from itertools import chain
 import logging
 
+from config import Config
+from logger import init_request_logging, setup_logging
+from app.models.category_stats import CategoryStats
+from app.models.product import Product
+from app.models.subscriber_growth import SubscriberGrowth
+from app.utils.bootstrap import QueryPlanError, bootstrap_database
+from app.utils.health import DatabaseHeartbeat, init_health_checks
+from app.utils.http_metrics import init_request_metrics
+from app.utils.mongo import ForkSafeClient
+from app.utils.pagination import decode_cursor, parse_fields, parse_limit, stream_page
+from app.utils.serialization import FastJSONProvider
+from validators import SUBSCRIBER_SCHEMA, describe
+
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Configure CORS for production
 CORS(app)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Request latency histograms, Server-Timing headers and /api/metrics
+init_request_metrics(app, Config.METRICS_DIR, Config.METRICS_FLUSH_SECONDS)
+
+# Setup logging: JSON records written off the request thread, tagged with request ids
+setup_logging(vars(Config))
+init_request_logging(app)
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
+# MongoDB connection, opened on first use in each process so the module can
+# be preloaded by a gunicorn master before it forks workers
 try:
-    client = MongoClient(os.getenv('MONGO_URI'))
-    db = client.get_database()
-    logger.info("✅ Connected to MongoDB successfully!")
+    mongo = ForkSafeClient(vars(Config))
+    db = mongo.database
+    logger.info("✅ MongoDB client configured (connects on first use)")
 except Exception as e:
-    logger.error(f"❌ MongoDB connection failed: {e}")
+    logger.error("❌ MongoDB connection failed: %s", e)
 
-# Email validation function
-def is_valid_email(email):
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+# Ensure collections, indexes and index-backed query plans once at startup
+if Config.BOOTSTRAP_DB:
+    try:
+        bootstrap_database(db, plan_check=Config.QUERY_PLAN_CHECK)
+    except QueryPlanError:
+        raise
+    except Exception as e:
+        logger.error("❌ Database bootstrap failed: %s", e)
+
+# Liveness and readiness probes answered from a cached Mongo heartbeat
+heartbeat = init_health_checks(app, DatabaseHeartbeat(db, Config.HEALTH_HEARTBEAT_SECONDS))
 
 # API Routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    try:
-        # Test database connection
-        db.command('ping')
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"disconnected: {str(e)}"
-    
+    # Last heartbeat result; probes never wait on a Mongo round trip
+    _, status = heartbeat.status()
+    db_status = status['database']
+    if 'error' in status:
+        db_status = f"{db_status}: {status['error']}"
+
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
@@ -51,64 +74,58 @@ def health_check():
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            Config.PRODUCTS_PAGE_SIZE, Config.PRODUCTS_MAX_PAGE_SIZE)
+        after = decode_cursor(request.args.get('next'))
+        projection = parse_fields(request.args.get('fields'), Product.FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         category = request.args.get('category')
         featured = request.args.get('featured')
-        
-        query = {}
-        if category and category != 'all':
-            query['category'] = category
-        if featured:
-            query['featured'] = featured.lower() == 'true'
-        
-        # Check if products collection exists
-        if 'products' not in db.list_collection_names():
-            return jsonify({"products": [], "count": 0, "message": "No products found"})
-        
-        products = list(db.products.find(query))
-        
-        # Convert ObjectId to string for JSON serialization
-        for product in products:
-            product['_id'] = str(product['_id'])
-        
-        return jsonify({
-            "products": products,
-            "count": len(products)
-        })
+
+        if category == 'all':
+            category = None
+        featured = featured.lower() == 'true' if featured else None
+
+        # Stream one keyset page; the extra document signals a next page
+        cursor = Product.find_page(db, category=category, featured=featured,
+                                   after=after, limit=limit + 1, projection=projection)
+        chunks = stream_page(cursor, limit)
+        first = next(chunks)
+        return Response(stream_with_context(chain([first], chunks)),
+                        mimetype='application/json')
     except Exception as e:
-        logger.error(f"Error fetching products: {str(e)}")
+        logger.error("Error fetching products: %s", e)
         return jsonify({"error": "Failed to fetch products"}), 500
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
     try:
-        # Check if products collection exists
-        if 'products' not in db.list_collection_names():
-            return jsonify({"categories": []})
-        
-        categories = db.products.distinct('category')
-        return jsonify({"categories": categories or []})
+        docs = CategoryStats.get_all(db)
+        if not docs:
+            # Bootstrap was off or failed, so the summary may never have been
+            # built; build it from products now rather than list no categories
+            CategoryStats.ensure(db)
+            docs = CategoryStats.get_all(db)
+        facets = CategoryStats.to_facets(docs)
+        return jsonify({
+            "categories": [facet['category'] for facet in facets],
+            "facets": facets
+        })
     except Exception as e:
-        logger.error(f"Error fetching categories: {str(e)}")
+        logger.error("Error fetching categories: %s", e)
         return jsonify({"error": "Failed to fetch categories"}), 500
 
 @app.route('/api/subscribe', methods=['POST'])
 def subscribe_newsletter():
     try:
-        data = request.get_json()
-        
-        if not data or 'email' not in data:
-            return jsonify({"error": "Email is required"}), 400
-        
-        email = data['email'].strip().lower()
-        
-        # Validate email format
-        if not is_valid_email(email):
-            return jsonify({"error": "Invalid email format"}), 400
-        
-        # Ensure subscribers collection exists
-        if 'subscribers' not in db.list_collection_names():
-            db.create_collection('subscribers')
+        subscriber, errors = SUBSCRIBER_SCHEMA(request.get_json(silent=True))
+        if errors:
+            return jsonify({"error": describe(errors), "errors": errors}), 400
+        email = subscriber['email']
         
         # Check if email already exists
         existing_subscriber = db.subscribers.find_one({"email": email})
@@ -116,16 +133,18 @@ def subscribe_newsletter():
             return jsonify({"error": "Email already subscribed"}), 409
         
         # Add to database
+        now = datetime.utcnow()
         db.subscribers.insert_one({
             "email": email,
-            "subscribed_at": datetime.utcnow(),
+            "subscribed_at": now,
             "active": True
         })
+        SubscriberGrowth.record(db, [("subscribed", now)])
         
         return jsonify({"message": "Successfully subscribed to newsletter!"})
         
     except Exception as e:
-        logger.error(f"Error in newsletter subscription: {str(e)}")
+        logger.error("Error in newsletter subscription: %s", e)
         return jsonify({"error": "Failed to subscribe"}), 500
 
 # Error handlers
@@ -1,26 +1,109 @@
 from flask import Flask
 from flask_cors import CORS
-from pymongo import MongoClient
 from config import config
+from app.utils.mongo import ForkSafeClient, mongo_metrics
+from app.utils.serialization import FastJSONProvider
 
 def create_app(config_name='development'):
     """Application factory"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.json = FastJSONProvider(app)
+
+    # JSON logs written by a background thread (logger.py imports this package)
+    from logger import init_request_logging, setup_logging
+    setup_logging(app.config)
     
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
-    # Initialize MongoDB
+    # Initialize MongoDB; each process opens its own client on first use,
+    # so the app can be preloaded in a gunicorn master (see gunicorn.conf.py)
     try:
-        client = MongoClient(app.config['MONGO_URI'])
-        db = client.get_database()
+        mongo = ForkSafeClient(app.config)
+        db = mongo.database
+        app.config['mongo'] = mongo
         app.config['db'] = db
-        print("✅ Connected to MongoDB successfully!")
+        print("✅ MongoDB client configured (connects on first use)")
     except Exception as e:
         print(f"❌ MongoDB connection error: {e}")
         raise
+
+    # Ensure collections, indexes and index-backed query plans once at startup
+    if app.config['BOOTSTRAP_DB']:
+        from app.utils.bootstrap import bootstrap_database
+        bootstrap_database(db, plan_check=app.config['QUERY_PLAN_CHECK'])
     
+    # Optionally batch concurrent subscribe requests into bulk writes
+    if app.config['SUBSCRIBE_COALESCE']:
+        from app.utils.coalesce import SubscribeCoalescer
+        app.config['subscribe_coalescer'] = SubscribeCoalescer(
+            db,
+            max_batch=app.config['SUBSCRIBE_COALESCE_MAX_BATCH'],
+            max_delay=app.config['SUBSCRIBE_COALESCE_MAX_DELAY_MS'] / 1000
+        )
+
+    # Size the catalog response cache
+    from app.utils.cache import catalog_cache
+    catalog_cache.configure(app.config['CATALOG_CACHE_SIZE'], app.config['CATALOG_CACHE_TTL'])
+    if app.config['SHARED_CACHE_SOCKET']:
+        from app.utils.shared_cache import SharedCacheClient, ensure_server
+        if app.config['SHARED_CACHE_EMBED']:
+            ensure_server(app.config['SHARED_CACHE_SOCKET'], app.config['SHARED_CACHE_MAX_BYTES'])
+        catalog_cache.shared = SharedCacheClient(
+            app.config['SHARED_CACHE_SOCKET'],
+            lease_seconds=app.config['SHARED_CACHE_LEASE_MS'] / 1000,
+            embed_max_bytes=app.config['SHARED_CACHE_MAX_BYTES'] if app.config['SHARED_CACHE_EMBED'] else None
+        )
+
+    # Build the listing snapshots from the catalog as it is at startup
+    from app.utils.snapshots import catalog_snapshots
+    catalog_snapshots.configure(app.config['SNAPSHOT_DIR'], app.config['PRODUCTS_PAGE_SIZE'],
+                                catalog_snapshots.namespace(db, app.config['MONGO_URI']),
+                                app.config['SNAPSHOT_MAX_AGE_SECONDS'])
+    if catalog_snapshots.enabled:
+        catalog_snapshots.refresh(db)
+
+    # Type-ahead index: built once here (a preloading master shares it with
+    # every worker), then kept current by a background thread
+    from app.utils.search_index import search_index
+    search_index.refresh_interval = app.config['TYPEAHEAD_REFRESH_SECONDS']
+    search_index.rebuild_interval = app.config['TYPEAHEAD_REBUILD_SECONDS']
+    if app.config['TYPEAHEAD_INDEX']:
+        try:
+            search_index.sync(db, force=True)
+        except Exception:
+            # The first /api/products/suggest request builds it instead
+            app.logger.exception("Type-ahead index build failed")
+
+    # Liveness and readiness probes answered from a cached Mongo heartbeat
+    from app.utils.health import DatabaseHeartbeat, init_health_checks
+    init_health_checks(app, DatabaseHeartbeat(db, app.config['HEALTH_HEARTBEAT_SECONDS']))
+
+    # Request ids for log records, echoed as X-Request-ID
+    init_request_logging(app)
+
+    # Request latency histograms, Server-Timing headers and /api/metrics
+    from app.utils.http_metrics import init_request_metrics
+    init_request_metrics(app, app.config['METRICS_DIR'], app.config['METRICS_FLUSH_SECONDS'])
+
+    # Shed load by route priority before it queues up behind slow Mongo calls
+    if app.config['ADMISSION_CONTROL']:
+        from app.utils.admission import AdmissionController, init_admission_control
+        # Admitting more than the worker can serve at once would leave the
+        # excess queued inside gunicorn, where the limiter never sees it
+        max_limit = app.config['ADMISSION_MAX_LIMIT']
+        if app.config['ADMISSION_WORKER_CONCURRENCY']:
+            max_limit = min(max_limit, app.config['ADMISSION_WORKER_CONCURRENCY'])
+        init_admission_control(app, AdmissionController(
+            initial_limit=min(app.config['ADMISSION_INITIAL_LIMIT'], max_limit),
+            min_limit=min(app.config['ADMISSION_MIN_LIMIT'], max_limit),
+            max_limit=max_limit,
+            max_queue=app.config['ADMISSION_MAX_QUEUE'],
+            max_wait=app.config['ADMISSION_MAX_WAIT_MS'] / 1000,
+            tolerance=app.config['ADMISSION_LATENCY_TOLERANCE']
+        ))
+
     # Register blueprints
     from app.routes.subscribers import subscribers_bp
     from app.routes.products import products_bp
@@ -32,5 +115,18 @@ def create_app(config_name='development'):
     @app.route('/api/health', methods=['GET'])
     def health_check():
         return {'status': 'healthy', 'message': 'API is running'}, 200
-    
+
+    # Catalog cache counters for sizing
+    @app.route('/api/cache/stats', methods=['GET'])
+    def cache_stats():
+        stats = {'catalog': catalog_cache.stats()}
+        if catalog_cache.shared is not None:
+            stats['shared'] = catalog_cache.shared.stats()
+        return stats, 200
+
+    # MongoDB command latency, pool usage and recent slow queries
+    @app.route('/api/db/stats', methods=['GET'])
+    def db_stats():
+        return mongo_metrics.snapshot(), 200
+
     return app
\ No newline at end of file
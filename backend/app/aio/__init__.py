@@ -0,0 +1,92 @@
+import asyncio
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from quart import Quart, Response, g, request
+from quart_cors import cors
+from config import config
+from app.utils.health import DatabaseHeartbeat, init_health_checks
+from app.utils.http_metrics import MetricsExporter, merge_states, render_prometheus, request_metrics
+from app.utils.metrics import request_timing
+from app.utils.mongo import create_mongo_client, mongo_metrics
+from app.utils.serialization import FastJSONProvider
+
+def create_async_app(config_name='development'):
+    """ASGI application factory serving the /api contract on Motor"""
+    app = Quart(__name__)
+    app.config.from_object(config[config_name])
+    app.json = FastJSONProvider(app)
+    app = cors(app, allow_origin='*')
+    heartbeat = DatabaseHeartbeat(None, app.config['HEALTH_HEARTBEAT_SECONDS'])
+
+    # Motor binds to the running event loop, so connect once serving starts
+    @app.before_serving
+    async def connect_db():
+        client = create_mongo_client(app.config, AsyncIOMotorClient)
+        app.config['mongo_client'] = client
+        app.config['db'] = client.get_database()
+        # The synchronous client Motor wraps, for model code run in worker threads
+        app.config['sync_db'] = client.delegate.get_database()
+        heartbeat.db = app.config['sync_db']
+        print("✅ Connected to MongoDB (async) successfully!")
+        if app.config['BOOTSTRAP_DB']:
+            from app.utils.bootstrap import bootstrap_database
+            await asyncio.to_thread(bootstrap_database, app.config['sync_db'],
+                                    plan_check=app.config['QUERY_PLAN_CHECK'])
+
+    @app.after_serving
+    async def close_db():
+        app.config['mongo_client'].close()
+
+    from app.aio.routes import api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    # Health check route
+    @app.route('/api/health', methods=['GET'])
+    async def health_check():
+        return {'status': 'healthy', 'message': 'API is running'}, 200
+
+    # MongoDB command latency, pool usage and recent slow queries
+    @app.route('/api/db/stats', methods=['GET'])
+    async def db_stats():
+        return mongo_metrics.snapshot(), 200
+
+    # Liveness and readiness probes answered from a cached Mongo heartbeat
+    init_health_checks(app, heartbeat)
+    init_request_metrics(app, app.config['METRICS_DIR'], app.config['METRICS_FLUSH_SECONDS'])
+
+    return app
+
+def init_request_metrics(app, metrics_dir=None, flush_interval=1.0):
+    """The WSGI app's request timing and /api/metrics, on Quart's request hooks"""
+    exporter = MetricsExporter(metrics_dir, flush_interval) if metrics_dir else None
+
+    @app.before_request
+    async def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_timing = request_timing.set({'db': 0.0, 'serialize': 0.0})
+        request_metrics.started()
+        if exporter:
+            exporter.ensure_started()
+
+    @app.after_request
+    async def record_request_timing(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        total_ms = (time.perf_counter() - started) * 1000
+        response.headers['Server-Timing'] = f"total;dur={total_ms:.2f}"
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.observe(route, request.method, response.status_code, total_ms)
+        return response
+
+    @app.teardown_request
+    async def finish_request_timer(exc):
+        token = g.pop('metrics_timing', None)
+        if token is not None:
+            request_timing.reset(token)
+            request_metrics.finished()
+
+    @app.route('/api/metrics', methods=['GET'])
+    async def metrics():
+        merged = exporter.collect() if exporter else merge_states([(request_metrics.state(), True)])
+        return Response(render_prometheus(merged), mimetype='text/plain; version=0.0.4')
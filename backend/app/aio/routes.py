@@ -0,0 +1,357 @@
+"""The /api routes on Motor.
+
+Reads go through Motor. Writes that keep derived state current (product
+creation, feed imports, bulk subscribe) and the subscriber export reuse the
+WSGI app's synchronous code on the client Motor wraps, in worker threads,
+so category_stats, subscriber_growth and the search index stay in step.
+WSGI-only features are left out: the catalog cache and listing snapshots
+(these routes always read the database, so there is no /api/cache/stats),
+admission control (/api/admission/stats) and subscribe coalescing.
+"""
+import asyncio
+import io
+from bson import ObjectId
+from quart import Blueprint, Response, current_app, jsonify, request
+from app.models.category_stats import CategoryStats
+from app.models.product import Product
+from app.models.subscriber import Subscriber
+from app.models.subscriber_growth import SubscriberGrowth
+from app.routes.products import (
+    batch_page, import_feed, parse_batch_ids, parse_listing_args, parse_search_args, search_page
+)
+from app.routes.subscribers import EXPORT_FIELDS, growth_page, parse_growth_args, subscribe_feed
+from app.utils.export import EXPORT_FORMATS
+from app.utils.ingest import INGEST_FORMATS, detect_format
+from app.utils.pagination import build_page, parse_limit
+from app.utils.search_index import search_index
+from validators import PRODUCT_SCHEMA, SUBSCRIBER_SCHEMA, describe
+
+api_bp = Blueprint('api', __name__)
+
+def in_thread(function, *args, **kwargs):
+    """Run synchronous model code on the wrapped client without blocking the loop"""
+    return asyncio.to_thread(function, current_app.config['sync_db'], *args, **kwargs)
+
+async def iterate_in_thread(chunks):
+    """Drain a blocking generator one chunk per worker-thread hop"""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
+class BodyReader(io.RawIOBase):
+    """Blocking file over a request body's chunks, for model code in worker threads.
+
+    Each read hops to the event loop for the next chunk as the body
+    arrives, the way the WSGI routes read request.stream. Never read it
+    on the loop thread itself.
+    """
+
+    def __init__(self, body, loop):
+        self._body = body
+        self._loop = loop
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    async def _next_chunk(self):
+        try:
+            return await self._body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                return 0
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+async def upload_lines():
+    """(text lines, format) of an upload sent as the body or a multipart 'file' field.
+
+    A raw body is read incrementally by the worker thread consuming the
+    lines; multipart uploads are spooled to disk by the form parser.
+    """
+    upload = (await request.files).get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = io.BufferedReader(BodyReader(request.body, asyncio.get_running_loop()))
+        fmt = request.args.get('format') or detect_format(mimetype=request.mimetype)
+    return io.TextIOWrapper(stream, encoding='utf-8', newline=''), fmt
+
+async def category_stats(db):
+    """CategoryStats.get_all through Motor, building the summary if it never was"""
+    docs = await db.category_stats.find({'count': {'$gt': 0}}).sort('_id', 1).to_list(None)
+    if not docs:
+        await in_thread(CategoryStats.ensure)
+        docs = await db.category_stats.find({'count': {'$gt': 0}}).sort('_id', 1).to_list(None)
+    return docs
+
+async def fetch_page(db, limit, query):
+    """Fetch one listing page through Motor; same body as the WSGI route"""
+    cursor = Product.find_page(db, limit=limit + 1, **query)
+    docs = await cursor.to_list(limit + 1)
+    return build_page(docs, limit, sort=query['sort'], sort_field=Product.SORTS[query['sort']][0])
+
+@api_bp.route('/products', methods=['GET'])
+async def get_products():
+    """Get one page of products with optional filters and sorting"""
+    try:
+        limit, query = parse_listing_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        return jsonify(await fetch_page(current_app.config['db'], limit, query)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/products/search', methods=['GET'])
+async def search_products():
+    """Full-text product search ranked by relevance"""
+    try:
+        page, limit, query = parse_search_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        cursor = Product.search(current_app.config['db'], **query)
+        products = await cursor.to_list(query['limit'])
+        return jsonify(search_page(products, page, limit)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/products/suggest', methods=['GET'])
+async def suggest_products():
+    """Type-ahead product suggestions from the in-memory prefix index"""
+    if not current_app.config['TYPEAHEAD_INDEX']:
+        return jsonify({'error': 'Type-ahead is disabled'}), 404
+
+    try:
+        limit = parse_limit(request.args.get('limit'), current_app.config['TYPEAHEAD_LIMIT'], 50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        await in_thread(search_index.sync)
+        suggestions = search_index.suggest(
+            request.args.get('q', ''), limit=limit, category=request.args.get('category')
+        )
+        return jsonify({'suggestions': suggestions, 'count': len(suggestions)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/products/batch', methods=['GET', 'POST'])
+async def get_products_batch():
+    """Get several products by ID with one query, in request order"""
+    if request.method == 'POST':
+        body = await request.get_json(silent=True)
+        ids = body.get('ids') if isinstance(body, dict) else None
+    else:
+        ids = [product_id.strip() for product_id in request.args.get('ids', '').split(',') if product_id.strip()]
+
+    try:
+        object_ids, errors = parse_batch_ids(ids, current_app.config['PRODUCTS_BATCH_MAX_IDS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        valid = list(dict.fromkeys(object_id for object_id in object_ids if object_id is not None))
+        docs = await current_app.config['db'].products.find({'_id': {'$in': valid}}).to_list(None) if valid else []
+        return jsonify(batch_page(ids, object_ids, errors, {doc['_id']: doc for doc in docs})), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/products/<product_id>', methods=['GET'])
+async def get_product(product_id):
+    """Get single product by ID"""
+    object_id = Product.parse_id(product_id)
+    if object_id is None:
+        return jsonify({'error': 'Invalid product id'}), 400
+
+    try:
+        product = await current_app.config['db'].products.find_one({'_id': object_id})
+        if product:
+            return jsonify({'product': product}), 200
+        return jsonify({'error': 'Product not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/categories', methods=['GET'])
+async def get_categories():
+    """Get all product categories"""
+    try:
+        facets = CategoryStats.to_facets(await category_stats(current_app.config['db']))
+        return jsonify({
+            'categories': [facet['category'] for facet in facets],
+            'facets': facets
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/products', methods=['POST'])
+async def create_product():
+    """Create a new product (admin endpoint)"""
+    try:
+        product, errors = PRODUCT_SCHEMA(await request.get_json(silent=True))
+        if errors:
+            return jsonify({'error': describe(errors), 'errors': errors}), 400
+
+        product_id = await in_thread(Product.create, product)
+        return jsonify({
+            'message': 'Product created successfully',
+            'product_id': product_id
+        }), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/products/import', methods=['POST'])
+async def import_products():
+    """Upsert an NDJSON or CSV product feed by SKU (admin endpoint)"""
+    lines, fmt = await upload_lines()
+    if fmt not in INGEST_FORMATS:
+        return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+    details = request.args.get('details', 'false').lower() == 'true'
+
+    try:
+        body = await in_thread(import_feed, lines, fmt, current_app.config['PRODUCT_IMPORT_BATCH_SIZE'], details)
+        return jsonify(body), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/catalog', methods=['GET'])
+async def get_catalog():
+    """First product page and the category list, fetched concurrently"""
+    try:
+        limit, query = parse_listing_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        db = current_app.config['db']
+        page, categories = await asyncio.gather(
+            fetch_page(db, limit, query),
+            category_stats(db)
+        )
+        page['categories'] = [doc['_id'] for doc in categories]
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/subscribe', methods=['POST'])
+async def subscribe():
+    """Subscribe to newsletter"""
+    try:
+        subscriber, errors = SUBSCRIBER_SCHEMA(await request.get_json(silent=True))
+        if errors:
+            return jsonify({'error': describe(errors), 'errors': errors}), 400
+
+        status, subscriber_id = await Subscriber.subscribe_async(current_app.config['db'], subscriber['email'])
+        if status == 'duplicate':
+            return jsonify({'message': 'Email already subscribed'}), 200
+        if status == 'reactivated':
+            return jsonify({'message': 'Subscription reactivated!'}), 200
+
+        return jsonify({
+            'message': 'Successfully subscribed to newsletter!',
+            'subscriber_id': subscriber_id
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/subscribers', methods=['GET'])
+async def get_subscribers():
+    """Get all subscribers (admin endpoint); ?format=ndjson or csv streams the export"""
+    export_format = request.args.get('format')
+    if export_format:
+        return export_subscribers(export_format)
+
+    try:
+        subscribers = await current_app.config['db'].subscribers.find({'is_active': True}).to_list(None)
+        return jsonify({'subscribers': subscribers, 'count': len(subscribers)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def export_subscribers(export_format):
+    """Stream active subscribers as NDJSON or CSV"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format: {export_format}"}), 400
+
+    after = request.args.get('after')
+    if after:
+        if not ObjectId.is_valid(after):
+            return jsonify({'error': 'after must be a subscriber _id'}), 400
+        after = ObjectId(after)
+
+    cursor = Subscriber.iter_active(
+        current_app.config['sync_db'], after=after,
+        batch_size=current_app.config['SUBSCRIBER_EXPORT_BATCH_SIZE']
+    )
+    write_rows, mimetype = EXPORT_FORMATS[export_format]
+    response = Response(iterate_in_thread(write_rows(cursor, EXPORT_FIELDS)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=subscribers.{export_format}'
+    return response, 200
+
+@api_bp.route('/subscribers/bulk', methods=['POST'])
+async def bulk_subscribe():
+    """Bulk-subscribe an NDJSON or CSV upload (admin endpoint)"""
+    lines, fmt = await upload_lines()
+    if fmt not in INGEST_FORMATS:
+        return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+    details = request.args.get('details', 'true').lower() == 'true'
+
+    try:
+        body = await in_thread(subscribe_feed, lines, fmt,
+                               current_app.config['SUBSCRIBER_INGEST_BATCH_SIZE'], details)
+        return jsonify(body), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/subscribers/growth', methods=['GET'])
+async def subscriber_growth():
+    """Subscriber growth per hour, day or week from the pre-aggregated buckets"""
+    try:
+        unit, start, end = parse_growth_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        start = SubscriberGrowth.bucket_start(start, unit)
+        docs = await current_app.config['db'].subscriber_growth.find(
+            *SubscriberGrowth.query(unit, start, end)
+        ).to_list(None)
+        return jsonify(growth_page(unit, start, end, SubscriberGrowth.fill(docs, unit, start, end))), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/unsubscribe', methods=['POST'])
+async def unsubscribe():
+    """Unsubscribe from newsletter"""
+    try:
+        subscriber, errors = SUBSCRIBER_SCHEMA(await request.get_json(silent=True))
+        if errors:
+            return jsonify({'error': describe(errors), 'errors': errors}), 400
+
+        if await Subscriber.unsubscribe_async(current_app.config['db'], subscriber['email']):
+            return jsonify({'message': 'Successfully unsubscribed'}), 200
+        return jsonify({'error': 'Email not found'}), 404
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,156 @@
+import logging
+from collections import defaultdict
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Counters kept per category; a product contributes 0 or 1 to each
+COUNTERS = ('count', 'featured_count', 'in_stock_count')
+
+
+class CategoryStats:
+    """Materialized per-category summary kept in the category_stats collection.
+
+    One document per category, keyed by name: product count, featured and
+    in-stock counts and the price range. Writes keep it current with
+    $inc/$min/$max; a removed price can only narrow the range, so that
+    category's min/max is re-read from the (category, price) index.
+    rebuild() corrects every category from products.
+    """
+
+    @staticmethod
+    def _counters(product, sign=1):
+        return {
+            'count': sign,
+            'featured_count': sign if product.get('featured') else 0,
+            'in_stock_count': sign if (product.get('stock') or 0) > 0 else 0,
+        }
+
+    @staticmethod
+    def record_changes(db, changes):
+        """Apply (before, after) product pairs from a write.
+
+        before is None for an insert and after is None for a delete. Pairs
+        whose counted fields did not change cost nothing; the rest are
+        folded into one update per category and sent as one bulk_write.
+        """
+        incs = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        added = defaultdict(list)
+        narrowed = set()
+        for before, after in changes:
+            if before is not None and after is not None and all(
+                    before.get(f) == after.get(f) for f in ('category', 'price', 'featured', 'stock')):
+                continue
+            if before is not None:
+                for name, value in CategoryStats._counters(before, -1).items():
+                    incs[before['category']][name] += value
+                if before.get('price') is not None:
+                    narrowed.add(before['category'])
+            if after is not None:
+                for name, value in CategoryStats._counters(after).items():
+                    incs[after['category']][name] += value
+                if after.get('price') is not None:
+                    added[after['category']].append(after['price'])
+
+        ops = []
+        for category, inc in incs.items():
+            update = {'$inc': inc}
+            if added[category]:
+                update['$min'] = {'min_price': min(added[category])}
+                update['$max'] = {'max_price': max(added[category])}
+            ops.append(UpdateOne({'_id': category}, update, upsert=True))
+        if ops:
+            db.category_stats.bulk_write(ops, ordered=False)
+        for category in narrowed:
+            CategoryStats.refresh_price_range(db, category)
+
+    @staticmethod
+    def refresh_price_range(db, category):
+        """Re-read a category's price range from the (category, price) index.
+
+        A category with no priced products left has its bounds unset rather
+        than set to null: null sorts below every number, so a stored null
+        would swallow the $min of the next insert.
+        """
+        ends = {}
+        for field, direction in (('min_price', ASCENDING), ('max_price', DESCENDING)):
+            doc = db.products.find_one({'category': category, 'price': {'$ne': None}}, {'price': 1},
+                                       sort=[('price', direction)])
+            if doc:
+                ends[field] = doc['price']
+        if ends:
+            update = {'$set': ends}
+        else:
+            update = {'$unset': {'min_price': '', 'max_price': ''}}
+        db.category_stats.update_one({'_id': category}, update)
+
+    @staticmethod
+    def pipeline():
+        """Aggregation computing the summary documents from products"""
+        return [
+            {'$group': {
+                '_id': '$category',
+                'count': {'$sum': 1},
+                'featured_count': {'$sum': {'$cond': [{'$eq': ['$featured', True]}, 1, 0]}},
+                'in_stock_count': {'$sum': {'$cond': [{'$gt': ['$stock', 0]}, 1, 0]}},
+                'min_price': {'$min': '$price'},
+                'max_price': {'$max': '$price'},
+            }},
+            {'$match': {'_id': {'$ne': None}}},
+        ]
+
+    @staticmethod
+    def rebuild(db):
+        """Correct every category from products in place.
+
+        Stored counters are read before products are aggregated, and each
+        category gets an $inc of the difference, so increments from writes
+        running meanwhile are kept rather than overwritten; only a write
+        between its product update and its $inc can be off by one. Price
+        ranges that differ are re-read from the index. Returns the number
+        of categories corrected.
+        """
+        stored = {doc['_id']: doc for doc in db.category_stats.find()}
+        actual = {doc['_id']: doc for doc in db.products.aggregate(CategoryStats.pipeline(), allowDiskUse=True)}
+        ops = []
+        ranges = []
+        corrected = set()
+        for category in stored.keys() | actual.keys():
+            have, want = stored.get(category, {}), actual.get(category, {})
+            inc = {name: want.get(name, 0) - have.get(name, 0) for name in COUNTERS}
+            inc = {name: n for name, n in inc.items() if n}
+            if inc:
+                ops.append(UpdateOne({'_id': category}, {'$inc': inc}, upsert=True))
+                corrected.add(category)
+            if any(have.get(f) != want.get(f) for f in ('min_price', 'max_price')):
+                ranges.append(category)
+                corrected.add(category)
+        if ops:
+            db.category_stats.bulk_write(ops, ordered=False)
+        for category in ranges:
+            CategoryStats.refresh_price_range(db, category)
+        return len(corrected)
+
+    @staticmethod
+    def ensure(db):
+        """Build the summary if products exist but it was never built"""
+        if db.category_stats.find_one({}, {'_id': 1}) is None and db.products.find_one({}, {'_id': 1}):
+            logger.info("Building category_stats from products")
+            CategoryStats.rebuild(db)
+
+    @staticmethod
+    def get_all(db):
+        """Every non-empty category's summary, ordered by name (one _id index read)"""
+        return list(db.category_stats.find({'count': {'$gt': 0}}).sort('_id', ASCENDING))
+
+    @staticmethod
+    def to_facets(docs):
+        """Summary documents as the facet objects returned by /api/categories"""
+        return [{
+            'category': doc['_id'],
+            'count': doc['count'],
+            'featured_count': doc.get('featured_count', 0),
+            'in_stock_count': doc.get('in_stock_count', 0),
+            'min_price': doc.get('min_price'),
+            'max_price': doc.get('max_price'),
+        } for doc in docs]
@@ -1,49 +1,248 @@
+import hashlib
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.models.category_stats import CategoryStats
+from app.utils.cache import catalog_cache
+from app.utils.search_index import search_index
+from app.utils.serialization import dumps_bytes
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY = 11000
 
 class Product:
     """Product model for e-commerce items"""
+
+    # Fields clients may request through ?fields= projections
+    FIELDS = ('name', 'description', 'price', 'category', 'image_url', 'featured', 'stock', 'rating')
+
+    # Listing orders as (field, direction); ties break on _id in the same direction
+    SORTS = {
+        'default': ('_id', ASCENDING),
+        'newest': ('_id', DESCENDING),
+        'price_asc': ('price', ASCENDING),
+        'price_desc': ('price', DESCENDING),
+        'rating': ('rating', DESCENDING),
+    }
+
+    # Equality filters each sort may be combined with. Every shape here is
+    # served by an index from database_setup.py, so clients cannot ask for
+    # an in-memory sort over the whole catalog.
+    QUERY_SHAPES = {
+        'default': {(), ('category',), ('featured',), ('category', 'featured')},
+        'newest': {(), ('category',), ('featured',), ('category', 'featured')},
+        'price_asc': {(), ('category',)},
+        'price_desc': {(), ('category',)},
+        'rating': {(), ('category',)},
+    }
+
+    # Sorts that may carry a min_price/max_price range on the same index
+    PRICE_RANGE_SORTS = ('price_asc', 'price_desc')
+
+    # What bulk_upsert reads back per SKU: the hash, plus the fields category_stats counts
+    IMPORT_PROJECTION = {'sku': 1, 'content_hash': 1, 'category': 1, 'price': 1, 'featured': 1, 'stock': 1}
     
     @staticmethod
-    def create(db, product_data):
-        """Create a new product"""
-        product = {
-            'name': product_data['name'],
-            'description': product_data.get('description', ''),
-            'price': float(product_data['price']),
-            'category': product_data['category'],
-            'image_url': product_data.get('image_url', ''),
-            'featured': product_data.get('featured', False),
-            'stock': product_data.get('stock', 0)
-        }
+    def create(db, product):
+        """Create a new product from a document validated by PRODUCT_SCHEMA"""
+        product = dict(product)
         result = db.products.insert_one(product)
+        CategoryStats.record_changes(db, [(None, product)])
+        catalog_cache.bump_version()
+        if search_index.built:
+            search_index.add(product)
         return str(result.inserted_id)
+
+    @staticmethod
+    def content_hash(product):
+        """Stable hash of a validated product document (key order does not matter)"""
+        return hashlib.sha1(dumps_bytes(product, sort_keys=True)).hexdigest()
+
+    @staticmethod
+    def bulk_upsert(db, products):
+        """Upsert a batch of validated products keyed by 'sku' in two round trips.
+
+        One $in read fetches the stored content hash of every SKU; rows whose
+        hash is unchanged are skipped, everything else goes out in one
+        unordered bulk_write. Returns an outcome per input product:
+        'inserted', 'updated', 'unchanged', or 'duplicate' for repeats of a
+        SKU within the batch (the first row wins).
+        """
+        batch = {}
+        for product in products:
+            batch.setdefault(product['sku'], product)
+        existing = {
+            doc['sku']: doc
+            for doc in db.products.find({'sku': {'$in': list(batch)}}, Product.IMPORT_PROJECTION)
+        }
+
+        statuses = {}
+        ops = []
+        pending = []
+        for sku, product in batch.items():
+            digest = Product.content_hash(product)
+            doc = existing.get(sku)
+            if doc is not None and doc.get('content_hash') == digest:
+                statuses[sku] = 'unchanged'
+                continue
+            product_id = ObjectId() if doc is None else doc['_id']
+            ops.append(UpdateOne(
+                {'sku': sku},
+                {'$set': {**product, 'content_hash': digest}, '$setOnInsert': {'_id': product_id}},
+                upsert=True
+            ))
+            pending.append((sku, product_id, 'inserted' if doc is None else 'updated', doc))
+
+        if ops:
+            try:
+                db.products.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # A concurrent import inserted some of these SKUs first; they now match as updates
+                errors = e.details.get('writeErrors', [])
+                if any(err['code'] != DUPLICATE_KEY for err in errors):
+                    raise
+                pending = Product._retry_updates(db, batch, ops, pending, sorted(err['index'] for err in errors))
+            CategoryStats.record_changes(db, [(before, batch[sku]) for sku, _, _, before in pending])
+            catalog_cache.bump_version()
+            for sku, product_id, status, _ in pending:
+                statuses[sku] = status
+                if search_index.built and product_id is not None:
+                    search_index.add({**batch[sku], '_id': product_id})
+
+        results = []
+        seen = set()
+        for product in products:
+            sku = product['sku']
+            results.append('duplicate' if sku in seen else statuses[sku])
+            seen.add(sku)
+        return results
+
+    @staticmethod
+    def _retry_updates(db, batch, ops, pending, failed):
+        """Resend the upserts at indexes failed as updates of the documents now stored.
+
+        The stored versions are read back first, so category_stats and the
+        search index see the real before and _id; rows that match what is
+        stored come back as 'unchanged'. Returns the new pending list.
+        """
+        skus = [pending[i][0] for i in failed]
+        stored = {doc['sku']: doc
+                  for doc in db.products.find({'sku': {'$in': skus}}, Product.IMPORT_PROJECTION)}
+        retry = []
+        pending = list(pending)
+        for i in failed:
+            sku = pending[i][0]
+            doc = stored.get(sku)
+            if doc is None:
+                # Deleted again since; the retry upserts it with the _id picked before
+                retry.append(ops[i])
+                continue
+            if doc.get('content_hash') == Product.content_hash(batch[sku]):
+                pending[i] = (sku, doc['_id'], 'unchanged', doc)
+                continue
+            retry.append(ops[i])
+            pending[i] = (sku, doc['_id'], 'updated', doc)
+        if retry:
+            db.products.bulk_write(retry, ordered=False)
+        return pending
     
     @staticmethod
-    def get_all(db, category=None, featured=None):
-        """Get all products with optional filters"""
+    def check_query_shape(sort='default', category=None, featured=None, price_range=False):
+        """Raise ValueError unless the listing query is on the indexed allowlist"""
+        if sort not in Product.SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(Product.SORTS)}")
+        filters = tuple(name for name, value in (('category', category), ('featured', featured))
+                        if value is not None)
+        if filters not in Product.QUERY_SHAPES[sort]:
+            raise ValueError(f"sort={sort} cannot be combined with {' and '.join(filters)}")
+        if price_range and sort not in Product.PRICE_RANGE_SORTS:
+            raise ValueError(f"Price ranges need sort={' or sort='.join(Product.PRICE_RANGE_SORTS)}")
+
+    @staticmethod
+    def find_page(db, category=None, featured=None, after=None, limit=50, projection=None,
+                  sort='default', min_price=None, max_price=None, in_stock=False):
+        """Get a cursor over one keyset page of products.
+
+        after is the (last_value, last_id) pair decoded from the page token.
+        """
+        field, direction = Product.SORTS[sort]
         query = {}
         if category:
             query['category'] = category
         if featured is not None:
             query['featured'] = featured
-            
-        products = list(db.products.find(query))
-        for product in products:
-            product['_id'] = str(product['_id'])
-        return products
+        if min_price is not None or max_price is not None:
+            query['price'] = {}
+            if min_price is not None:
+                query['price']['$gte'] = min_price
+            if max_price is not None:
+                query['price']['$lte'] = max_price
+        if in_stock:
+            query['stock'] = {'$gt': 0}
+        if after is not None:
+            query.update(Product._after(field, direction, *after))
+
+        order = [('_id', direction)]
+        if field != '_id':
+            order.insert(0, (field, direction))
+            if projection:
+                projection = {**projection, field: 1}
+
+        return db.products.find(query, projection).sort(order).limit(limit)
+
+    @staticmethod
+    def _after(field, direction, last_value, last_id):
+        """Build the keyset predicate that resumes after (last_value, last_id)"""
+        op = '$gt' if direction == ASCENDING else '$lt'
+        if field == '_id':
+            return {'_id': {op: last_id}}
+        # Missing values sort first ascending and last descending
+        if last_value is None:
+            tie = {field: None, '_id': {op: last_id}}
+            if direction == ASCENDING:
+                return {'$or': [tie, {field: {'$ne': None}}]}
+            return tie
+        clauses = [{field: {op: last_value}}, {field: last_value, '_id': {op: last_id}}]
+        if direction == DESCENDING:
+            clauses.append({field: None})
+        return {'$or': clauses}
     
     @staticmethod
-    def get_by_id(db, product_id):
-        """Get product by ID"""
-        try:
-            product = db.products.find_one({'_id': ObjectId(product_id)})
-            if product:
-                product['_id'] = str(product['_id'])
-            return product
-        except:
-            return None
+    def search(db, text, category=None, min_price=None, max_price=None, skip=0, limit=20, projection=None):
+        """Get a cursor over products matching a $text query, best match first"""
+        query = {'$text': {'$search': text}}
+        if category:
+            query['category'] = category
+        if min_price is not None or max_price is not None:
+            query['price'] = {}
+            if min_price is not None:
+                query['price']['$gte'] = min_price
+            if max_price is not None:
+                query['price']['$lte'] = max_price
+
+        projection = dict(projection or {})
+        projection['score'] = {'$meta': 'textScore'}
+        return (db.products.find(query, projection)
+                .sort([('score', {'$meta': 'textScore'}), ('_id', ASCENDING)])
+                .skip(skip)
+                .limit(limit))
+    
+    @staticmethod
+    def parse_id(product_id):
+        """ObjectId for a 24-character hex id, or None if it is not one"""
+        if isinstance(product_id, str) and len(product_id) == 24 and ObjectId.is_valid(product_id):
+            return ObjectId(product_id)
+        return None
+
+    @staticmethod
+    def get_many(db, object_ids):
+        """{ObjectId: product} for the ids that exist, fetched with one $in query"""
+        object_ids = list(dict.fromkeys(object_ids))
+        if not object_ids:
+            return {}
+        return {doc['_id']: doc for doc in db.products.find({'_id': {'$in': object_ids}})}
     
     @staticmethod
     def get_categories(db):
-        """Get all unique categories"""
-        return db.products.distinct('category')
\ No newline at end of file
+        """Get all non-empty categories, from the category_stats summary"""
+        return [doc['_id'] for doc in CategoryStats.get_all(db)]
\ No newline at end of file
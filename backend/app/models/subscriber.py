@@ -1,20 +1,18 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.models.subscriber_growth import SubscriberGrowth
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY = 11000
+
+# Growth event counted for each subscribe outcome; duplicates change nothing
+GROWTH_EVENTS = {'inserted': 'subscribed', 'reactivated': 'reactivated'}
 
 class Subscriber:
     """Subscriber model for newsletter"""
     
-    @staticmethod
-    def create(db, email):
-        """Create a new subscriber"""
-        subscriber = {
-            'email': email.lower().strip(),
-            'subscribed_at': datetime.utcnow(),
-            'is_active': True
-        }
-        result = db.subscribers.insert_one(subscriber)
-        return str(result.inserted_id)
-    
     @staticmethod
     def find_by_email(db, email):
         """Find subscriber by email"""
@@ -23,16 +21,169 @@ class Subscriber:
     @staticmethod
     def get_all(db):
         """Get all active subscribers"""
-        subscribers = list(db.subscribers.find({'is_active': True}))
-        for sub in subscribers:
-            sub['_id'] = str(sub['_id'])
-        return subscribers
+        return list(db.subscribers.find({'is_active': True}))
+    
+    @staticmethod
+    def _upsert(email, new_id, now):
+        """Arguments for the find_one_and_update that subscribes an email"""
+        return dict(
+            filter={'email': email},
+            update={
+                '$set': {'is_active': True},
+                # A reactivated subscriber is no longer churned
+                '$unset': {'unsubscribed_at': ''},
+                '$setOnInsert': {'_id': new_id, 'subscribed_at': now}
+            },
+            projection={'is_active': 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+
+    @staticmethod
+    def _growth_events(outcomes, now):
+        """(event, when) pairs for SubscriberGrowth from (status, subscriber_id) outcomes"""
+        return [(GROWTH_EVENTS[status], now) for status, _ in outcomes if status in GROWTH_EVENTS]
+
+    @staticmethod
+    def _outcome(before, new_id):
+        """Turn the pre-update document into (status, subscriber_id)"""
+        if before is None:
+            return 'inserted', str(new_id)
+        return ('duplicate' if before.get('is_active') else 'reactivated'), str(before['_id'])
+
+    @staticmethod
+    def subscribe(db, email):
+        """Subscribe or reactivate an email with one atomic upsert.
+
+        Returns (status, subscriber_id) where status is 'inserted',
+        'reactivated' or 'duplicate' (already active).
+        """
+        new_id = ObjectId()
+        now = datetime.utcnow()
+        upsert = Subscriber._upsert(email.lower().strip(), new_id, now)
+        try:
+            before = db.subscribers.find_one_and_update(**upsert)
+        except DuplicateKeyError:
+            # A concurrent upsert inserted the same email first; retry as an update
+            before = db.subscribers.find_one_and_update(**upsert)
+        outcome = Subscriber._outcome(before, new_id)
+        SubscriberGrowth.record(db, Subscriber._growth_events([outcome], now))
+        return outcome
+
+    @staticmethod
+    async def subscribe_async(db, email):
+        """subscribe() for an async (Motor) database handle"""
+        new_id = ObjectId()
+        now = datetime.utcnow()
+        upsert = Subscriber._upsert(email.lower().strip(), new_id, now)
+        try:
+            before = await db.subscribers.find_one_and_update(**upsert)
+        except DuplicateKeyError:
+            before = await db.subscribers.find_one_and_update(**upsert)
+        outcome = Subscriber._outcome(before, new_id)
+        await SubscriberGrowth.record_async(db, Subscriber._growth_events([outcome], now))
+        return outcome
     
+    @staticmethod
+    def bulk_subscribe(db, emails):
+        """Subscribe a batch of normalized emails in two round trips.
+
+        One $in read classifies existing rows, then one unordered bulk_write
+        upserts everything that is new or inactive. Returns a (status,
+        subscriber_id) pair per input email; repeats within the batch are
+        reported as 'duplicate'.
+        """
+        unique = list(dict.fromkeys(emails))
+        existing = {
+            doc['email']: doc
+            for doc in db.subscribers.find({'email': {'$in': unique}}, {'email': 1, 'is_active': 1})
+        }
+
+        statuses = {}
+        ops = []
+        pending = []
+        now = datetime.utcnow()
+        for email in unique:
+            doc = existing.get(email)
+            if doc is not None and doc.get('is_active'):
+                statuses[email] = ('duplicate', str(doc['_id']))
+                continue
+            new_id = ObjectId() if doc is None else doc['_id']
+            ops.append(UpdateOne(
+                {'email': email},
+                {'$set': {'is_active': True}, '$unset': {'unsubscribed_at': ''},
+                 '$setOnInsert': {'_id': new_id, 'subscribed_at': now}},
+                upsert=True
+            ))
+            pending.append((email, new_id, 'inserted' if doc is None else 'reactivated'))
+
+        if ops:
+            failed = set()
+            try:
+                result = db.subscribers.bulk_write(ops, ordered=False)
+                upserted = set(result.upserted_ids.values())
+            except BulkWriteError as e:
+                # Concurrent writers inserting the same email hit the unique index
+                errors = e.details.get('writeErrors', [])
+                if any(err['code'] != DUPLICATE_KEY for err in errors):
+                    raise
+                failed = {err['index'] for err in errors}
+                upserted = {item['_id'] for item in e.details.get('upserted', [])}
+            for index, (email, new_id, status) in enumerate(pending):
+                if index in failed or (status == 'inserted' and new_id not in upserted):
+                    statuses[email] = ('duplicate', None)
+                else:
+                    statuses[email] = (status, str(new_id))
+
+        results = []
+        seen = set()
+        for email in emails:
+            status, subscriber_id = statuses[email]
+            results.append(('duplicate', subscriber_id) if email in seen else (status, subscriber_id))
+            seen.add(email)
+        SubscriberGrowth.record(db, Subscriber._growth_events(results, now))
+        return results
+    
+    @staticmethod
+    def iter_active(db, after=None, batch_size=1000):
+        """Get a server-side cursor over active subscribers, ordered by _id"""
+        query = {'is_active': True}
+        if after is not None:
+            query['_id'] = {'$gt': after}
+        projection = {'email': 1, 'subscribed_at': 1}
+        return db.subscribers.find(query, projection).sort('_id', ASCENDING).batch_size(batch_size)
+    
+    @staticmethod
+    def iter_active_raw(db, batch_size=1000):
+        """Get all active subscribers as undecoded BSON batches, ordered by _id"""
+        return (db.subscribers.find_raw_batches({'is_active': True})
+                .sort('_id', ASCENDING)
+                .batch_size(batch_size))
+    
+    @staticmethod
+    def _deactivate(email, now):
+        """Arguments for the update_one that unsubscribes an active email"""
+        return dict(
+            filter={'email': email, 'is_active': True},
+            update={'$set': {'is_active': False, 'unsubscribed_at': now}}
+        )
+
     @staticmethod
     def unsubscribe(db, email):
         """Deactivate subscriber"""
-        result = db.subscribers.update_one(
-            {'email': email.lower().strip()},
-            {'$set': {'is_active': False}}
-        )
-        return result.modified_count > 0
\ No newline at end of file
+        now = datetime.utcnow()
+        result = db.subscribers.update_one(**Subscriber._deactivate(email.lower().strip(), now))
+        if result.modified_count > 0:
+            SubscriberGrowth.record(db, [('unsubscribed', now)])
+            return True
+        return False
+
+    @staticmethod
+    async def unsubscribe_async(db, email):
+        """unsubscribe() for an async (Motor) database handle"""
+        now = datetime.utcnow()
+        result = await db.subscribers.update_one(**Subscriber._deactivate(email.lower().strip(), now))
+        if result.modified_count > 0:
+            await SubscriberGrowth.record_async(db, [('unsubscribed', now)])
+            return True
+        return False
\ No newline at end of file
@@ -0,0 +1,198 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Bucket sizes kept side by side; weeks start on Monday
+UNIT_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+UNITS = tuple(UNIT_STEPS)
+
+# Counters kept per bucket
+EVENTS = ('subscribed', 'reactivated', 'unsubscribed')
+
+# Events a backfill can recover, and the subscriber timestamp each is read from
+BACKFILL_FIELDS = {'subscribed': 'subscribed_at', 'unsubscribed': 'unsubscribed_at'}
+
+# Marker documents on the (unit, start) index, outside every real unit:
+# the first backfill was claimed, and a rebuild is running
+BACKFILLED = {'unit': 'backfilled', 'start': datetime(1970, 1, 1)}
+REBUILD_LOCK = {'unit': 'rebuild-lock', 'start': datetime(1970, 1, 1)}
+
+
+class RebuildInProgress(RuntimeError):
+    """Raised when another process holds the subscriber_growth rebuild lock"""
+
+
+class SubscriberGrowth:
+    """Subscriber events counted per hour, day and week in subscriber_growth.
+
+    One document per (unit, start) bucket holds a counter per event, so a
+    dashboard reads one document per bucket however many subscribers there
+    are. Writes $inc the hour, day and week an event falls in with one
+    bulk_write. Times are naive UTC, like subscribed_at. rebuild() corrects
+    the buckets from the subscribers' timestamps.
+    """
+
+    @staticmethod
+    def bucket_start(when, unit):
+        """Start of the unit bucket containing when"""
+        start = when.replace(minute=0, second=0, microsecond=0)
+        if unit != 'hour':
+            start = start.replace(hour=0)
+        if unit == 'week':
+            start -= timedelta(days=start.weekday())
+        return start
+
+    @staticmethod
+    def _count(counts, event, when, n=1):
+        for unit in UNITS:
+            counts[(unit, SubscriberGrowth.bucket_start(when, unit))][event] += n
+
+    @staticmethod
+    def operations(events):
+        """Upserts adding (event, when) pairs to their buckets, one per bucket"""
+        counts = defaultdict(Counter)
+        for event, when in events:
+            SubscriberGrowth._count(counts, event, when)
+        # Equality upserts on the unique (unit, start) index; the server
+        # retries the insert side of a race as an update
+        return [UpdateOne({'unit': unit, 'start': start}, {'$inc': dict(inc)}, upsert=True)
+                for (unit, start), inc in counts.items()]
+
+    @staticmethod
+    def record(db, events):
+        """Count (event, when) pairs from a write"""
+        ops = SubscriberGrowth.operations(events)
+        if ops:
+            db.subscriber_growth.bulk_write(ops, ordered=False)
+
+    @staticmethod
+    async def record_async(db, events):
+        """record() for an async (Motor) database handle"""
+        ops = SubscriberGrowth.operations(events)
+        if ops:
+            await db.subscriber_growth.bulk_write(ops, ordered=False)
+
+    @staticmethod
+    def pipeline(field, before=None):
+        """Aggregation counting subscribers per hour of a timestamp field, over its index"""
+        date = f'${field}'
+        return [
+            {'$match': {field: {'$type': 'date'} if before is None else {'$lt': before}}},
+            {'$group': {
+                '_id': {'year': {'$year': date}, 'month': {'$month': date},
+                        'day': {'$dayOfMonth': date}, 'hour': {'$hour': date}},
+                'n': {'$sum': 1},
+            }},
+        ]
+
+    @staticmethod
+    def aggregate(db, before=None):
+        """{(unit, start): {event: count}} computed from subscribers' timestamps.
+
+        Only events before `before` are counted when it is given. The server
+        returns one row per hour with any events; days and weeks are summed
+        from those. Reactivations leave no timestamp behind, so only live
+        writes count them.
+        """
+        counts = defaultdict(Counter)
+        for event, field in BACKFILL_FIELDS.items():
+            pipeline = SubscriberGrowth.pipeline(field, before)
+            for row in db.subscribers.aggregate(pipeline, allowDiskUse=True):
+                SubscriberGrowth._count(counts, event, datetime(**row['_id']), row['n'])
+        return counts
+
+    @staticmethod
+    def stored(db):
+        """{(unit, start): bucket document} for every stored bucket"""
+        return {(doc['unit'], doc['start']): doc
+                for doc in db.subscriber_growth.find({'unit': {'$in': list(UNITS)}})}
+
+    @staticmethod
+    def rebuild(db, force=False):
+        """Add the subscribed/unsubscribed events the buckets are missing, in place.
+
+        Stored counters are read at a cutoff time and each bucket that holds
+        fewer events than the backfill counts before the cutoff gets an $inc
+        of the shortfall. Counters are never lowered: a subscriber only keeps
+        its first subscribed_at and, while inactive, its unsubscribed_at, so
+        a bucket holding more than the backfill finds is live history
+        (earlier unsubscribes of a resubscribed address), not drift. Events recorded after the
+        cutoff and the reactivated counters are kept too; only a write in
+        flight at the cutoff can be off by one. The rebuild lock
+        marker keeps concurrent rebuilds from applying the difference twice;
+        force=True clears a lock left behind by a process that died.
+        Returns the number of buckets corrected.
+        """
+        if force:
+            db.subscriber_growth.delete_one(REBUILD_LOCK)
+        try:
+            db.subscriber_growth.insert_one(dict(REBUILD_LOCK, started_at=datetime.utcnow()))
+        except DuplicateKeyError:
+            lock = db.subscriber_growth.find_one(REBUILD_LOCK) or {}
+            raise RebuildInProgress(f"subscriber_growth rebuild running since {lock.get('started_at')}")
+        try:
+            cutoff = datetime.utcnow()
+            stored = SubscriberGrowth.stored(db)
+            actual = SubscriberGrowth.aggregate(db, before=cutoff)
+            ops = []
+            for unit, start in stored.keys() | actual.keys():
+                have, want = stored.get((unit, start), {}), actual.get((unit, start), {})
+                inc = {event: want.get(event, 0) - have.get(event, 0) for event in BACKFILL_FIELDS}
+                inc = {event: n for event, n in inc.items() if n > 0}
+                if inc:
+                    ops.append(UpdateOne({'unit': unit, 'start': start}, {'$inc': inc}, upsert=True))
+            if ops:
+                db.subscriber_growth.bulk_write(ops, ordered=False)
+            return len(ops)
+        finally:
+            db.subscriber_growth.delete_one(REBUILD_LOCK)
+
+    @staticmethod
+    def ensure(db):
+        """Backfill the buckets once, in whichever process claims it first"""
+        if db.subscribers.find_one({}, {'_id': 1}) is None:
+            return
+        try:
+            db.subscriber_growth.insert_one(dict(BACKFILLED, at=datetime.utcnow()))
+        except DuplicateKeyError:
+            return
+        logger.info("Backfilling subscriber_growth from subscribers")
+        try:
+            SubscriberGrowth.rebuild(db)
+        except RebuildInProgress as e:
+            logger.warning("Skipped the subscriber_growth backfill: %s", e)
+        except Exception:
+            # Release the claim so the next start tries again
+            db.subscriber_growth.delete_one(BACKFILLED)
+            raise
+
+    @staticmethod
+    def query(unit, start, end):
+        """find() arguments for the stored buckets of unit in [start, end)"""
+        return ({'unit': unit, 'start': {'$gte': start, '$lt': end}},
+                {'_id': 0, 'start': 1, **dict.fromkeys(EVENTS, 1)})
+
+    @staticmethod
+    def get_series(db, unit, start, end):
+        """Every unit bucket from start's up to end, quiet ones as zeros"""
+        start = SubscriberGrowth.bucket_start(start, unit)
+        docs = db.subscriber_growth.find(*SubscriberGrowth.query(unit, start, end))
+        return SubscriberGrowth.fill(docs, unit, start, end)
+
+    @staticmethod
+    def fill(docs, unit, start, end):
+        """Stored bucket documents as a gapless series of counters plus net"""
+        stored = {doc['start']: doc for doc in docs}
+        series = []
+        step = UNIT_STEPS[unit]
+        while start < end:
+            doc = stored.get(start, {})
+            bucket = {'start': start, **{event: doc.get(event, 0) for event in EVENTS}}
+            bucket['net'] = bucket['subscribed'] + bucket['reactivated'] - bucket['unsubscribed']
+            series.append(bucket)
+            start += step
+        return series
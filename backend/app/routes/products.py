@@ -1,32 +1,204 @@
-from flask import Blueprint, request, jsonify
+import io
+import time
+from itertools import chain
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from app.models.category_stats import CategoryStats
 from app.models.product import Product
+from app.utils.cache import cached_response, catalog_cache
+from app.utils.ingest import INGEST_FORMATS, PRODUCT_OUTCOMES, detect_format, ingest_products, read_records
+from app.utils.loader import product_loader
+from app.utils.pagination import (
+    decode_cursor, parse_fields, parse_limit, parse_page, parse_price, stream_page
+)
+from app.utils.search_index import search_index
+from app.utils.snapshots import catalog_snapshots, snapshot_response
+from validators import PRODUCT_SCHEMA, describe
 
 products_bp = Blueprint('products', __name__)
 
+def parse_listing_args(args, config):
+    """Parse product listing query args into (limit, Product.find_page kwargs).
+
+    Raises ValueError for malformed args or a query shape outside the
+    indexed allowlist. Shared with the ASGI app.
+    """
+    category = args.get('category') or None
+    featured = args.get('featured')
+    sort = args.get('sort', 'default')
+
+    # Convert featured to boolean if provided
+    if featured is not None:
+        featured = featured.lower() == 'true'
+
+    limit = parse_limit(args.get('limit'), config['PRODUCTS_PAGE_SIZE'], config['PRODUCTS_MAX_PAGE_SIZE'])
+    min_price = parse_price(args.get('min_price'), 'min_price')
+    max_price = parse_price(args.get('max_price'), 'max_price')
+    Product.check_query_shape(sort, category, featured,
+                              price_range=min_price is not None or max_price is not None)
+    return limit, {
+        'category': category,
+        'featured': featured,
+        'sort': sort,
+        'after': decode_cursor(args.get('next'), sort),
+        'projection': parse_fields(args.get('fields'), Product.FIELDS),
+        'min_price': min_price,
+        'max_price': max_price,
+        'in_stock': args.get('in_stock', 'false').lower() == 'true'
+    }
+
+def parse_search_args(args, config):
+    """Parse search query args into (page, limit, Product.search kwargs)"""
+    text = (args.get('q') or '').strip()
+    if not text:
+        raise ValueError('q is required')
+
+    limit = parse_limit(args.get('limit'), config['SEARCH_PAGE_SIZE'], config['PRODUCTS_MAX_PAGE_SIZE'])
+    page = parse_page(args.get('page'))
+    return page, limit, {
+        'text': text,
+        'category': args.get('category'),
+        'min_price': parse_price(args.get('min_price'), 'min_price'),
+        'max_price': parse_price(args.get('max_price'), 'max_price'),
+        'projection': parse_fields(args.get('fields'), Product.FIELDS),
+        'skip': (page - 1) * limit,
+        # One extra document tells us whether another page exists
+        'limit': limit + 1
+    }
+
+def parse_batch_ids(ids, max_ids):
+    """Parse the ids of a batch lookup into (ObjectId or None per id, errors).
+
+    ids is the raw list from ?ids= or the JSON body. errors maps each
+    malformed id to a message; its slot in the list is None. Raises
+    ValueError when ids is not a non-empty list of at most max_ids.
+    Shared with the ASGI app.
+    """
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('ids must be a non-empty list of product ids')
+    if len(ids) > max_ids:
+        raise ValueError(f'at most {max_ids} ids per request')
+    object_ids = [Product.parse_id(product_id) for product_id in ids]
+    errors = {str(product_id): 'invalid product id'
+              for product_id, object_id in zip(ids, object_ids) if object_id is None}
+    return object_ids, errors
+
+def batch_page(ids, object_ids, errors, found):
+    """Shape a batch lookup into the response body, in request order"""
+    products = [None if object_id is None else found.get(object_id) for object_id in object_ids]
+    for product_id, object_id, product in zip(ids, object_ids, products):
+        if object_id is not None and product is None:
+            errors[product_id] = 'not found'
+    return {'products': products, 'count': sum(product is not None for product in products),
+            'errors': errors}
+
+def search_page(products, page, limit):
+    """Shape fetched search results into the response body"""
+    has_more = len(products) > limit
+    products = products[:limit]
+    return {'products': products, 'count': len(products), 'page': page, 'has_more': has_more}
+
 @products_bp.route('/products', methods=['GET'])
+@snapshot_response
+@cached_response
 def get_products():
-    """Get all products with optional filters"""
+    """Get one page of products with optional filters and sorting"""
     try:
-        db = request.app.config['db']
-        category = request.args.get('category')
-        featured = request.args.get('featured')
-        
-        # Convert featured to boolean if provided
-        if featured is not None:
-            featured = featured.lower() == 'true'
-        
-        products = Product.get_all(db, category=category, featured=featured)
-        return jsonify({'products': products, 'count': len(products)}), 200
-        
+        limit, query = parse_listing_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        db = current_app.config['db']
+
+        # Fetch one extra document to know whether a next page exists
+        cursor = Product.find_page(db, limit=limit + 1, **query)
+        chunks = stream_page(cursor, limit, sort=query['sort'],
+                             sort_field=Product.SORTS[query['sort']][0])
+        first = next(chunks)
+        if catalog_cache.enabled:
+            # Buffered so cached_response can keep it; pages are capped at PRODUCTS_MAX_PAGE_SIZE
+            return Response(b''.join(chain([first], chunks)), mimetype='application/json'), 200
+        return Response(stream_with_context(chain([first], chunks)),
+                        mimetype='application/json'), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/products/search', methods=['GET'])
+@cached_response
+def search_products():
+    """Full-text product search ranked by relevance"""
+    try:
+        page, limit, query = parse_search_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        db = current_app.config['db']
+        products = list(Product.search(db, **query))
+        return jsonify(search_page(products, page, limit)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/products/suggest', methods=['GET'])
+def suggest_products():
+    """Type-ahead product suggestions from the in-memory prefix index"""
+    if not current_app.config['TYPEAHEAD_INDEX']:
+        return jsonify({'error': 'Type-ahead is disabled'}), 404
+
+    try:
+        limit = parse_limit(request.args.get('limit'), current_app.config['TYPEAHEAD_LIMIT'], 50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        search_index.sync(current_app.config['db'])
+        suggestions = search_index.suggest(
+            request.args.get('q', ''), limit=limit, category=request.args.get('category')
+        )
+        return jsonify({'suggestions': suggestions, 'count': len(suggestions)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/products/batch', methods=['GET', 'POST'])
+def get_products_batch():
+    """Get several products by ID with one query.
+
+    Ids come as ?ids=a,b,c or a JSON body {"ids": [...]}. products has one
+    entry per requested id, in order, and null where errors says the id is
+    invalid or not found.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        ids = body.get('ids') if isinstance(body, dict) else None
+    else:
+        ids = [product_id.strip() for product_id in request.args.get('ids', '').split(',') if product_id.strip()]
+
+    try:
+        object_ids, errors = parse_batch_ids(ids, current_app.config['PRODUCTS_BATCH_MAX_IDS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        loader = product_loader()
+        valid = [object_id for object_id in object_ids if object_id is not None]
+        found = dict(zip(valid, loader.load_many(valid)))
+        return jsonify(batch_page(ids, object_ids, errors, found)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/products/<product_id>', methods=['GET'])
+@cached_response
 def get_product(product_id):
     """Get single product by ID"""
+    object_id = Product.parse_id(product_id)
+    if object_id is None:
+        return jsonify({'error': 'Invalid product id'}), 400
+
     try:
-        db = request.app.config['db']
-        product = Product.get_by_id(db, product_id)
+        product = product_loader().load(object_id).result()
         
         if product:
             return jsonify({'product': product}), 200
@@ -37,12 +209,22 @@ def get_product(product_id):
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/categories', methods=['GET'])
+@cached_response
 def get_categories():
-    """Get all product categories"""
+    """Get all product categories with their counts and price ranges"""
     try:
-        db = request.app.config['db']
-        categories = Product.get_categories(db)
-        return jsonify({'categories': categories}), 200
+        db = current_app.config['db']
+        docs = CategoryStats.get_all(db)
+        if not docs:
+            # Bootstrap was off or failed, so the summary may never have been
+            # built; build it from products now rather than list no categories
+            CategoryStats.ensure(db)
+            docs = CategoryStats.get_all(db)
+        facets = CategoryStats.to_facets(docs)
+        return jsonify({
+            'categories': [facet['category'] for facet in facets],
+            'facets': facets
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -51,16 +233,15 @@ def get_categories():
 def create_product():
     """Create a new product (admin endpoint)"""
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['name', 'price', 'category']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
+        product, errors = PRODUCT_SCHEMA(request.get_json(silent=True))
+        if errors:
+            return jsonify({'error': describe(errors), 'errors': errors}), 400
         
-        db = request.app.config['db']
-        product_id = Product.create(db, data)
+        db = current_app.config['db']
+        product_id = Product.create(db, product)
+        if catalog_snapshots.enabled:
+            catalog_snapshots.invalidate()
+            catalog_snapshots.refresh_async(db, written=True)
         
         return jsonify({
             'message': 'Product created successfully',
@@ -68,4 +249,64 @@ def create_product():
         }), 201
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+# Invalid rows reported back in full; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def import_feed(db, lines, fmt, batch_size, details=False):
+    """Ingest a product feed from text lines into the import response body.
+
+    Raises ValueError for a malformed feed. Shared with the ASGI app, which
+    runs it in a worker thread.
+    """
+    counts = dict.fromkeys(PRODUCT_OUTCOMES, 0)
+    errors = []
+    results = []
+    started = time.perf_counter()
+    for row, sku, outcome, row_errors in ingest_products(db, read_records(lines, fmt), batch_size=batch_size):
+        counts[outcome] += 1
+        if row_errors and len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': row, 'sku': sku, 'errors': row_errors})
+        if details:
+            results.append({'row': row, 'sku': sku, 'status': outcome})
+    elapsed = time.perf_counter() - started
+
+    rows = sum(counts.values())
+    body = dict(counts, rows=rows, rows_per_second=round(rows / elapsed) if elapsed else rows)
+    body['errors'] = errors
+    if details:
+        body['results'] = results
+    return body
+
+@products_bp.route('/products/import', methods=['POST'])
+def import_products():
+    """Upsert an NDJSON or CSV product feed by SKU (admin endpoint).
+
+    Send the rows as the request body or as a multipart 'file' field.
+    Unchanged rows are skipped without a write. ?details=true adds the
+    per-row outcomes to the response.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(mimetype=request.mimetype)
+    if fmt not in INGEST_FORMATS:
+        return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+    details = request.args.get('details', 'false').lower() == 'true'
+
+    try:
+        db = current_app.config['db']
+        lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        body = import_feed(db, lines, fmt, current_app.config['PRODUCT_IMPORT_BATCH_SIZE'], details)
+        if catalog_snapshots.enabled and (body['inserted'] or body['updated']):
+            catalog_snapshots.invalidate()
+            catalog_snapshots.refresh_async(db, written=True)
+        return jsonify(body), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,40 +1,43 @@
-from flask import Blueprint, request, jsonify
+import io
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from bson import ObjectId
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from app.models.subscriber import Subscriber
+from app.models.subscriber_growth import EVENTS, UNIT_STEPS, SubscriberGrowth
+from app.utils.export import EXPORT_FORMATS
+from app.utils.ingest import INGEST_FORMATS, detect_format, ingest_subscribers, read_emails, summarize
+from app.utils.serialization import raw_json_array
+from validators import SUBSCRIBER_SCHEMA, describe
 
 subscribers_bp = Blueprint('subscribers', __name__)
 
+# Columns written by the streaming export; _id lets clients resume
+EXPORT_FIELDS = ['_id', 'email', 'subscribed_at']
+
 @subscribers_bp.route('/subscribe', methods=['POST'])
 def subscribe():
     """Subscribe to newsletter"""
     try:
-        data = request.get_json()
-        email = data.get('email')
-        
-        if not email:
-            return jsonify({'error': 'Email is required'}), 400
-        
-        # Check if email is valid (basic check)
-        if '@' not in email or '.' not in email:
-            return jsonify({'error': 'Invalid email format'}), 400
-        
-        # Check if already subscribed
-        db = request.app.config['db']
-        existing = Subscriber.find_by_email(db, email)
-        
-        if existing:
-            if existing['is_active']:
-                return jsonify({'message': 'Email already subscribed'}), 200
-            else:
-                # Reactivate subscription
-                db.subscribers.update_one(
-                    {'email': email.lower().strip()},
-                    {'$set': {'is_active': True}}
-                )
-                return jsonify({'message': 'Subscription reactivated!'}), 200
-        
-        # Create new subscriber
-        subscriber_id = Subscriber.create(db, email)
+        subscriber, errors = SUBSCRIBER_SCHEMA(request.get_json(silent=True))
+        if errors:
+            return jsonify({'error': describe(errors), 'errors': errors}), 400
+        email = subscriber['email']
         
+        # Insert, reactivate or detect an existing subscription in one upsert,
+        # or hand the email to the coalescer when batching is enabled
+        coalescer = current_app.config.get('subscribe_coalescer')
+        if coalescer:
+            status, subscriber_id = coalescer.submit(email)
+        else:
+            status, subscriber_id = Subscriber.subscribe(current_app.config['db'], email)
+
+        if status == 'duplicate':
+            return jsonify({'message': 'Email already subscribed'}), 200
+        if status == 'reactivated':
+            return jsonify({'message': 'Subscription reactivated!'}), 200
+
         return jsonify({
             'message': 'Successfully subscribed to newsletter!',
             'subscriber_id': subscriber_id
@@ -45,26 +48,183 @@ def subscribe():
 
 @subscribers_bp.route('/subscribers', methods=['GET'])
 def get_subscribers():
-    """Get all subscribers (admin endpoint)"""
+    """Get all subscribers (admin endpoint).
+
+    ?format=ndjson or ?format=csv streams the export from a server-side
+    cursor; pass ?after=<last _id> to resume an interrupted download.
+    """
+    export_format = request.args.get('format')
+    if export_format:
+        return export_subscribers(export_format)
+
     try:
-        db = request.app.config['db']
+        db = current_app.config['db']
+        if current_app.config['RAW_BSON_LISTS']:
+            # Decode and encode whole server batches instead of single documents
+            raw_batches = Subscriber.iter_active_raw(
+                db, batch_size=current_app.config['SUBSCRIBER_EXPORT_BATCH_SIZE']
+            )
+            chunks = raw_json_array(raw_batches, 'subscribers')
+            first = next(chunks)
+            return Response(stream_with_context(chain([first], chunks)),
+                            mimetype='application/json'), 200
+
         subscribers = Subscriber.get_all(db)
         return jsonify({'subscribers': subscribers, 'count': len(subscribers)}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def export_subscribers(export_format):
+    """Stream active subscribers as NDJSON or CSV"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format: {export_format}"}), 400
+
+    after = request.args.get('after')
+    if after:
+        if not ObjectId.is_valid(after):
+            return jsonify({'error': 'after must be a subscriber _id'}), 400
+        after = ObjectId(after)
+
+    try:
+        db = current_app.config['db']
+        cursor = Subscriber.iter_active(
+            db, after=after, batch_size=current_app.config['SUBSCRIBER_EXPORT_BATCH_SIZE']
+        )
+        write_rows, mimetype = EXPORT_FORMATS[export_format]
+        response = Response(
+            stream_with_context(write_rows(cursor, EXPORT_FIELDS)), mimetype=mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename=subscribers.{export_format}'
+        return response, 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_time(value, name):
+    """Parse an ISO 8601 query arg into a naive UTC datetime"""
+    try:
+        when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or time")
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+def parse_growth_args(args, config):
+    """Parse growth query args into (unit, start, end).
+
+    ?unit= is hour, day (default) or week. end defaults to the end of the
+    current bucket and start to ?buckets= (default 30) buckets before it.
+    Raises ValueError for malformed args or more than
+    SUBSCRIBER_GROWTH_MAX_BUCKETS buckets. Shared with the ASGI app.
+    """
+    unit = args.get('unit', 'day')
+    if unit not in UNIT_STEPS:
+        raise ValueError(f"unit must be one of: {', '.join(UNIT_STEPS)}")
+    step = UNIT_STEPS[unit]
+    max_buckets = config['SUBSCRIBER_GROWTH_MAX_BUCKETS']
+
+    if args.get('end'):
+        end = parse_time(args['end'], 'end')
+    else:
+        end = SubscriberGrowth.bucket_start(datetime.utcnow(), unit) + step
+    if args.get('start'):
+        start = SubscriberGrowth.bucket_start(parse_time(args['start'], 'start'), unit)
+    else:
+        try:
+            buckets = int(args.get('buckets', 30))
+        except ValueError:
+            raise ValueError('buckets must be an integer')
+        if not 1 <= buckets <= max_buckets:
+            raise ValueError(f'buckets must be between 1 and {max_buckets}')
+        start = SubscriberGrowth.bucket_start(end - step * buckets, unit)
+
+    if start >= end:
+        raise ValueError('start must be before end')
+    if (end - start) / step > max_buckets:
+        raise ValueError(f'at most {max_buckets} {unit} buckets per request')
+    return unit, start, end
+
+def growth_page(unit, start, end, series):
+    """Shape a growth series into the response body"""
+    totals = {key: sum(bucket[key] for bucket in series) for key in EVENTS + ('net',)}
+    return {'unit': unit, 'start': start, 'end': end, 'buckets': series, 'totals': totals}
+
+@subscribers_bp.route('/subscribers/growth', methods=['GET'])
+def subscriber_growth():
+    """Subscribe, reactivate and unsubscribe counts per hour, day or week (admin endpoint).
+
+    Served from the pre-aggregated subscriber_growth buckets: one indexed
+    read per bucket in the range, independent of the number of subscribers.
+    """
+    try:
+        unit, start, end = parse_growth_args(request.args, current_app.config)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        series = SubscriberGrowth.get_series(current_app.config['db'], unit, start, end)
+        return jsonify(growth_page(unit, start, end, series)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def subscribe_feed(db, lines, fmt, batch_size, details=True):
+    """Bulk-subscribe the emails in text lines into the bulk response body.
+
+    Raises ValueError for a malformed upload. Shared with the ASGI app,
+    which runs it in a worker thread.
+    """
+    started = time.perf_counter()
+    results = list(ingest_subscribers(db, read_emails(lines, fmt), batch_size=batch_size))
+    elapsed = time.perf_counter() - started
+
+    body = summarize(results)
+    body['rows'] = len(results)
+    body['rows_per_second'] = round(len(results) / elapsed) if elapsed else len(results)
+    if details:
+        body['results'] = [
+            {'row': row, 'email': email, 'status': status}
+            for row, email, status in results
+        ]
+    return body
+
+@subscribers_bp.route('/subscribers/bulk', methods=['POST'])
+def bulk_subscribe():
+    """Bulk-subscribe an NDJSON or CSV upload (admin endpoint).
+
+    Send the rows as the request body or as a multipart 'file' field.
+    ?details=false drops the per-row outcomes from the response.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(mimetype=request.mimetype)
+    if fmt not in INGEST_FORMATS:
+        return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+    details = request.args.get('details', 'true').lower() == 'true'
+
+    try:
+        lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        body = subscribe_feed(current_app.config['db'], lines, fmt,
+                              current_app.config['SUBSCRIBER_INGEST_BATCH_SIZE'], details)
+        return jsonify(body), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @subscribers_bp.route('/unsubscribe', methods=['POST'])
 def unsubscribe():
     """Unsubscribe from newsletter"""
     try:
-        data = request.get_json()
-        email = data.get('email')
-        
-        if not email:
-            return jsonify({'error': 'Email is required'}), 400
+        subscriber, errors = SUBSCRIBER_SCHEMA(request.get_json(silent=True))
+        if errors:
+            return jsonify({'error': describe(errors), 'errors': errors}), 400
         
-        db = request.app.config['db']
-        success = Subscriber.unsubscribe(db, email)
+        db = current_app.config['db']
+        success = Subscriber.unsubscribe(db, subscriber['email'])
         
         if success:
             return jsonify({'message': 'Successfully unsubscribed'}), 200
@@ -0,0 +1,181 @@
+import math
+import threading
+from itertools import count
+from flask import g, jsonify, request
+from app.utils.metrics import request_timing
+
+# Priorities, most important first. CRITICAL bypasses the limiter, LOW is
+# only admitted into a free slot and never waits in the queue.
+CRITICAL, HIGH, NORMAL, LOW = 0, 1, 2, 3
+PRIORITY_NAMES = {CRITICAL: 'critical', HIGH: 'high', NORMAL: 'normal', LOW: 'low'}
+
+# Endpoint priorities; endpoints not listed are NORMAL
+ROUTE_PRIORITIES = {
+    'health_check': CRITICAL,
+    'health_live': CRITICAL,
+    'health_ready': CRITICAL,
+    'metrics': CRITICAL,
+    'cache_stats': CRITICAL,
+    'db_stats': CRITICAL,
+    'admission_stats': CRITICAL,
+    'products.get_products': HIGH,
+    'products.search_products': HIGH,
+    'products.suggest_products': HIGH,
+    'products.get_product': HIGH,
+    'products.get_products_batch': HIGH,
+    'products.get_categories': HIGH,
+    'subscribers.subscribe': NORMAL,
+    'subscribers.unsubscribe': NORMAL,
+    'subscribers.get_subscribers': LOW,
+    'subscribers.subscriber_growth': LOW,
+    'subscribers.bulk_subscribe': LOW,
+    'products.create_product': LOW,
+    'products.import_products': LOW,
+}
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'event', 'admitted')
+
+    def __init__(self, priority, seq):
+        self.priority = priority
+        self.seq = seq
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class AdmissionController:
+    """Adaptive concurrency limit with a bounded, priority-ordered wait queue.
+
+    Requests over the limit wait up to max_wait for a slot; a full queue
+    sheds its lowest-priority waiter to make room for a more important
+    request. The limit follows a latency gradient: it shrinks when recent
+    MongoDB time per request rises above tolerance x the long-run
+    baseline and grows back while the workers are busy and latency is
+    healthy.
+    """
+
+    def __init__(self, initial_limit=32, min_limit=4, max_limit=128, max_queue=64,
+                 max_wait=0.5, tolerance=2.0, smoothing=0.2):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.short_rtt = None
+        self.long_rtt = None
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.rejected = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.timeouts = 0
+        self.evictions = 0
+        self._waiters = []
+        self._seq = count()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority):
+        """Take a slot, waiting if allowed; return False if the request is shed"""
+        name = PRIORITY_NAMES[priority]
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                self.admitted[name] += 1
+                return True
+            if priority == LOW:
+                self.rejected[name] += 1
+                return False
+            if len(self._waiters) >= self.max_queue:
+                worst = max(self._waiters, key=lambda w: (w.priority, w.seq))
+                if worst.priority <= priority:
+                    self.rejected[name] += 1
+                    return False
+                self._waiters.remove(worst)
+                self.evictions += 1
+                worst.event.set()
+            waiter = _Waiter(priority, next(self._seq))
+            self._waiters.append(waiter)
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if waiter.admitted:
+                self.admitted[name] += 1
+                return True
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.timeouts += 1
+            self.rejected[name] += 1
+            return False
+
+    def release(self, db_ms=None):
+        """Free a slot, hand it to the best waiter and feed the limit"""
+        with self._lock:
+            self.in_flight -= 1
+            if db_ms:
+                self._observe(db_ms)
+            while self._waiters and self.in_flight < int(self.limit):
+                best = min(self._waiters, key=lambda w: (w.priority, w.seq))
+                self._waiters.remove(best)
+                best.admitted = True
+                self.in_flight += 1
+                best.event.set()
+
+    def _observe(self, db_ms):
+        if self.long_rtt is None:
+            self.short_rtt = self.long_rtt = db_ms
+            return
+        self.short_rtt += 0.2 * (db_ms - self.short_rtt)
+        self.long_rtt += 0.01 * (db_ms - self.long_rtt)
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        if gradient >= 1.0 and self.in_flight < self.limit / 2:
+            return  # not limit-bound, so a healthy latency says nothing about the limit
+        target = self.limit * gradient + math.sqrt(self.limit)
+        target = max(self.min_limit, min(self.max_limit, target))
+        self.limit += self.smoothing * (target - self.limit)
+
+    def retry_after(self):
+        """Seconds until the queue has likely drained, at least 1"""
+        rtt = (self.short_rtt or 0) / 1000
+        return max(1, math.ceil(rtt * (len(self._waiters) + 1) / max(1, int(self.limit))))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'queued': len(self._waiters),
+                'short_db_ms': round(self.short_rtt or 0, 3),
+                'long_db_ms': round(self.long_rtt or 0, 3),
+                'admitted': dict(self.admitted),
+                'rejected': dict(self.rejected),
+                'timeouts': self.timeouts,
+                'evictions': self.evictions,
+            }
+
+
+def init_admission_control(app, controller):
+    """Gate every request through controller by its endpoint's priority"""
+
+    @app.before_request
+    def admit_request():
+        priority = ROUTE_PRIORITIES.get(request.endpoint, NORMAL) if request.endpoint else CRITICAL
+        if priority == CRITICAL:
+            return None
+        if not controller.acquire(priority):
+            response = jsonify({'error': 'Server is busy, please retry'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(controller.retry_after())
+            return response
+        g.admitted = True
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        if g.pop('admitted', False):
+            timing = request_timing.get() or {}
+            controller.release(timing.get('db'))
+
+    @app.route('/api/admission/stats', methods=['GET'])
+    def admission_stats():
+        return controller.stats(), 200
@@ -0,0 +1,101 @@
+import logging
+from bson import ObjectId
+from app.models.category_stats import CategoryStats
+from app.models.subscriber_growth import SubscriberGrowth
+from database_setup import ensure_collections, ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlanError(RuntimeError):
+    """Raised in strict mode when a canonical query falls back to COLLSCAN"""
+
+
+def canonical_queries(db):
+    """The query shapes each route issues, as (name, cursor or command) pairs"""
+    probe_id = ObjectId()
+    probe_time = probe_id.generation_time.replace(tzinfo=None)
+    return [
+        ('products.list', db.products.find({}).sort('_id', 1).limit(51)),
+        ('products.list_by_category',
+         db.products.find({'category': 'probe', '_id': {'$gt': probe_id}}).sort('_id', 1).limit(51)),
+        ('products.list_featured',
+         db.products.find({'featured': True, '_id': {'$gt': probe_id}}).sort('_id', 1).limit(51)),
+        ('products.list_featured_by_category',
+         db.products.find({'category': 'probe', 'featured': True, '_id': {'$gt': probe_id}})
+         .sort('_id', 1).limit(51)),
+        ('products.list_by_price',
+         db.products.find({'category': 'probe', 'price': {'$gte': 0, '$lte': 100}})
+         .sort([('price', 1), ('_id', 1)]).limit(51)),
+        ('products.list_by_rating', db.products.find({}).sort([('rating', -1), ('_id', -1)]).limit(51)),
+        ('products.get_by_id', db.products.find({'_id': probe_id}).limit(1)),
+        ('products.get_many', db.products.find({'_id': {'$in': [probe_id, ObjectId()]}})),
+        ('products.find_by_sku', db.products.find({'sku': {'$in': ['probe']}}, {'sku': 1, 'content_hash': 1})),
+        ('products.search',
+         db.products.find({'$text': {'$search': 'probe'}}, {'score': {'$meta': 'textScore'}}).limit(21)),
+        ('categories.stats', db.category_stats.find({'count': {'$gt': 0}}).sort('_id', 1)),
+        ('categories.price_range',
+         db.products.find({'category': 'probe', 'price': {'$ne': None}}, {'price': 1}).sort('price', 1).limit(1)),
+        ('subscribers.find_by_email', db.subscribers.find({'email': 'probe@example.com'}).limit(1)),
+        ('subscribers.list_active',
+         db.subscribers.find({'is_active': True, '_id': {'$gt': probe_id}}).sort('_id', 1)),
+        ('subscribers.growth', db.subscriber_growth.find(*SubscriberGrowth.query('day', probe_time, probe_time))),
+        ('subscribers.growth_backfill',
+         db.subscribers.find({'subscribed_at': {'$type': 'date'}}, {'_id': 0, 'subscribed_at': 1})),
+    ]
+
+
+def plan_stages(plan):
+    """Yield every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+def explain(db, query):
+    """Return the winning plan for a cursor or a raw command"""
+    if isinstance(query, dict):
+        result = db.command('explain', query, verbosity='queryPlanner')
+    else:
+        result = query.explain()
+    return result.get('queryPlanner', {}).get('winningPlan', {})
+
+
+def verify_query_plans(db, strict=False):
+    """Explain each canonical query and report the ones that scan the collection"""
+    collscans = []
+    for name, query in canonical_queries(db):
+        try:
+            stages = set(plan_stages(explain(db, query)))
+        except Exception as e:
+            if strict:
+                raise
+            logger.warning(f"Could not explain {name}: {e}")
+            continue
+        if 'COLLSCAN' in stages:
+            collscans.append(name)
+
+    if collscans:
+        message = f"Queries falling back to COLLSCAN: {', '.join(collscans)}"
+        if strict:
+            raise QueryPlanError(message)
+        logger.warning(message)
+    return collscans
+
+
+def bootstrap_database(db, plan_check='warn'):
+    """Ensure collections and indexes exist, then verify query plans.
+
+    plan_check is 'strict' (raise on COLLSCAN), 'warn' (log it) or 'off'.
+    """
+    ensure_collections(db)
+    ensure_indexes(db)
+    CategoryStats.ensure(db)
+    SubscriberGrowth.ensure(db)
+    if plan_check != 'off':
+        verify_query_plans(db, strict=plan_check == 'strict')
@@ -0,0 +1,169 @@
+import hashlib
+import marshal
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, request
+
+
+class CatalogCache:
+    """Bounded in-process TTL/LRU cache for catalog responses.
+
+    Entries are keyed by the catalog version, so bumping the version on a
+    write drops every cached response at once. The version lives in this
+    process only; the TTL bounds how long other workers serve an old catalog.
+
+    With a SharedCacheClient attached, responses are stored in the shared
+    cache server instead, so every worker sees a write at once and a miss
+    is computed by one worker while the others wait for its result.
+    """
+
+    namespace = 'catalog'
+
+    def __init__(self, maxsize=512, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.shared = None
+
+    @property
+    def enabled(self):
+        """False when CATALOG_CACHE_SIZE is 0 and no shared cache is attached"""
+        return self.maxsize > 0 or self.shared is not None
+
+    def configure(self, maxsize, ttl):
+        """Resize the cache and drop existing entries"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version):
+        """Store value unless the catalog changed since version was read"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump_version(self):
+        """Invalidate every cached entry after a catalog write"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.bump(self.namespace)
+
+    def stats(self):
+        """Return counters used to size the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def fetch_shared(self, key, compute):
+        """Entry for key from the shared cache; compute() fills a miss once for all workers"""
+        def encoded():
+            entry = compute()
+            return None if entry is None else marshal.dumps(entry)
+
+        value, hit = self.shared.fetch(self.namespace, marshal.dumps(key), encoded, self.ttl)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return None if value is None else marshal.loads(value)
+
+
+catalog_cache = CatalogCache()
+
+
+def cache_key():
+    """Build a cache key from the path and the normalized query args"""
+    args = tuple(sorted(
+        (name, tuple(sorted(v for v in values if v != '')))
+        for name, values in request.args.lists()
+    ))
+    return (request.path, args)
+
+
+def cached_response(view):
+    """Serve a GET view from catalog_cache with a strong ETag.
+
+    Only buffered 200 responses are cached. Clients that send a matching
+    If-None-Match get a 304 without a body. Streamed responses, and every
+    response while the cache is off, pass through untouched.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not catalog_cache.enabled:
+            return view(*args, **kwargs)
+        uncached = []
+
+        def compute():
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                uncached.append(response)
+                return None
+            body = response.get_data()
+            return (body, response.mimetype, hashlib.sha1(body).hexdigest())
+
+        key = cache_key()
+        if catalog_cache.shared is not None:
+            entry = catalog_cache.fetch_shared(key, compute)
+        else:
+            entry = catalog_cache.get(key)
+            if entry is None:
+                version = catalog_cache.version
+                entry = compute()
+                if entry is not None:
+                    catalog_cache.set(key, entry, version)
+        if entry is None:
+            return uncached[0]
+
+        body, mimetype, etag = entry
+        response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,72 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from app.models.subscriber import Subscriber
+
+
+class SubscribeCoalescer:
+    """Queue concurrent subscribe requests and flush them as one bulk write.
+
+    A background thread drains the queue every max_delay seconds or as soon
+    as max_batch emails are waiting, and hands each caller the outcome for
+    its own email.
+    """
+
+    def __init__(self, db, max_batch=256, max_delay=0.005):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.flushes = 0
+        self.operations = 0
+
+    def submit(self, email, timeout=None):
+        """Queue an email and wait for its (status, subscriber_id) outcome"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((email.lower().strip(), future))
+        return future.result(timeout)
+
+    def _ensure_started(self):
+        # Restart the flusher in forked workers, where the parent's thread is gone
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name='subscribe-coalescer', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            outcomes = Subscriber.bulk_subscribe(self.db, [email for email, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.flushes += 1
+        self.operations += len(batch)
+        for (_, future), outcome in zip(batch, outcomes):
+            future.set_result(outcome)
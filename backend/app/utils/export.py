@@ -0,0 +1,56 @@
+import csv
+import io
+from app.utils.serialization import default, dumps_bytes
+
+# Flush the output buffer once it holds roughly this many characters
+CHUNK_SIZE = 64 * 1024
+
+
+def _cell(value):
+    """CSV cell for a document value; BSON types are written as the API encodes them"""
+    try:
+        return default(value)
+    except TypeError:
+        return value
+
+
+def ndjson_rows(cursor, fields):
+    """Yield newline-delimited JSON, one document per line, in buffered chunks"""
+    buffer = []
+    size = 0
+    try:
+        for doc in cursor:
+            line = dumps_bytes({f: doc.get(f) for f in fields}) + b'\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+    finally:
+        cursor.close()
+    if buffer:
+        yield b''.join(buffer)
+
+
+def csv_rows(cursor, fields):
+    """Yield CSV with a header row, in buffered chunks"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    try:
+        for doc in cursor:
+            writer.writerow([_cell(doc.get(f)) for f in fields])
+            if out.tell() >= CHUNK_SIZE:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+    finally:
+        cursor.close()
+    yield out.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_rows, 'application/x-ndjson'),
+    'csv': (csv_rows, 'text/csv'),
+}
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from app.utils.mongo import mongo_metrics
+
+
+class DatabaseHeartbeat:
+    """Pings MongoDB from a background thread and caches the outcome.
+
+    Health probes read the cached status instead of making a round trip
+    of their own, so they cost the same however often they are polled and
+    cannot pile up on the workers while Mongo is slow. A status older than
+    stale_after seconds (the heartbeat itself is stuck) counts as not ready.
+    """
+
+    def __init__(self, db, interval=2.0, stale_after=None):
+        self.db = db
+        self.interval = interval
+        self.stale_after = stale_after or interval * 3
+        self.started_at = time.time()
+        self._status = {'database': 'unknown', 'checked_at': None}
+        self._checked = None  # monotonic time of the last ping
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        # Restart the heartbeat in forked workers, where the parent's thread is gone
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._status = {'database': 'unknown', 'checked_at': None}
+                self._checked = None
+                self._thread = threading.Thread(target=self._run, name='db-heartbeat', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            self.beat()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def beat(self):
+        """Ping once and publish the result"""
+        started = time.perf_counter()
+        try:
+            self.db.command('ping')
+            status = {'database': 'connected'}
+        except Exception as e:
+            status = {'database': 'disconnected', 'error': str(e)}
+        status['ping_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        status['checked_at'] = datetime.now(timezone.utc).isoformat()
+        pool = mongo_metrics.snapshot()['pool']
+        status['pool'] = {key: pool[key] for key in ('in_use', 'max_in_use', 'open_connections')}
+        # One assignment, so probes never see a half-written status
+        self._status, self._checked = status, time.monotonic()
+
+    def status(self):
+        """(ready, cached status) without touching the database"""
+        self.ensure_started()
+        status, checked = self._status, self._checked
+        age = None if checked is None else time.monotonic() - checked
+        ready = status['database'] == 'connected' and age is not None and age <= self.stale_after
+        return ready, dict(status, age_seconds=None if age is None else round(age, 3))
+
+
+def init_health_checks(app, heartbeat):
+    """Register /api/health/live and /api/health/ready backed by heartbeat"""
+
+    @app.route('/api/health/live', methods=['GET'])
+    def health_live():
+        # Liveness is the process answering; a Mongo outage must not restart workers
+        return {'status': 'alive', 'pid': os.getpid(),
+                'uptime_seconds': round(time.time() - heartbeat.started_at, 1)}, 200
+
+    @app.route('/api/health/ready', methods=['GET'])
+    def health_ready():
+        ready, status = heartbeat.status()
+        status['status'] = 'ready' if ready else 'unavailable'
+        return status, 200 if ready else 503
+
+    # The heartbeat starts with the first probe, in the worker serving it: a
+    # preloading gunicorn master must not keep a client of its own open
+    return heartbeat
@@ -0,0 +1,268 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from flask import Response, g, request
+from app.utils.metrics import Histogram, HistogramFamily, request_timing
+from app.utils.mongo import mongo_metrics
+from app.utils.procs import pid_alive
+
+
+class RequestMetrics:
+    """Per-route, per-status latency histograms and the in-flight gauge"""
+
+    def __init__(self):
+        self.latency = HistogramFamily()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, route, method, status, ms):
+        self.latency.observe((route, method, str(status)), ms)
+
+    def state(self):
+        """This process's raw metrics, in the form workers exchange"""
+        return {
+            'in_flight': self.in_flight,
+            'pool_in_use': mongo_metrics.in_use,
+            'http': [[list(labels), *h.state()] for labels, h in self.latency.items()],
+            'mongo': [[list(labels), *h.state()] for labels, h in mongo_metrics.commands.items()],
+        }
+
+
+request_metrics = RequestMetrics()
+
+# File in a metrics directory holding the histograms of exited workers
+ARCHIVE = 'dead.json'
+
+
+def merge_states(states):
+    """Merge (state, alive) pairs: histograms always, gauges from live workers only"""
+    merged = {'in_flight': 0, 'pool_in_use': 0, 'http': {}, 'mongo': {}}
+    for state, alive in states:
+        if alive:
+            merged['in_flight'] += state['in_flight']
+            merged['pool_in_use'] += state['pool_in_use']
+        for family in ('http', 'mongo'):
+            for labels, counts, total in state[family]:
+                histogram = merged[family].setdefault(tuple(labels), Histogram())
+                histogram.merge(counts, total)
+    return merged
+
+
+def _histogram_state(merged):
+    """merge_states() output back in the form workers exchange, without gauges"""
+    state = {'in_flight': 0, 'pool_in_use': 0}
+    for family in ('http', 'mongo'):
+        state[family] = [[list(labels), *h.state()] for labels, h in merged[family].items()]
+    return state
+
+
+class MetricsExporter:
+    """Shares this worker's metrics with its siblings through a directory.
+
+    Every worker rewrites <directory>/<pid>.json each interval, and a scrape
+    on any worker merges all the files. An exited worker's histograms are
+    folded into <directory>/dead.json, by gunicorn's child_exit hook or by
+    the next scrape if it died without one, so counts never go backwards
+    and recycled workers do not pile up; gauges only count live workers.
+    """
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def ensure_started(self):
+        # One writer thread per worker process, started after the fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='metrics-exporter', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    @staticmethod
+    def path(directory, pid):
+        return os.path.join(directory, f'{pid}.json')
+
+    @staticmethod
+    def _load(path):
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def archive(directory, pids):
+        """Fold exited workers' files into the archive and remove them.
+
+        Runs under a lock, and a file is removed only after the archive
+        holding it is written, so concurrent scrapes never count it twice.
+        """
+        archive = os.path.join(directory, ARCHIVE)
+        with open(archive + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                states = []
+                paths = []
+                for pid in pids:
+                    path = MetricsExporter.path(directory, pid)
+                    try:
+                        states.append((MetricsExporter._load(path), False))
+                    except FileNotFoundError:
+                        continue  # already archived by another process
+                    except ValueError:
+                        pass  # half-written by a worker killed mid-write
+                    paths.append(path)
+                if not paths:
+                    return
+                try:
+                    states.append((MetricsExporter._load(archive), False))
+                except FileNotFoundError:
+                    pass
+                with open(archive + '.tmp', 'w') as f:
+                    json.dump(_histogram_state(merge_states(states)), f)
+                os.replace(archive + '.tmp', archive)
+                for path in paths:
+                    os.remove(path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def write(self):
+        path = self.path(self.directory, os.getpid())
+        with open(path + '.tmp', 'w') as f:
+            json.dump(request_metrics.state(), f)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        states = [(request_metrics.state(), True)]
+        dead = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name == ARCHIVE:
+                continue
+            try:
+                pid = int(name[:-5])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            if not pid_alive(pid):
+                dead.append(pid)
+                continue
+            try:
+                states.append((self._load(self.path(self.directory, pid)), True))
+            except (OSError, ValueError):
+                continue
+        if dead:
+            try:
+                self.archive(self.directory, dead)
+            except OSError:
+                pass
+        try:
+            states.append((self._load(os.path.join(self.directory, ARCHIVE)), False))
+        except (OSError, ValueError):
+            pass
+        return merge_states(states)
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return ','.join(f'{k}="{v}"' for k, v in pairs)
+
+
+def _histogram_lines(name, help_text, label_names, histograms):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    quantiles = [f'# HELP {name}_quantile Quantiles estimated from {name}',
+                 f'# TYPE {name}_quantile gauge']
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{_labels(label_names, labels, le=bound / 1000)}}} {cumulative}')
+        lines.append(f'{name}_bucket{{{_labels(label_names, labels, le="+Inf")}}} {histogram.count}')
+        lines.append(f'{name}_sum{{{_labels(label_names, labels)}}} {histogram.sum / 1000}')
+        lines.append(f'{name}_count{{{_labels(label_names, labels)}}} {histogram.count}')
+        for q in (0.5, 0.95, 0.99):
+            quantiles.append(
+                f'{name}_quantile{{{_labels(label_names, labels, quantile=q)}}} {histogram.quantile(q) / 1000}'
+            )
+    return lines + quantiles
+
+
+def render_prometheus(merged):
+    """Render merged metrics in the Prometheus text exposition format"""
+    lines = [
+        '# HELP http_requests_in_flight Requests currently being handled',
+        '# TYPE http_requests_in_flight gauge',
+        f"http_requests_in_flight {merged['in_flight']}",
+        '# HELP mongodb_pool_connections_in_use MongoDB connections checked out',
+        '# TYPE mongodb_pool_connections_in_use gauge',
+        f"mongodb_pool_connections_in_use {merged['pool_in_use']}",
+    ]
+    lines += _histogram_lines('http_request_duration_seconds', 'HTTP request latency',
+                              ('route', 'method', 'status'), merged['http'])
+    lines += _histogram_lines('mongodb_command_duration_seconds', 'MongoDB command latency',
+                              ('command',), merged['mongo'])
+    return '\n'.join(lines) + '\n'
+
+
+def init_request_metrics(app, metrics_dir=None, flush_interval=1.0):
+    """Time every request, add Server-Timing headers and serve /api/metrics.
+
+    With metrics_dir set (one shared directory per gunicorn master),
+    /api/metrics aggregates all workers; otherwise it reports this process.
+    """
+    exporter = MetricsExporter(metrics_dir, flush_interval) if metrics_dir else None
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_timing = request_timing.set({'db': 0.0, 'serialize': 0.0})
+        request_metrics.started()
+        if exporter:
+            exporter.ensure_started()
+
+    @app.after_request
+    def record_request_timing(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        total_ms = (time.perf_counter() - started) * 1000
+        timing = request_timing.get() or {}
+        response.headers['Server-Timing'] = (
+            f"db;dur={timing.get('db', 0.0):.2f}, "
+            f"serialize;dur={timing.get('serialize', 0.0):.2f}, "
+            f"total;dur={total_ms:.2f}"
+        )
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.observe(route, request.method, response.status_code, total_ms)
+        return response
+
+    @app.teardown_request
+    def finish_request_timer(exc):
+        token = g.pop('metrics_timing', None)
+        if token is not None:
+            request_timing.reset(token)
+            request_metrics.finished()
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        merged = exporter.collect() if exporter else merge_states([(request_metrics.state(), True)])
+        return Response(render_prometheus(merged), mimetype='text/plain; version=0.0.4')
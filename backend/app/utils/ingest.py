@@ -0,0 +1,134 @@
+import csv
+import json
+from app.models.product import Product
+from app.models.subscriber import Subscriber
+from validators import PRODUCT_IMPORT_SCHEMA, SUBSCRIBER_SCHEMA, validate_batch
+
+INGEST_FORMATS = ('ndjson', 'csv')
+OUTCOMES = ('inserted', 'reactivated', 'duplicate', 'invalid')
+PRODUCT_OUTCOMES = ('inserted', 'updated', 'unchanged', 'duplicate', 'invalid')
+
+
+def detect_format(filename=None, mimetype=None, default='ndjson'):
+    """Guess the upload format from a filename or content type"""
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    if mimetype and 'csv' in mimetype:
+        return 'csv'
+    return default
+
+
+def read_emails(lines, fmt):
+    """Yield the raw email value of each uploaded row (None if unreadable).
+
+    NDJSON rows are either {"email": ...} objects or bare JSON strings;
+    CSV uploads need a header row with an 'email' column.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or 'email' not in reader.fieldnames:
+            raise ValueError("CSV upload needs an 'email' column")
+        for row in reader:
+            yield row.get('email')
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        yield value.get('email') if isinstance(value, dict) else value
+
+
+def ingest_subscribers(db, emails, batch_size=1000):
+    """Yield (row, email, outcome) for every uploaded row.
+
+    Emails are validated and written one batch at a time, so each batch
+    costs a handful of round trips instead of two per row.
+    """
+    batch = []
+    for row, raw in enumerate(emails, start=1):
+        batch.append((row, raw))
+        if len(batch) >= batch_size:
+            yield from _flush(db, batch)
+            batch = []
+    if batch:
+        yield from _flush(db, batch)
+
+
+def _flush(db, batch):
+    valid, invalid = validate_batch(SUBSCRIBER_SCHEMA, [{'email': raw} for _, raw in batch])
+    outcomes = dict(zip((index for index, _ in valid),
+                        Subscriber.bulk_subscribe(db, [doc['email'] for _, doc in valid]) if valid else []))
+    emails = {index: doc['email'] for index, doc in valid}
+    for index, (row, raw) in enumerate(batch):
+        if index in outcomes:
+            yield row, emails[index], outcomes[index][0]
+        else:
+            yield row, raw, 'invalid'
+
+
+def read_records(lines, fmt, required='sku'):
+    """Yield each uploaded row as a dict (None if unreadable).
+
+    CSV uploads need a header row including the required column; empty
+    cells count as missing, so field defaults apply.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or required not in reader.fieldnames:
+            raise ValueError(f"CSV upload needs a '{required}' column")
+        for row in reader:
+            yield {name: value for name, value in row.items() if value not in ('', None)}
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def ingest_products(db, records, batch_size=1000):
+    """Yield (row, sku, outcome, errors) for every uploaded product row.
+
+    Rows are validated and upserted by SKU one batch at a time; rows whose
+    content hash matches the stored document are reported 'unchanged'
+    without a write. errors is None except for 'invalid' rows.
+    """
+    batch = []
+    for row, record in enumerate(records, start=1):
+        batch.append((row, record))
+        if len(batch) >= batch_size:
+            yield from _flush_products(db, batch)
+            batch = []
+    if batch:
+        yield from _flush_products(db, batch)
+
+
+def _flush_products(db, batch):
+    valid, invalid = validate_batch(PRODUCT_IMPORT_SCHEMA, [record for _, record in batch])
+    outcomes = dict(zip((index for index, _ in valid),
+                        Product.bulk_upsert(db, [product for _, product in valid]) if valid else []))
+    errors = dict(invalid)
+    for index, (row, record) in enumerate(batch):
+        sku = record.get('sku') if isinstance(record, dict) else None
+        if index in errors:
+            yield row, sku, 'invalid', errors[index]
+        else:
+            yield row, sku, outcomes[index], None
+
+
+def summarize(results, outcomes=OUTCOMES):
+    """Count outcomes; results is an iterable of (row, key, outcome, ...)"""
+    counts = dict.fromkeys(outcomes, 0)
+    for result in results:
+        counts[result[2]] += 1
+    return counts
@@ -0,0 +1,75 @@
+from concurrent.futures import Future
+from flask import current_app, g
+from app.models.product import Product
+
+
+class _Pending(Future):
+    """A loaded key's result; asking for it runs the loader's queued batch"""
+
+    def __init__(self, loader):
+        super().__init__()
+        self._loader = loader
+
+    def result(self, timeout=None):
+        if not self.done():
+            self._loader.dispatch()
+        return super().result(timeout)
+
+
+class DataLoader:
+    """Coalesce lookups by key into batched calls and remember the results.
+
+    load() queues a key and returns a future without touching the database;
+    the first result() asked for sends every queued key to batch_fn at once
+    (at most max_batch per call). batch_fn takes a list of keys and returns
+    {key: value}; keys it leaves out resolve to None. A key is fetched at
+    most once per loader, so loaders are kept per request and never serve
+    data across requests. A failed batch is not remembered.
+    """
+
+    def __init__(self, batch_fn, max_batch=None):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self._futures = {}
+        self._queue = []
+        self.batches = 0
+
+    def load(self, key):
+        """Future for key's value, shared by every load of the same key"""
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = _Pending(self)
+            self._queue.append(key)
+        return future
+
+    def load_many(self, keys):
+        """Values for keys in order, fetched together"""
+        futures = [self.load(key) for key in keys]
+        return [future.result() for future in futures]
+
+    def dispatch(self):
+        """Fetch every queued key"""
+        while self._queue:
+            size = self.max_batch or len(self._queue)
+            keys, self._queue = self._queue[:size], self._queue[size:]
+            self.batches += 1
+            try:
+                found = self.batch_fn(keys)
+            except Exception as e:
+                for key in keys:
+                    self._futures.pop(key).set_exception(e)
+                continue
+            for key in keys:
+                self._futures[key].set_result(found.get(key))
+
+
+def product_loader():
+    """The current request's DataLoader of products by ObjectId"""
+    loader = g.get('product_loader')
+    if loader is None:
+        db = current_app.config['db']
+        loader = g.product_loader = DataLoader(
+            lambda object_ids: Product.get_many(db, object_ids),
+            max_batch=current_app.config.get('PRODUCTS_BATCH_MAX_IDS'),
+        )
+    return loader
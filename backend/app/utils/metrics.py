@@ -0,0 +1,96 @@
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Latency bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Time spent per phase ('db', 'serialize') in the current request, or None
+# outside a request
+request_timing = ContextVar('request_timing', default=None)
+
+
+def add_timing(phase, ms):
+    """Charge ms to a phase of the current request, if there is one"""
+    timing = request_timing.get()
+    if timing is not None:
+        timing[phase] = timing.get(phase, 0.0) + ms
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with interpolated quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Estimate the q-quantile (0..1) by interpolating inside its bucket"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return float(self.buckets[-1])
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return float(self.buckets[-1])
+
+    def state(self):
+        """Raw bucket counts and sum, for merging across processes"""
+        with self._lock:
+            return list(self.counts), self.sum
+
+    def merge(self, counts, total):
+        """Add another histogram's raw state (same buckets) into this one"""
+        with self._lock:
+            for index, bucket_count in enumerate(counts):
+                self.counts[index] += bucket_count
+            self.count += sum(counts)
+            self.sum += total
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum_ms': round(self.sum, 3),
+            'p50_ms': round(self.quantile(0.50), 3),
+            'p95_ms': round(self.quantile(0.95), 3),
+            'p99_ms': round(self.quantile(0.99), 3),
+        }
+
+
+class HistogramFamily:
+    """Histograms keyed by a label tuple, created on first use"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(labels, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def items(self):
+        with self._lock:
+            return list(self._histograms.items())
@@ -0,0 +1,328 @@
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from pymongo import MongoClient, monitoring
+from app.utils.metrics import HistogramFamily, add_timing
+
+logger = logging.getLogger(__name__)
+
+# Commands whose filter we keep so slow ones can be explained
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct'}
+
+# Command fields that are driver/session metadata, not part of the query
+META_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+
+
+def redact(value):
+    """Replace literal values in a filter with '?' so the log keeps only its shape"""
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return '?'
+
+
+def summarize_plan(plan):
+    """Render a winning plan as 'LIMIT > FETCH > IXSCAN(category_1__id_1)'"""
+    stages = []
+    while isinstance(plan, dict) and plan:
+        # Slot-based engine plans nest the classic tree under queryPlan
+        plan = plan.get('queryPlan', plan)
+        name = plan.get('stage', '?')
+        if plan.get('indexName'):
+            name += f"({plan['indexName']})"
+        stages.append(name)
+        children = plan.get('inputStages') or [plan.get('inputStage')]
+        plan = children[0] if children else None
+    return ' > '.join(stages)
+
+
+class MongoMetrics:
+    """Per-command latency, connection pool and slow query statistics.
+
+    Pool figures are summed across all server pools of the client.
+    """
+
+    def __init__(self, slow_query_ms=100, explain_slow=True, keep_slow=50):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow = explain_slow
+        self.commands = HistogramFamily()
+        self.checkout_wait = HistogramFamily()
+        self.command_failures = Counter()
+        self.checkout_failures = Counter()
+        self.in_use = 0
+        self.max_in_use = 0
+        self.open_connections = 0
+        self.slow_queries = deque(maxlen=keep_slow)
+        self._lock = threading.Lock()
+        self._client = None
+        self._explain_queue = None
+        self._explain_pid = None
+
+    def configure(self, slow_query_ms, explain_slow):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow = explain_slow
+
+    def attach(self, client):
+        """Give the slow-query explainer a client to run explain on"""
+        self._client = client
+
+    def record_slow(self, event, started, duration_ms):
+        entry = {
+            'command': event.command_name,
+            'database': event.database_name,
+            'duration_ms': round(duration_ms, 2),
+            'at': time.time(),
+        }
+        if started is not None:
+            entry['collection'] = started['collection']
+            entry['filter'] = redact(started['filter'])
+        self.slow_queries.append(entry)
+        logger.warning("Slow MongoDB %s took %.1fms: %s", event.command_name, duration_ms, entry.get('filter'))
+
+        if self.explain_slow and started is not None and self._client is not None:
+            self._ensure_explainer()
+            try:
+                self._explain_queue.put_nowait((entry, event.database_name, started['command']))
+            except queue.Full:
+                pass
+
+    def _ensure_explainer(self):
+        # A forked worker inherits the queue but not the thread draining it
+        if self._explain_pid == os.getpid():
+            return
+        with self._lock:
+            if self._explain_pid != os.getpid():
+                self._explain_pid = os.getpid()
+                self._explain_queue = queue.Queue(maxsize=100)
+                threading.Thread(target=self._explain_worker, name='slow-query-explain',
+                                 daemon=True).start()
+
+    def _explain_worker(self):
+        # Runs explain off the request path; the listener skips explain commands
+        while True:
+            entry, database, command = self._explain_queue.get()
+            try:
+                result = self._client[database].command('explain', command, verbosity='queryPlanner')
+                entry['plan'] = summarize_plan(result.get('queryPlanner', {}).get('winningPlan'))
+                logger.warning("Slow MongoDB %s plan: %s", entry['command'], entry['plan'])
+            except Exception as e:
+                entry['plan'] = f"explain failed: {e}"
+
+    def snapshot(self):
+        return {
+            'commands': {name: h.snapshot() for (name,), h in self.commands.items()},
+            'command_failures': dict(self.command_failures),
+            'pool': {
+                'in_use': self.in_use,
+                'max_in_use': self.max_in_use,
+                'open_connections': self.open_connections,
+                'checkout_wait': {addr: h.snapshot() for (addr,), h in self.checkout_wait.items()},
+                'checkout_failures': dict(self.checkout_failures),
+            },
+            'slow_queries': list(self.slow_queries),
+        }
+
+
+mongo_metrics = MongoMetrics()
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """Records per-command latency and feeds the slow-query log"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._started = {}
+
+    def started(self, event):
+        if event.command_name not in EXPLAINABLE:
+            return
+        command = {k: v for k, v in event.command.items()
+                   if not k.startswith('$') and k not in META_FIELDS}
+        self._started[(event.request_id, event.connection_id)] = {
+            'collection': command.get(event.command_name),
+            'filter': command.get('filter', command.get('query', command.get('pipeline', {}))),
+            'command': command,
+        }
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self.metrics.command_failures[event.command_name] += 1
+        self._finish(event)
+
+    def _finish(self, event):
+        started = self._started.pop((event.request_id, event.connection_id), None)
+        if event.command_name == 'explain':
+            return
+        duration_ms = event.duration_micros / 1000
+        add_timing('db', duration_ms)
+        self.metrics.commands.observe((event.command_name,), duration_ms)
+        if duration_ms >= self.metrics.slow_query_ms:
+            self.metrics.record_slow(event, started, duration_ms)
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Tracks checkout wait time, connections in use and pool starvation"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            self.metrics.checkout_wait.observe(
+                (f'{event.address[0]}:{event.address[1]}',), (time.perf_counter() - started) * 1000
+            )
+        with self.metrics._lock:
+            self.metrics.in_use += 1
+            self.metrics.max_in_use = max(self.metrics.max_in_use, self.metrics.in_use)
+
+    def connection_check_out_failed(self, event):
+        # reason 'timeout' means the wait queue timed out: pool starvation
+        self.metrics.checkout_failures[event.reason] += 1
+
+    def connection_checked_in(self, event):
+        with self.metrics._lock:
+            self.metrics.in_use -= 1
+
+    def connection_created(self, event):
+        with self.metrics._lock:
+            self.metrics.open_connections += 1
+
+    def connection_closed(self, event):
+        with self.metrics._lock:
+            self.metrics.open_connections -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+def client_options(config):
+    """MongoClient pool and timeout settings from a Config mapping"""
+    options = {
+        'maxPoolSize': config['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': config['MONGO_MIN_POOL_SIZE'],
+        'maxIdleTimeMS': config['MONGO_MAX_IDLE_TIME_MS'],
+        'waitQueueTimeoutMS': config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        'connectTimeoutMS': config['MONGO_CONNECT_TIMEOUT_MS'],
+        'serverSelectionTimeoutMS': config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+    }
+    if config['MONGO_SOCKET_TIMEOUT_MS']:
+        options['socketTimeoutMS'] = config['MONGO_SOCKET_TIMEOUT_MS']
+    if config['MONGO_MONITORING']:
+        mongo_metrics.configure(config['SLOW_QUERY_MS'], config['SLOW_QUERY_EXPLAIN'])
+        options['event_listeners'] = [CommandLatencyListener(mongo_metrics), PoolListener(mongo_metrics)]
+    return options
+
+
+def create_mongo_client(config, client_class=MongoClient):
+    """Build a client sized and instrumented from a Config mapping"""
+    client = client_class(config['MONGO_URI'], **client_options(config))
+    if config['MONGO_MONITORING']:
+        # Motor clients wrap a synchronous MongoClient the explainer can use
+        mongo_metrics.attach(getattr(client, 'delegate', client))
+    return client
+
+
+# Every ForkSafeClient, so server hooks can close or reopen them all
+_fork_safe_clients = weakref.WeakSet()
+
+
+class ForkSafeClient:
+    """MongoClient created on first use in each process.
+
+    A MongoClient is not fork-safe: its monitor threads and sockets do not
+    survive into a forked worker. This handle builds its client lazily and
+    rebuilds it whenever the pid changes, so an app can be imported (and
+    bootstrap the database) in a gunicorn master before workers are forked.
+    """
+
+    def __init__(self, config, client_class=MongoClient):
+        self.config = config
+        self.client_class = client_class
+        self.database = LazyDatabase(self)
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _fork_safe_clients.add(self)
+
+    def _connect(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                client = create_mongo_client(self.config, self.client_class)
+                self._client, self._db = client, client.get_database()
+                self._pid = os.getpid()
+
+    @property
+    def client(self):
+        if self._pid != os.getpid():
+            self._connect()
+        return self._client
+
+    def get_database(self):
+        if self._pid != os.getpid():
+            self._connect()
+        return self._db
+
+    def close(self):
+        """Close this process's client; the next use opens a new one"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = self._db = self._pid = None
+
+    def reopen(self):
+        """Drop a client inherited across fork and connect a new one now"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # The parent's copy is left alone; closing it here would touch its sockets
+                self._client = self._db = self._pid = None
+        self._connect()
+
+
+class LazyDatabase:
+    """Stands in for a Database, resolving it through a ForkSafeClient on each use"""
+
+    def __init__(self, handle):
+        self._handle = handle
+
+    def __getattr__(self, name):
+        return getattr(self._handle.get_database(), name)
+
+    def __getitem__(self, name):
+        return self._handle.get_database()[name]
+
+
+def close_clients():
+    """Close every ForkSafeClient's client in this process (gunicorn master before fork)"""
+    for handle in list(_fork_safe_clients):
+        handle.close()
+
+
+def reopen_clients():
+    """Give every ForkSafeClient a client of this process's own (gunicorn post_fork)"""
+    for handle in list(_fork_safe_clients):
+        handle.reopen()
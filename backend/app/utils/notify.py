@@ -0,0 +1,19 @@
+from config import Config
+from app.utils.cache import CatalogCache
+from app.utils.shared_cache import SharedCacheClient
+from app.utils.snapshots import catalog_snapshots
+
+
+def notify_api(db):
+    """Rebuild the listing snapshots and drop shared cached responses on this host.
+
+    For scripts that write the catalog behind the API's back (imports,
+    seeding); reads the same Config settings the API runs with.
+    """
+    if Config.SNAPSHOT_DIR:
+        catalog_snapshots.configure(Config.SNAPSHOT_DIR, Config.PRODUCTS_PAGE_SIZE,
+                                    catalog_snapshots.namespace(db, Config.MONGO_URI),
+                                    Config.SNAPSHOT_MAX_AGE_SECONDS)
+        catalog_snapshots.refresh(db)
+    if Config.SHARED_CACHE_SOCKET:
+        SharedCacheClient(Config.SHARED_CACHE_SOCKET).bump(CatalogCache.namespace)
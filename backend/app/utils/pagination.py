@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.utils.serialization import dumps_bytes
+
+
+def encode_cursor(last_id, last_value=None, sort='default'):
+    """Encode the last seen sort key and _id as an opaque page token"""
+    payload = json.dumps([sort, last_value, str(last_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort='default'):
+    """Decode a page token into (last_value, last_id); None for the first page.
+
+    Tokens are bound to the sort they were issued for, so a token cannot be
+    replayed against a different ordering.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        token_sort, last_value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if token_sort != sort:
+            raise ValueError
+        return last_value, ObjectId(last_id)
+    except (binascii.Error, InvalidId, TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid page token')
+
+
+def parse_limit(value, default, maximum):
+    """Parse the ?limit= argument, capped at maximum"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, maximum)
+
+
+def parse_page(value):
+    """Parse the 1-based ?page= argument"""
+    if value is None or value == '':
+        return 1
+    try:
+        page = int(value)
+    except ValueError:
+        raise ValueError('page must be an integer')
+    if page < 1:
+        raise ValueError('page must be at least 1')
+    return page
+
+
+def parse_price(value, name):
+    """Parse an optional non-negative price bound such as ?min_price="""
+    if value is None or value == '':
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+    if price < 0:
+        raise ValueError(f'{name} must not be negative')
+    return price
+
+
+def parse_fields(value, allowed):
+    """Parse the ?fields= argument into a Mongo projection"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return {field: 1 for field in fields}
+
+
+def stream_page(cursor, limit, key='products', sort='default', sort_field='_id'):
+    """Yield a page of documents as JSON chunks, one document at a time.
+
+    The cursor must be built with limit + 1 so the extra document tells us
+    whether a next page exists. The first chunk already contains the first
+    document, so callers can pull it eagerly to surface database errors
+    before the response starts. The next token records sort_field of the
+    last document so the following page can resume after it.
+    """
+    count = 0
+    last_id = None
+    last_value = None
+    has_more = False
+    prefix = b'{"%s":[' % key.encode('ascii')
+    try:
+        for doc in cursor:
+            if count == limit:
+                has_more = True
+                break
+            last_id = doc['_id']
+            if sort_field != '_id':
+                last_value = doc.get(sort_field)
+            yield prefix + dumps_bytes(doc)
+            prefix = b','
+            count += 1
+    finally:
+        cursor.close()
+
+    next_token = encode_cursor(last_id, last_value, sort) if has_more else None
+    yield b'%s],"count":%d,"next":%s}' % (
+        prefix if count == 0 else b'', count, dumps_bytes(next_token)
+    )
+
+
+def build_page(docs, limit, key='products', sort='default', sort_field='_id'):
+    """Build the same page body as stream_page from an already fetched list"""
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_token = None
+    if has_more:
+        last = docs[-1]
+        last_value = last.get(sort_field) if sort_field != '_id' else None
+        next_token = encode_cursor(last['_id'], last_value, sort)
+    return {key: docs, 'count': len(docs), 'next': next_token}
@@ -0,0 +1,182 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class PrefixIndex:
+    """In-memory inverted index over product names for type-ahead.
+
+    Tokens are kept sorted so a prefix lookup is a bisect plus a scan that
+    stops once enough products are found, so a one-letter prefix costs no
+    more than a full word.
+    The index is built at startup and catches up in the background:
+    Product.create and bulk_upsert re-index products in this process, other
+    workers' inserts are pulled in by _id every refresh_interval seconds,
+    and every rebuild_interval seconds a full build replaces the index,
+    picking up what the _id scan cannot see (lower ids inserted elsewhere,
+    renames and deletes by other processes).
+    """
+
+    def __init__(self, refresh_interval=30, rebuild_interval=600):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._postings = {}
+        self._tokens = []
+        self._products = {}
+        self._last_id = None
+        self._synced_at = None
+        self._rebuilt_at = None
+        self._lock = threading.Lock()
+        # Held by the one thread syncing with the database
+        self._syncing = threading.Lock()
+
+    @property
+    def built(self):
+        return self._synced_at is not None
+
+    @staticmethod
+    def _product_tokens(product):
+        return set(tokenize(product.get('name'))) | set(tokenize(product.get('category')))
+
+    def _add(self, product):
+        # Caller holds self._lock (or owns an index no one else can see yet)
+        product_id = product['_id']
+        self._remove(product_id)
+        self._products[product_id] = {
+            '_id': str(product_id),
+            'name': product.get('name', ''),
+            'category': product.get('category', '')
+        }
+        for token in self._product_tokens(product):
+            ids = self._postings.get(token)
+            if ids is None:
+                # A dict keeps postings in insertion (_id) order for a stable scan
+                self._postings[token] = ids = {}
+                insort(self._tokens, token)
+            ids[product_id] = None
+
+    def _remove(self, product_id):
+        # Drop a product's old tokens, so a renamed product stops matching them
+        old = self._products.pop(product_id, None)
+        if old is None:
+            return
+        for token in self._product_tokens(old):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.pop(product_id, None)
+            if not ids:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def add(self, product):
+        """Index one product document (must carry _id and name), replacing its old entry"""
+        with self._lock:
+            self._add(product)
+
+    def sync(self, db, force=False):
+        """Catch up with the products collection.
+
+        The first call (or force=True) builds the index on the calling
+        thread; call it at startup. Later calls return at once and, when
+        refresh_interval has passed, start one background thread to catch
+        up, so requests never wait for a collection scan.
+        """
+        if force or not self.built:
+            with self._syncing:
+                if force or not self.built:
+                    self._rebuild(db)
+            return
+        if time.monotonic() - self._synced_at < self.refresh_interval:
+            return
+        if not self._syncing.acquire(blocking=False):
+            return  # another thread is already catching up
+
+        def run():
+            try:
+                if time.monotonic() - self._rebuilt_at >= self.rebuild_interval:
+                    self._rebuild(db)
+                else:
+                    self._catch_up(db)
+            except Exception:
+                logger.exception("Type-ahead index sync failed")
+            finally:
+                self._syncing.release()
+
+        threading.Thread(target=run, name='typeahead-sync', daemon=True).start()
+
+    def _rebuild(self, db):
+        # Build a fresh index off to the side, then swap it in under the lock
+        fresh = PrefixIndex()
+        for product in db.products.find({}, {'name': 1, 'category': 1}).sort('_id', 1):
+            fresh._add(product)
+            fresh._last_id = product['_id']
+        with self._lock:
+            self._postings, self._tokens, self._products = fresh._postings, fresh._tokens, fresh._products
+            self._last_id = fresh._last_id
+        self._synced_at = self._rebuilt_at = time.monotonic()
+
+    def _catch_up(self, db):
+        # Pull products inserted after the newest one indexed
+        query = {'_id': {'$gt': self._last_id}} if self._last_id is not None else {}
+        for product in db.products.find(query, {'name': 1, 'category': 1}).sort('_id', 1):
+            self.add(product)
+            self._last_id = product['_id']
+        self._synced_at = time.monotonic()
+
+    def _prefix_ids(self, prefix):
+        # Product ids under every token starting with prefix: tokens in
+        # lexicographic order, each token's products in the order they were
+        # indexed (_id order after a rebuild)
+        tokens = self._tokens
+        i = bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            yield from self._postings[tokens[i]]
+            i += 1
+
+    def suggest(self, query, limit=10, category=None):
+        """Return products whose tokens start with every query token.
+
+        Candidates are drawn from the longest query token's prefix and
+        checked against the rest. The scan stops at the first limit matches
+        in _prefix_ids order (matching tokens alphabetically, then indexing
+        order), so it is not a ranking: only those matches are sorted, by
+        name length and then name.
+        """
+        tokens = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not tokens:
+            return []
+        lead, rest = tokens[0], tokens[1:]
+        products = []
+        seen = set()
+        with self._lock:
+            for product_id in self._prefix_ids(lead):
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                product = self._products[product_id]
+                if category and product['category'] != category:
+                    continue
+                if rest:
+                    words = self._product_tokens(product)
+                    if not all(any(w.startswith(t) for w in words) for t in rest):
+                        continue
+                products.append(product)
+                if len(products) >= limit:
+                    break
+        products.sort(key=lambda p: (len(p['name']), p['name']))
+        return products
+
+
+search_index = PrefixIndex()
@@ -0,0 +1,92 @@
+import json
+import time
+from datetime import date, datetime
+from bson import ObjectId, decode_all
+from bson.decimal128 import Decimal128
+from flask.json.provider import JSONProvider
+from app.utils.metrics import add_timing
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback keeps the API working
+    orjson = None
+
+
+def default(value):
+    """Encode the BSON types MongoDB documents carry"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps_bytes(obj, sort_keys=False):
+    """Serialize obj to compact UTF-8 JSON, handling ObjectId and datetime.
+
+    datetimes are written as ISO 8601 (naive values are UTC, as pymongo
+    returns them), so documents need no per-field conversion first.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, default=default, sort_keys=sort_keys,
+                      separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask/Quart JSON provider built on orjson.
+
+    jsonify() responses are encoded straight to bytes, and the encoding
+    time is charged to the request's 'serialize' Server-Timing phase.
+    Keys keep insertion order unless sort_keys is set.
+    """
+
+    mimetype = 'application/json'
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj, kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = dumps_bytes(obj, self.sort_keys)
+        add_timing('serialize', (time.perf_counter() - started) * 1000)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def raw_json_array(raw_batches, key):
+    """Stream {key: [...], "count": n} from a find_raw_batches() cursor.
+
+    Each server batch is decoded with one bson.decode_all call and encoded
+    with one JSON call, skipping the per-document cursor iteration of a
+    regular find(). The first chunk carries the first batch, so callers can
+    pull it eagerly to surface database errors before the response starts.
+    """
+    count = 0
+    prefix = b'{"%s":[' % key.encode('ascii')
+    try:
+        for batch in raw_batches:
+            docs = decode_all(batch)
+            if not docs:
+                continue
+            yield prefix + dumps_bytes(docs)[1:-1]
+            prefix = b','
+            count += len(docs)
+    finally:
+        raw_batches.close()
+    yield b'%s],"count":%d}' % (prefix if count == 0 else b'', count)
@@ -0,0 +1,343 @@
+"""Cache shared by all workers on one host, served over a Unix socket.
+
+One CacheServer holds the entries; every worker talks to it through a
+SharedCacheClient. Values are opaque bytes to the server, so its memory
+accounting is exact. Keys live in namespaces whose version can be bumped
+to drop everything cached for it, and fetch() collapses concurrent misses
+for a key into a single computation across all workers.
+
+Run the server on its own with:
+
+    python -m app.utils.shared_cache /tmp/ecommerce-cache.sock --max-bytes 67108864
+"""
+import argparse
+import fcntl
+import logging
+import marshal
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+
+
+def send_frame(sock, obj):
+    payload = marshal.dumps(obj)
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('cache connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    size, = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return marshal.loads(_recv_exact(sock, size))
+
+
+class CacheStore:
+    """Byte-bounded TTL/LRU store with namespace versions and miss leases"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.versions = {}
+        self._entries = OrderedDict()  # (ns, version, key) -> (expires_at, value)
+        self._leases = {}  # (ns, version, key) -> lease deadline
+        self._cond = threading.Condition()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+        self.collapsed = 0
+
+    def _lookup(self, full_key, now):
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            self._drop(full_key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(full_key)
+        return value
+
+    def _drop(self, full_key):
+        _, value = self._entries.pop(full_key)
+        self.bytes -= len(full_key[2]) + len(value)
+
+    def fetch(self, ns, key, lease_seconds):
+        """('hit', value), ('lease', version) for the caller to fill, or ('miss', version)"""
+        with self._cond:
+            version = self.versions.get(ns, 0)
+            full_key = (ns, version, key)
+            deadline = time.monotonic() + lease_seconds
+            waited = False
+            while True:
+                now = time.monotonic()
+                value = self._lookup(full_key, now)
+                if value is not None:
+                    self.hits += 1
+                    if waited:
+                        self.collapsed += 1
+                    return ('hit', value)
+                lease = self._leases.get(full_key)
+                if lease is None or lease <= now:
+                    self.misses += 1
+                    self._leases[full_key] = now + lease_seconds
+                    return ('lease', version)
+                if now >= deadline:
+                    # The filler is stuck; compute without caching rather than wait longer
+                    self.misses += 1
+                    return ('miss', version)
+                waited = True
+                self._cond.wait(min(lease, deadline) - now)
+
+    def set(self, ns, version, key, value, ttl):
+        with self._cond:
+            full_key = (ns, version, key)
+            self._leases.pop(full_key, None)
+            self._cond.notify_all()
+            if version != self.versions.get(ns, 0):
+                return False  # computed from a catalog that has since changed
+            size = len(key) + len(value)
+            if size > self.max_bytes:
+                self.rejected += 1
+                return False
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (time.monotonic() + ttl, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            return True
+
+    def release(self, ns, version, key):
+        """Give up a lease without a value, waking one of the waiters to retry"""
+        with self._cond:
+            self._leases.pop((ns, version, key), None)
+            self._cond.notify_all()
+
+    def bump(self, ns):
+        with self._cond:
+            self.versions[ns] = self.versions.get(ns, 0) + 1
+            for full_key in [k for k in self._entries if k[0] == ns]:
+                self._drop(full_key)
+            self._leases = {k: v for k, v in self._leases.items() if k[0] != ns}
+            self._cond.notify_all()
+            return self.versions[ns]
+
+    def stats(self):
+        with self._cond:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'collapsed': self.collapsed,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'rejected': self.rejected,
+                'leases': len(self._leases),
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'versions': dict(self.versions),
+            }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                op, *args = recv_frame(self.request)
+            except (ConnectionError, OSError, EOFError, ValueError):
+                return
+            if op == 'fetch':
+                reply = store.fetch(*args)
+            elif op == 'set':
+                reply = store.set(*args)
+            elif op == 'release':
+                reply = store.release(*args)
+            elif op == 'bump':
+                reply = store.bump(*args)
+            elif op == 'stats':
+                reply = store.stats()
+            else:
+                reply = None
+            try:
+                send_frame(self.request, reply)
+            except OSError:
+                return
+
+
+class CacheServer(socketserver.ThreadingUnixStreamServer):
+    """Threaded Unix socket server around a CacheStore"""
+
+    daemon_threads = True
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.store = CacheStore(max_bytes)
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+
+    def start(self):
+        """Serve from a daemon thread; returns self"""
+        threading.Thread(target=self.serve_forever, name='shared-cache', daemon=True).start()
+        return self
+
+
+def ensure_server(path, max_bytes):
+    """Start an in-process server on path unless one is already answering.
+
+    Workers race to call this at startup; a lock file picks one winner and
+    a stale socket left by a dead server is replaced.
+    """
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            probe = socket.socket(socket.AF_UNIX)
+            try:
+                probe.connect(path)
+                return None
+            except OSError:
+                pass
+            finally:
+                probe.close()
+            if os.path.exists(path):
+                os.unlink(path)
+            server = CacheServer(path, max_bytes).start()
+            logger.info("Shared cache server started on %s in pid %d", path, os.getpid())
+            return server
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class SharedCacheClient:
+    """Per-thread connections to a CacheServer.
+
+    Any socket error makes the call behave like a miss (fetch computes the
+    value itself), so the API keeps working while the server restarts. With
+    embed_max_bytes set, a client that cannot connect starts a new embedded
+    server itself, so the cache survives the worker hosting it exiting.
+    """
+
+    def __init__(self, path, lease_seconds=2.0, timeout=1.0, embed_max_bytes=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.timeout = timeout
+        self.embed_max_bytes = embed_max_bytes
+        self.errors = 0
+        self.restarts = 0
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = socket.socket(socket.AF_UNIX)
+        try:
+            conn.connect(self.path)
+        except OSError:
+            if self.embed_max_bytes is None:
+                conn.close()
+                raise
+            # The hosting worker is gone; ensure_server lets one caller replace it
+            logger.warning("Shared cache server on %s is not answering; restarting it", self.path)
+            if ensure_server(self.path, self.embed_max_bytes) is not None:
+                self.restarts += 1
+            conn.close()
+            conn = socket.socket(socket.AF_UNIX)
+            try:
+                conn.connect(self.path)
+            except OSError:
+                conn.close()
+                raise
+        return conn
+
+    def _call(self, *request, timeout=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn, self._local.pid = conn, os.getpid()
+        try:
+            conn.settimeout(timeout or self.timeout)
+            send_frame(conn, request)
+            return recv_frame(conn)
+        except Exception:
+            self._local.conn = None
+            conn.close()
+            raise
+
+    def fetch(self, ns, key, compute, ttl):
+        """Return the cached value for key, computing it at most once cluster-wide.
+
+        compute() returns bytes to cache, or None to answer without caching.
+        Returns (value, hit).
+        """
+        try:
+            reply = self._call('fetch', ns, key, self.lease_seconds,
+                               timeout=self.lease_seconds + self.timeout)
+        except (OSError, ConnectionError, EOFError, ValueError):
+            self.errors += 1
+            return compute(), False
+        if reply[0] == 'hit':
+            return reply[1], True
+
+        value = compute()
+        if reply[0] == 'lease':
+            try:
+                if value is None:
+                    self._call('release', ns, reply[1], key)
+                else:
+                    self._call('set', ns, reply[1], key, value, ttl)
+            except (OSError, ConnectionError, EOFError, ValueError):
+                self.errors += 1
+        return value, False
+
+    def bump(self, ns):
+        try:
+            return self._call('bump', ns)
+        except (OSError, ConnectionError, EOFError, ValueError):
+            self.errors += 1
+            return None
+
+    def stats(self):
+        try:
+            stats = self._call('stats')
+        except (OSError, ConnectionError, EOFError, ValueError):
+            stats = {'unavailable': True}
+        stats['client_errors'] = self.errors
+        stats['client_restarts'] = self.restarts
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared catalog cache server')
+    parser.add_argument('path', help="Unix socket path")
+    parser.add_argument('--max-bytes', type=int, default=64 * 1024 * 1024)
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        os.unlink(args.path)
+    server = CacheServer(args.path, args.max_bytes)
+    print(f"✅ Shared cache listening on {args.path}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
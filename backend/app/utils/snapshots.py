@@ -0,0 +1,262 @@
+import fcntl
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, request, send_file
+from app.models.product import Product
+from app.utils.pagination import stream_page
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip snapshots are always written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Preferred order when the client accepts several encodings
+ENCODINGS = ('br', 'gzip', 'identity') if brotli else ('gzip', 'identity')
+SUFFIXES = {'identity': '.json', 'gzip': '.json.gz', 'br': '.json.br'}
+
+
+class CatalogSnapshots:
+    """Prebuilt first pages of the hottest product listings, on disk.
+
+    Each rebuild writes a new generation directory holding one JSON body
+    per view (all products, featured, each category) plus gzip and brotli
+    copies, then swaps the 'current' symlink to it. The swap is atomic and
+    the directory is shared, so every worker serves the same generation.
+
+    Snapshots live under a subdirectory per database, and a generation
+    older than max_age seconds is not served: writes this process never
+    sees (other hosts, seed_data.py, direct edits) show up within max_age.
+    The first request to find it stale rebuilds it in the background.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.page_size = 50
+        self.max_age = 60
+        # (symlink target, manifest) swapped as one tuple so threads see a pair
+        self._current = (None, {})
+        # Guards the two flags below: a background rebuild is running, and a
+        # write arrived that it has to rebuild for
+        self._state = threading.Lock()
+        self._rebuilding = False
+        self._written = False
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    @staticmethod
+    def namespace(db, uri):
+        """Subdirectory name for a database: its name and a hash of the server URI"""
+        return f"{db.name}-{hashlib.sha1((uri or '').encode('utf-8')).hexdigest()[:8]}"
+
+    def configure(self, directory, page_size, namespace='default', max_age=60):
+        self.directory = os.path.join(os.path.abspath(directory), namespace) if directory else None
+        self.page_size = page_size
+        self.max_age = max_age
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def view_key(args):
+        """Snapshot key for listing query args, or None if not a snapshot view"""
+        names = set(args.keys())
+        if not names:
+            return 'all'
+        if names == {'featured'} and args['featured'].lower() == 'true':
+            return 'featured'
+        if names == {'category'} and args['category']:
+            return 'category:' + args['category']
+        return None
+
+    def views(self, db):
+        yield 'all', {}
+        yield 'featured', {'featured': True}
+        for category in Product.get_categories(db):
+            yield 'category:' + category, {'category': category}
+
+    @contextmanager
+    def _locked(self):
+        # Serializes rebuilds across workers, so the last write is always rebuilt last
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _age(self):
+        # Seconds since the current generation was built, or None without one
+        try:
+            with open(os.path.join(self.directory, 'current', 'manifest.json')) as f:
+                return time.time() - json.load(f)['built_at']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def rebuild(self, db, if_older_than=None):
+        """Write a fresh generation of every view and make it current.
+
+        With if_older_than, skip the rebuild when another process made the
+        current generation more recently than that many seconds ago.
+        """
+        with self._locked():
+            if if_older_than is not None:
+                age = self._age()
+                if age is not None and age < if_older_than:
+                    return
+            generation = tempfile.mkdtemp(prefix='gen-', dir=self.directory)
+            manifest = {'built_at': time.time()}
+            for key, filters in self.views(db):
+                cursor = Product.find_page(db, limit=self.page_size + 1, **filters)
+                body = b''.join(stream_page(cursor, self.page_size))
+                name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+                self._write(os.path.join(generation, name), body)
+                manifest[key] = {'file': name, 'etag': hashlib.sha1(body).hexdigest()}
+            with open(os.path.join(generation, 'manifest.json'), 'w') as f:
+                json.dump({'built_at': manifest.pop('built_at'), 'views': manifest}, f)
+            os.chmod(generation, 0o755)
+
+            link = os.path.join(self.directory, 'current')
+            staging = f'{link}.{os.getpid()}'
+            os.symlink(os.path.basename(generation), staging)
+            os.replace(staging, link)
+            self._prune(keep=2)
+        logger.info("Rebuilt %d catalog snapshots in %s", len(manifest), generation)
+
+    @staticmethod
+    def _write(path, body):
+        with open(path + SUFFIXES['identity'], 'wb') as f:
+            f.write(body)
+        with open(path + SUFFIXES['gzip'], 'wb') as f:
+            # mtime=0 keeps the bytes identical for identical catalogs
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli:
+            with open(path + SUFFIXES['br'], 'wb') as f:
+                f.write(brotli.compress(body, quality=11))
+
+    def _prune(self, keep):
+        # The previous generation stays for requests that already resolved it
+        generations = sorted(glob.glob(os.path.join(self.directory, 'gen-*')), key=os.path.getmtime)
+        for old in generations[:-keep]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def invalidate(self):
+        """Stop serving snapshots until the next rebuild"""
+        try:
+            os.unlink(os.path.join(self.directory, 'current'))
+        except FileNotFoundError:
+            pass
+
+    def refresh(self, db):
+        """Invalidate, then rebuild; called after catalog writes"""
+        self.invalidate()
+        try:
+            self.rebuild(db)
+        except Exception:
+            # Listings fall back to the database until a rebuild succeeds
+            logger.exception("Catalog snapshot rebuild failed")
+
+    def refresh_async(self, db, written=False):
+        """Rebuild from a background thread, at most one at a time.
+
+        Only a stale generation is rebuilt, unless written says the catalog
+        just changed: then the rebuild always runs, and a rebuild already
+        under way runs once more when it finishes so it cannot miss the write.
+        """
+        with self._state:
+            self._written = self._written or written
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            while True:
+                with self._state:
+                    written, self._written = self._written, False
+                try:
+                    self.rebuild(db, if_older_than=None if written else self.max_age)
+                except Exception:
+                    # Listings fall back to the database until a rebuild succeeds
+                    logger.exception("Catalog snapshot rebuild failed")
+                with self._state:
+                    if not self._written:
+                        self._rebuilding = False
+                        return
+
+        threading.Thread(target=run, name='snapshot-rebuild', daemon=True).start()
+
+    def lookup(self, key):
+        """Return (generation dir, manifest entry) for key, or None.
+
+        Also None when the current generation is older than max_age; use
+        is_stale() to tell that case apart.
+        """
+        try:
+            target = os.readlink(os.path.join(self.directory, 'current'))
+        except OSError:
+            return None
+        loaded, manifest = self._current
+        if target != loaded:
+            try:
+                with open(os.path.join(self.directory, target, 'manifest.json')) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._current = (target, manifest)
+        if self.is_stale(manifest):
+            return None
+        entry = manifest.get('views', {}).get(key)
+        return (os.path.join(self.directory, target), entry) if entry else None
+
+    def is_stale(self, manifest=None):
+        """True when the loaded generation is older than max_age"""
+        manifest = self._current[1] if manifest is None else manifest
+        built_at = manifest.get('built_at')
+        return bool(self.max_age) and (built_at is None or time.time() - built_at > self.max_age)
+
+    def send(self, generation, entry):
+        """Send the best encoding the client accepts, via sendfile where available"""
+        accepted = request.accept_encodings
+        encoding = next(e for e in ENCODINGS if e == 'identity' or accepted[e])
+        path = os.path.join(generation, entry['file'] + SUFFIXES[encoding])
+        response = send_file(path, mimetype='application/json', conditional=True,
+                             etag=f"{entry['etag']}-{encoding}", last_modified=None, max_age=None)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+catalog_snapshots = CatalogSnapshots()
+
+
+def snapshot_response(view):
+    """Serve a listing from catalog_snapshots when its args match a snapshot view"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if catalog_snapshots.enabled:
+            key = catalog_snapshots.view_key(request.args)
+            found = catalog_snapshots.lookup(key) if key else None
+            if found:
+                try:
+                    return catalog_snapshots.send(*found)
+                except FileNotFoundError:
+                    pass  # pruned under us; answer from the database
+            elif key and catalog_snapshots.is_stale():
+                # Answer from the database while the generation is rebuilt
+                catalog_snapshots.refresh_async(current_app.config['db'])
+        return view(*args, **kwargs)
+    return wrapper
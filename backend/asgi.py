@@ -0,0 +1,9 @@
+import os
+from app.aio import create_async_app
+
+app = create_async_app(os.getenv('FLASK_ENV', 'production'))
+
+# uvicorn asgi:app --workers 4 --host 0.0.0.0 --port 5000
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,61 @@
+"""Compare the sync WSGI stack with the async ASGI stack at equal worker counts.
+
+Run from backend/ with the ASGI extras installed (requirements-asgi.txt)
+and MONGO_URI pointing at a seeded database:
+
+    python -m benchmarks.bench_asgi --workers 4 --concurrency 64
+"""
+import argparse
+import json
+import os
+
+from benchmarks.loadgen import free_port, run_load, start_server, stop_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = [
+    '/api/products?limit=20',
+    '/api/products?limit=20&sort=price_asc',
+    '/api/categories',
+    '/api/products/search?q=wireless',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--output', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    stacks = {
+        'wsgi_gunicorn_sync': lambda port: [
+            'gunicorn', '--workers', str(args.workers), '--bind', f'127.0.0.1:{port}', 'run:app'
+        ],
+        'asgi_uvicorn': lambda port: [
+            'uvicorn', '--workers', str(args.workers), '--port', str(port), '--no-access-log', 'asgi:app'
+        ],
+    }
+    # The response cache would hide the database round trips being compared
+    env = {'CATALOG_CACHE_SIZE': '0', 'FLASK_ENV': 'production'}
+
+    results = {'workers': args.workers, 'concurrency': args.concurrency, 'paths': PATHS}
+    for name, command in stacks.items():
+        port = free_port()
+        process = start_server(command(port), port, BACKEND_DIR, env)
+        try:
+            run_load('127.0.0.1', port, PATHS, args.concurrency, duration=2)  # warm up
+            results[name] = run_load('127.0.0.1', port, PATHS, args.concurrency, args.duration)
+        finally:
+            stop_server(process)
+        print(name, json.dumps(results[name]))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
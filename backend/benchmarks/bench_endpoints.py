@@ -0,0 +1,277 @@
+"""Throughput and latency of every /api/* route at several catalog sizes.
+
+Each (app, size) pair runs in its own server process (benchmarks.serve)
+against database bench_<size> on MONGO_URI, or against mongomock with
+--memory. Each route is probed with one request first; a route that
+answers 4xx/5xx, or one mongomock cannot serve under --memory, is recorded
+as skipped instead of timed, and so is a run where every request failed.
+Results are written as JSON; pass --baseline with an earlier result file to
+fail on regressions. Run from backend/:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_endpoints \\
+        --sizes 1000,100000,1000000 --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.bench_endpoints --memory --sizes 1000 --baseline bench-main.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+from benchmarks.loadgen import free_port, run_load, start_server, stop_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Routes mongomock cannot serve, skipped under --memory
+MEMORY_UNSUPPORTED = {
+    'GET /api/products/search': 'mongomock has no $text',
+}
+
+
+def request(port, spec):
+    """Send one request spec (as run_load takes it) and return (status, body)"""
+    method, path, body = ('GET', spec, None) if isinstance(spec, str) else spec
+    if callable(body):
+        body = body()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request(method, path, body=body,
+                     headers={'Content-Type': 'application/json'} if body is not None else {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def get_json(port, path):
+    return json.loads(request(port, path)[1])
+
+
+def email_body(prefix, key='email'):
+    """Body factory producing a new subscriber address per request"""
+    counter = itertools.count()
+    return lambda: json.dumps({key: f"{prefix}-{next(counter)}@bench.example.com"}).encode()
+
+
+def bulk_body(prefix, rows=100):
+    counter = itertools.count()
+
+    def body():
+        batch = next(counter)
+        return ''.join(
+            json.dumps({'email': f"{prefix}-bulk-{batch}-{i}@bench.example.com"}) + '\n'
+            for i in range(rows)
+        ).encode()
+    return body
+
+
+def import_body(prefix, rows=100):
+    """Body factory producing an NDJSON feed of new SKUs per request"""
+    counter = itertools.count()
+
+    def body():
+        batch = next(counter)
+        return ''.join(
+            json.dumps({'sku': f"{prefix}-{batch}-{i}", 'name': f"Bench import {batch} {i}",
+                        'price': 19.99, 'category': 'Bench'}) + '\n'
+            for i in range(rows)
+        ).encode()
+    return body
+
+
+def unsubscribe_body(port, prefix, size, rows=100):
+    """Subscribe size addresses, then hand out one per request until they run out"""
+    emails = [f"{prefix}-unsub-{n}@bench.example.com" for n in range(size)]
+    for start in range(0, size, rows):
+        body = ''.join(json.dumps({'email': email}) + '\n' for email in emails[start:start + rows])
+        status, _ = request(port, ('POST', '/api/subscribers/bulk?format=ndjson&details=false',
+                                   body.encode()))
+        if status != 200:
+            raise RuntimeError(f"Seeding unsubscribe addresses failed with HTTP {status}")
+    pool = iter(emails)
+    return lambda: json.dumps({'email': next(pool)}).encode()
+
+
+def factory_routes(port, args):
+    """Named request specs covering every /api/* route of create_app"""
+    samples = get_json(port, '/api/products?limit=20')['products']
+    sample = samples[0]
+    ids = ','.join(product['_id'] for product in samples)
+    category = quote(get_json(port, '/api/categories')['categories'][0])
+    word = quote(sample['name'].split()[0].lower())
+    prefix = uuid.uuid4().hex[:8]
+    return {
+        'GET /api/health': '/api/health',
+        'GET /api/health/live': '/api/health/live',
+        'GET /api/health/ready': '/api/health/ready',
+        'GET /api/products': '/api/products?limit=20',
+        'GET /api/products?category': f'/api/products?limit=20&category={category}',
+        'GET /api/products?featured': '/api/products?limit=20&featured=true',
+        'GET /api/products?sort=price_asc': '/api/products?limit=20&sort=price_asc',
+        'GET /api/products?price_range': '/api/products?limit=20&sort=price_asc&min_price=50&max_price=150',
+        'GET /api/products?sort=rating': '/api/products?limit=20&sort=rating',
+        'GET /api/products/search': f'/api/products/search?q={word}',
+        'GET /api/products/suggest': f'/api/products/suggest?q={word[:3]}',
+        'GET /api/products/<id>': f"/api/products/{sample['_id']}",
+        'GET /api/products/batch': f'/api/products/batch?ids={ids}',
+        'POST /api/products/batch': ('POST', '/api/products/batch', json.dumps({
+            'ids': [product['_id'] for product in samples]
+        }).encode()),
+        'GET /api/categories': '/api/categories',
+        'GET /api/subscribers': '/api/subscribers',
+        'GET /api/subscribers?format=ndjson': '/api/subscribers?format=ndjson',
+        'GET /api/subscribers/growth': '/api/subscribers/growth?unit=day&buckets=30',
+        'GET /api/cache/stats': '/api/cache/stats',
+        'GET /api/db/stats': '/api/db/stats',
+        'GET /api/admission/stats': '/api/admission/stats',
+        'GET /api/metrics': '/api/metrics',
+        'POST /api/subscribe': ('POST', '/api/subscribe', email_body(prefix)),
+        'POST /api/unsubscribe': ('POST', '/api/unsubscribe', unsubscribe_body(port, prefix, args.unsubscribe_pool)),
+        'POST /api/subscribers/bulk': ('POST', '/api/subscribers/bulk?format=ndjson&details=false',
+                                       bulk_body(prefix)),
+        # Writes bump the catalog cache version, so these run last
+        'POST /api/products/import': ('POST', '/api/products/import?format=ndjson', import_body(prefix)),
+        'POST /api/products': ('POST', '/api/products', lambda: json.dumps({
+            'name': f'Bench product {uuid.uuid4().hex[:6]}', 'price': 9.99, 'category': 'Bench'
+        }).encode()),
+    }
+
+
+def standalone_routes(port, args):
+    """Named request specs covering every /api/* route of app.py"""
+    prefix = uuid.uuid4().hex[:8]
+    return {
+        'GET /api/health': '/api/health',
+        'GET /api/products': '/api/products?limit=20',
+        'GET /api/categories': '/api/categories',
+        'POST /api/subscribe': ('POST', '/api/subscribe', email_body(prefix)),
+    }
+
+
+ROUTES = {'factory': factory_routes, 'standalone': standalone_routes}
+
+
+def bench_target(target, size, args):
+    port = free_port()
+    command = [sys.executable, '-m', 'benchmarks.serve', '--target', target,
+               '--port', str(port), '--products', str(size)]
+    env = {'FLASK_ENV': 'production'}
+    if args.memory:
+        command.append('--memory')
+        env['MONGO_URI'] = 'mongodb://localhost/bench'
+    else:
+        env['MONGO_URI'] = f"{args.mongo_uri.rstrip('/')}/bench_{size}"
+    if not args.cache:
+        env['CATALOG_CACHE_SIZE'] = '0'
+
+    # Seeding a large catalog happens before the server reports healthy
+    process = start_server(command, port, BACKEND_DIR, env, timeout=args.seed_timeout)
+    results = {}
+    try:
+        for name, spec in ROUTES[target](port, args).items():
+            results[name] = bench_route(port, name, spec, args)
+            print(f"{target} {size} {name}: {json.dumps(results[name])}", flush=True)
+    finally:
+        stop_server(process)
+    return results
+
+
+def bench_route(port, name, spec, args):
+    """Time one route, or say why it was skipped"""
+    if args.memory and name in MEMORY_UNSUPPORTED:
+        return {'skipped': MEMORY_UNSUPPORTED[name]}
+    status, _ = request(port, spec)
+    if status >= 400:
+        return {'skipped': f"probe answered HTTP {status}"}
+    run_load('127.0.0.1', port, [spec], args.concurrency, duration=args.warmup)
+    result = run_load('127.0.0.1', port, [spec], args.concurrency, args.duration)
+    if not result['requests']:
+        return {'skipped': 'no requests completed'}
+    if result['errors'] >= result['requests']:
+        return {'skipped': 'every request failed', 'errors': result['errors']}
+    return result
+
+
+def find_regressions(results, baseline, tolerance):
+    """List routes whose rps fell or p95 rose by more than tolerance"""
+    regressions = []
+    for target, sizes in results['runs'].items():
+        for size, routes in sizes.items():
+            for name, now in routes.items():
+                before = baseline.get('runs', {}).get(target, {}).get(size, {}).get(name)
+                if not before or 'skipped' in before or 'skipped' in now:
+                    continue
+                if before['rps'] and now['rps'] < before['rps'] * (1 - tolerance):
+                    regressions.append(f"{target} {size} {name}: rps {before['rps']} -> {now['rps']}")
+                if before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                    regressions.append(f"{target} {size} {name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', default='factory,standalone')
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--mongo-uri', default=os.getenv('BENCH_MONGO_URI', 'mongodb://localhost:27017'),
+                        help="server to seed bench_<size> databases on")
+    parser.add_argument('--memory', action='store_true', help="use mongomock instead of a mongod")
+    parser.add_argument('--cache', action='store_true', help="keep the catalog response cache on")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--warmup', type=float, default=1)
+    parser.add_argument('--seed-timeout', type=float, default=1800)
+    parser.add_argument('--unsubscribe-pool', type=int,
+                        help="subscribers seeded for the unsubscribe run, one per request "
+                             "(default 20000, or 2000 with --memory)")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="earlier result file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed fractional rps drop or p95 rise before failing")
+    args = parser.parse_args()
+    if args.unsubscribe_pool is None:
+        args.unsubscribe_pool = 2000 if args.memory else 20000
+
+    results = {
+        'commit': git_commit(),
+        'at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'backend': 'mongomock' if args.memory else 'mongod',
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'cache': args.cache,
+        'runs': {},
+    }
+    for target in args.targets.split(','):
+        for size in args.sizes.split(','):
+            results['runs'].setdefault(target, {})[size] = bench_target(target, int(size), args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
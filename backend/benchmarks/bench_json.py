@@ -0,0 +1,105 @@
+"""Compare JSON serialization of 10k-document list responses.
+
+Needs no database: documents are generated in memory, and the raw BSON
+case encodes them into server-sized batches first. Run from backend/:
+
+    python -m benchmarks.bench_json --docs 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId, decode, encode
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.serialization import FastJSONProvider, dumps_bytes, raw_json_array
+
+
+def make_products(n, seed=42):
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    return [{
+        '_id': ObjectId(),
+        'name': f'Product {i}',
+        'description': ' '.join(rng.choice(['fast', 'light', 'durable', 'organic', 'classic'])
+                                for _ in range(12)),
+        'price': round(rng.uniform(1, 500), 2),
+        'category': rng.choice(['electronics', 'home', 'garden', 'toys', 'books']),
+        'featured': rng.random() < 0.1,
+        'stock': rng.randint(0, 1000),
+        'rating': round(rng.uniform(0, 5), 1),
+        'created_at': started + timedelta(minutes=i),
+    } for i in range(n)]
+
+
+class RawBatches(list):
+    """Stands in for a find_raw_batches() cursor"""
+
+    def close(self):
+        pass
+
+
+def best_ms(fn, repeat):
+    """Best wall time of repeat runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(min(timings), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--output', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    docs = make_products(args.docs)
+    stdlib = DefaultJSONProvider(Flask(__name__))
+    fast = FastJSONProvider(Flask(__name__))
+
+    def stdlib_with_id_loop():
+        # The previous read path: copy, stringify _id, then stdlib jsonify
+        page = [dict(doc) for doc in docs]
+        for doc in page:
+            doc['_id'] = str(doc['_id'])
+        stdlib.dumps({'products': page, 'count': len(page)})
+
+    def fast_provider():
+        fast.dumps({'products': docs, 'count': len(docs)})
+
+    raw = [encode(doc) for doc in docs]
+    batches = RawBatches(b''.join(raw[i:i + args.batch_size])
+                         for i in range(0, len(raw), args.batch_size))
+
+    def per_document_stream():
+        # What a regular cursor plus stream_page does: decode and encode each document
+        chunks = [dumps_bytes(decode(doc)) for doc in raw]
+        return b','.join(chunks)
+
+    def raw_batch_stream():
+        return b''.join(raw_json_array(batches, 'products'))
+
+    results = {'docs': args.docs, 'batch_size': args.batch_size, 'ms': {}}
+    for name, fn in [('stdlib_with_id_loop', stdlib_with_id_loop),
+                     ('fast_provider', fast_provider),
+                     ('per_document_bson', per_document_stream),
+                     ('raw_bson_batches', raw_batch_stream)]:
+        results['ms'][name] = best_ms(fn, args.repeat)
+
+    baseline = results['ms']['stdlib_with_id_loop']
+    results['speedup'] = {name: round(baseline / ms, 2) for name, ms in results['ms'].items() if ms}
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Startup time and per-worker memory of gunicorn with and without --preload.
+
+Each mode starts benchmarks.serve under gunicorn.conf.py and times it until
+every worker has logged that it is ready, then reads each worker's RSS,
+PSS (RSS with shared pages split between the processes sharing them) and
+USS (pages private to the worker) from /proc, once idle and once after
+--duration seconds of load. Linux only. Run from backend/:
+
+    python -m benchmarks.bench_preload --workers 4 --memory
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.loadgen import free_port, run_load, stop_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = [
+    '/api/products?limit=20',
+    '/api/products?category=Electronics',
+    '/api/categories',
+]
+
+
+def memory_kb(pid):
+    """rss, pss and uss of pid in kB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def measure(master):
+    workers = [memory_kb(pid) for pid in children(master)]
+    totals = {key: sum(w[key] for w in workers) for key in ('rss', 'pss', 'uss')}
+    return {
+        'master': memory_kb(master),
+        'per_worker_avg': {key: round(value / len(workers)) for key, value in totals.items()},
+        'workers_total': totals,
+    }
+
+
+def start(args, preload, port):
+    """Start gunicorn and return (process, seconds until every worker was ready)"""
+    command = [sys.executable, '-m', 'benchmarks.serve', '--target', args.target, '--port', str(port),
+               '--products', str(args.products), '--workers', str(args.workers)]
+    if preload:
+        command.append('--preload')
+    if args.memory:
+        command.append('--memory')
+    env = {**os.environ, 'FLASK_ENV': 'production', 'GUNICORN_PROFILE': 'gthread'}
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    ready = threading.Semaphore(0)
+
+    def watch():
+        for line in process.stderr:
+            if 'Worker ready' in line:
+                ready.release()
+
+    threading.Thread(target=watch, daemon=True).start()
+    for _ in range(args.workers):
+        if not ready.acquire(timeout=120):
+            stop_server(process)
+            raise RuntimeError(f"Workers did not start: {' '.join(command)}")
+    return process, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=['factory', 'standalone'], default='factory')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--memory', action='store_true', help="use mongomock instead of MONGO_URI")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--output', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {'target': args.target, 'workers': args.workers, 'products': args.products,
+               'backend': 'mongomock' if args.memory else 'mongod'}
+    for name, preload in (('fork_then_import', False), ('preload', True)):
+        port = free_port()
+        process, startup = start(args, preload, port)
+        try:
+            idle = measure(process.pid)
+            load = run_load('127.0.0.1', port, PATHS, args.concurrency, args.duration)
+            results[name] = {
+                'startup_seconds': round(startup, 3),
+                'idle_kb': idle,
+                'after_load_kb': measure(process.pid),
+                'load': load,
+            }
+        finally:
+            stop_server(process)
+        print(name, json.dumps(results[name]))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare POST /api/subscribe throughput with and without write coalescing.
+
+Run from backend/ against a scratch database:
+
+    MONGO_URI=mongodb://localhost:27017/bench python -m benchmarks.bench_subscribe
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from app.models.subscriber import Subscriber
+from app.utils.coalesce import SubscribeCoalescer
+
+load_dotenv()
+
+
+def run(subscribe, threads, per_thread):
+    """Call subscribe from many threads at once; return requests/second"""
+    prefix = uuid.uuid4().hex[:8]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(per_thread):
+            subscribe(f"{prefix}-{n}-{i}@bench.example.com")
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    return round(threads * per_thread / elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--per-thread', type=int, default=200)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-delay-ms', type=float, default=5)
+    parser.add_argument('--output', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGO_URI'), maxPoolSize=args.threads)
+    db = client.get_database()
+    db.subscribers.create_index('email', unique=True)
+
+    coalescer = SubscribeCoalescer(db, args.max_batch, args.max_delay_ms / 1000)
+    results = {
+        'threads': args.threads,
+        'requests': args.threads * args.per_thread,
+        'direct_rps': run(lambda email: Subscriber.subscribe(db, email), args.threads, args.per_thread),
+        'coalesced_rps': run(coalescer.submit, args.threads, args.per_thread),
+    }
+    results['flushes'] = coalescer.flushes
+    results['mean_batch'] = round(coalescer.operations / coalescer.flushes, 1) if coalescer.flushes else 0
+    results['speedup'] = round(results['coalesced_rps'] / results['direct_rps'], 2)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
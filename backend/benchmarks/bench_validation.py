@@ -0,0 +1,116 @@
+"""Per-record cost of the compiled validators against the ad-hoc checks they replaced.
+
+Needs no database. Records are generated with a share of invalid ones
+(bad prices, short names, malformed emails). Run from backend/:
+
+    python -m benchmarks.bench_validation --records 100000
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+from validators import PRODUCT_SCHEMA, SUBSCRIBER_SCHEMA, validate_batch
+
+
+def make_products(n, invalid_share, seed=42):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        record = {
+            'name': f'Product {i}',
+            'description': 'A durable, lightweight everyday product',
+            'price': str(round(rng.uniform(1, 500), 2)) if i % 3 == 0 else round(rng.uniform(1, 500), 2),
+            'category': rng.choice(['electronics', 'home', 'garden', 'toys', 'books']),
+            'featured': rng.random() < 0.1,
+            'stock': rng.randint(0, 1000),
+            'rating': round(rng.uniform(0, 5), 1),
+        }
+        if rng.random() < invalid_share:
+            record[rng.choice(['name', 'price', 'category'])] = rng.choice(['', 'x', -1, None])
+        records.append(record)
+    return records
+
+
+def make_subscribers(n, invalid_share, seed=42):
+    rng = random.Random(seed)
+    return [{'email': f'User.{i}@Example.com ' if rng.random() >= invalid_share else f'user{i}@example'}
+            for i in range(n)]
+
+
+def legacy_product(data):
+    # create_product's required-field loop, then Product.create's float() coercion
+    for field in ('name', 'price', 'category'):
+        if field not in data:
+            return None, {field: 'is required'}
+    try:
+        return {
+            'name': data['name'],
+            'description': data.get('description', ''),
+            'price': float(data['price']),
+            'category': data['category'],
+            'image_url': data.get('image_url', ''),
+            'featured': data.get('featured', False),
+            'stock': data.get('stock', 0),
+            'rating': float(data.get('rating', 0)),
+        }, None
+    except (TypeError, ValueError) as e:
+        return None, {'record': str(e)}
+
+
+def legacy_email(data):
+    # validate_email before: a pattern string matched through re's cache on every call
+    email = data.get('email')
+    if not email or not isinstance(email, str):
+        return None, {'email': 'is required'}
+    email = email.strip().lower()
+    if re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email) is None:
+        return None, {'email': 'is invalid'}
+    return {'email': email}, None
+
+
+def best_ns_per_record(fn, records, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(records)
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) * 1e9 / len(records), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--invalid-share', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    products = make_products(args.records, args.invalid_share)
+    subscribers = make_subscribers(args.records, args.invalid_share)
+
+    cases = {
+        'product_legacy': (lambda rs: [legacy_product(r) for r in rs], products),
+        'product_compiled': (lambda rs: [PRODUCT_SCHEMA(r) for r in rs], products),
+        'product_batch': (lambda rs: validate_batch(PRODUCT_SCHEMA, rs), products),
+        'subscriber_legacy': (lambda rs: [legacy_email(r) for r in rs], subscribers),
+        'subscriber_compiled': (lambda rs: [SUBSCRIBER_SCHEMA(r) for r in rs], subscribers),
+        'subscriber_batch': (lambda rs: validate_batch(SUBSCRIBER_SCHEMA, rs), subscribers),
+    }
+    results = {'records': args.records, 'invalid_share': args.invalid_share, 'ns_per_record': {}}
+    for name, (fn, records) in cases.items():
+        results['ns_per_record'][name] = best_ns_per_record(fn, records, args.repeat)
+
+    valid, invalid = validate_batch(PRODUCT_SCHEMA, products)
+    results['products_rejected'] = len(invalid)
+    results['first_errors'] = [{'index': index, 'errors': errors} for index, errors in invalid[:3]]
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
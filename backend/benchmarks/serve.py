@@ -0,0 +1,118 @@
+"""Serve the factory or standalone app in-process for the endpoint benchmarks.
+
+Seeds MONGO_URI's database with --products generated products, resuming
+whatever an earlier run already wrote, then serves on a threaded WSGI
+server, or with --workers under gunicorn using gunicorn.conf.py. --memory
+swaps pymongo for mongomock (requirements-bench.txt) so no mongod is needed:
+
+    python -m benchmarks.serve --target factory --port 5001 --products 1000 --memory
+    python -m benchmarks.serve --target factory --port 5001 --memory --workers 4 --preload
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def use_mongomock():
+    """Point every MongoClient created from here on at an in-memory mongomock server"""
+    import mongomock
+    import mongomock.collection
+    import pymongo
+
+    pymongo.MongoClient = mongomock.MongoClient
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+    # pymongo 4.x passes sort= to bulk updates, which mongomock does not accept
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    mongomock.collection.BulkOperationBuilder.add_update = add_update_without_sort
+
+    # mongomock has no raw batch cursors, explain or $text
+    os.environ['RAW_BSON_LISTS'] = 'false'
+    os.environ['QUERY_PLAN_CHECK'] = 'off'
+
+
+def load_app(target):
+    """Build the application factory app or import the standalone app.py"""
+    sys.path.insert(0, BACKEND_DIR)
+    if target == 'factory':
+        from app import create_app
+        app = create_app(os.getenv('FLASK_ENV', 'production'))
+        return app, app.config['db']
+
+    # app.py is shadowed by the app package, so load it from its file
+    spec = importlib.util.spec_from_file_location('standalone_app', os.path.join(BACKEND_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app, module.db
+
+
+def serve_gunicorn(args):
+    """Run gunicorn with the backend's gunicorn.conf.py; the catalog is seeded beforehand"""
+    from gunicorn.app.base import Application
+
+    class BenchApplication(Application):
+        def init(self, parser, opts, args):
+            return None
+
+        def load_config(self):
+            self.load_config_from_file(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'))
+            self.cfg.set('bind', f'127.0.0.1:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('preload_app', args.preload)
+
+        def load(self):
+            return load_app(args.target)[0]
+
+    sys.argv = sys.argv[:1]
+    BenchApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=['factory', 'standalone'], default='factory')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--memory', action='store_true', help="use mongomock instead of MONGO_URI")
+    parser.add_argument('--workers', type=int, default=0, help="serve with this many gunicorn workers")
+    parser.add_argument('--preload', action='store_true', help="import the app in the gunicorn master")
+    args = parser.parse_args()
+
+    if args.memory:
+        use_mongomock()
+    if args.workers:
+        import pymongo
+        sys.path.insert(0, BACKEND_DIR)
+        from config import Config
+        from seed_data import seed_collection
+        # Seeded through a client of its own, closed before gunicorn forks
+        client = pymongo.MongoClient(Config.MONGO_URI)
+        seed_collection('products', args.products, client.get_database())
+        from app.models.category_stats import CategoryStats
+        CategoryStats.rebuild(client.get_database())
+        client.close()
+        serve_gunicorn(args)
+        return
+    app, db = load_app(args.target)
+    from seed_data import seed_collection
+    from app.models.category_stats import CategoryStats
+    seed_collection('products', args.products, db)
+    CategoryStats.rebuild(db)
+    if args.target == 'factory':
+        # Snapshots were built from the catalog before seeding
+        from app.utils.snapshots import catalog_snapshots
+        if catalog_snapshots.enabled:
+            catalog_snapshots.rebuild(db)
+
+    from werkzeug.serving import make_server
+    # Per-request access lines would cost more than some of the routes measured
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    make_server('127.0.0.1', args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from app.utils.ingest import INGEST_FORMATS, OUTCOMES, detect_format, ingest_subscribers, read_emails
+
+load_dotenv()
+
+def bulk_subscribe(path, fmt=None, batch_size=1000, report=None):
+    """Import a partner subscriber list from an NDJSON or CSV file"""
+    fmt = fmt or detect_format(path)
+    client = MongoClient(os.getenv('MONGO_URI'))
+    db = client.get_database()
+
+    counts = dict.fromkeys(OUTCOMES, 0)
+    report_file = open(report, 'w', newline='', encoding='utf-8') if report else None
+    writer = csv.writer(report_file) if report_file else None
+    if writer:
+        writer.writerow(['row', 'email', 'status'])
+
+    print(f"📥 Importing {path} ({fmt})...")
+    started = time.perf_counter()
+    try:
+        with open(path, newline='', encoding='utf-8') as lines:
+            for row, email, status in ingest_subscribers(db, read_emails(lines, fmt), batch_size):
+                counts[status] += 1
+                if writer:
+                    writer.writerow([row, email, status])
+    finally:
+        if report_file:
+            report_file.close()
+        client.close()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(f"✅ Processed {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else rows:.0f} rows/s)")
+    for status in OUTCOMES:
+        print(f"  - {status}: {counts[status]}")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import newsletter subscribers")
+    parser.add_argument('path', help="NDJSON or CSV file with an email per row")
+    parser.add_argument('--format', choices=INGEST_FORMATS, help="defaults to the file extension")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--report', help="write per-row outcomes to this CSV file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ File not found: {args.path}")
+        sys.exit(1)
+    bulk_subscribe(args.path, args.format, args.batch_size, args.report)
@@ -7,6 +7,116 @@ class Config:
     """Base configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/ecommerce')
+
+    # Connection pool sizing and timeouts
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 0))  # 0 = no timeout
+
+    # Command/pool monitoring and the slow-query log
+    MONGO_MONITORING = os.getenv('MONGO_MONITORING', 'true').lower() == 'true'
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+
+    # Product listing pagination
+    PRODUCTS_PAGE_SIZE = int(os.getenv('PRODUCTS_PAGE_SIZE', 50))
+    PRODUCTS_MAX_PAGE_SIZE = int(os.getenv('PRODUCTS_MAX_PAGE_SIZE', 200))
+    # Ids accepted by one /api/products/batch lookup (one $in query)
+    PRODUCTS_BATCH_MAX_IDS = int(os.getenv('PRODUCTS_BATCH_MAX_IDS', 100))
+
+    # Full-text search and the in-memory type-ahead index
+    SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+    TYPEAHEAD_INDEX = os.getenv('TYPEAHEAD_INDEX', 'true').lower() == 'true'
+    TYPEAHEAD_LIMIT = int(os.getenv('TYPEAHEAD_LIMIT', 10))
+    TYPEAHEAD_REFRESH_SECONDS = int(os.getenv('TYPEAHEAD_REFRESH_SECONDS', 30))
+    # Full rebuilds also pick up renames, deletes and lower ids written elsewhere
+    TYPEAHEAD_REBUILD_SECONDS = int(os.getenv('TYPEAHEAD_REBUILD_SECONDS', 600))
+
+    # Startup schema bootstrap; QUERY_PLAN_CHECK is 'strict', 'warn' or 'off'
+    BOOTSTRAP_DB = os.getenv('BOOTSTRAP_DB', 'true').lower() == 'true'
+    QUERY_PLAN_CHECK = os.getenv('QUERY_PLAN_CHECK', 'warn')
+
+    # Rows fetched per cursor batch by the streaming subscriber export
+    SUBSCRIBER_EXPORT_BATCH_SIZE = int(os.getenv('SUBSCRIBER_EXPORT_BATCH_SIZE', 2000))
+    # Buckets one /api/subscribers/growth request may span
+    SUBSCRIBER_GROWTH_MAX_BUCKETS = int(os.getenv('SUBSCRIBER_GROWTH_MAX_BUCKETS', 1000))
+
+    # Optionally serve large list responses from raw BSON batches (find_raw_batches)
+    RAW_BSON_LISTS = os.getenv('RAW_BSON_LISTS', 'false').lower() == 'true'
+
+    # Rows validated and written per round trip by bulk subscriber ingest
+    SUBSCRIBER_INGEST_BATCH_SIZE = int(os.getenv('SUBSCRIBER_INGEST_BATCH_SIZE', 1000))
+    # Product feed rows validated, hash-compared and upserted per round trip
+    PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv('PRODUCT_IMPORT_BATCH_SIZE', 1000))
+
+    # Coalesce concurrent POST /api/subscribe calls into one bulk_write
+    SUBSCRIBE_COALESCE = os.getenv('SUBSCRIBE_COALESCE', 'false').lower() == 'true'
+    SUBSCRIBE_COALESCE_MAX_BATCH = int(os.getenv('SUBSCRIBE_COALESCE_MAX_BATCH', 256))
+    SUBSCRIBE_COALESCE_MAX_DELAY_MS = float(os.getenv('SUBSCRIBE_COALESCE_MAX_DELAY_MS', 5))
+
+    # In-process catalog response cache
+    CATALOG_CACHE_SIZE = int(os.getenv('CATALOG_CACHE_SIZE', 512))
+    CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 60))
+
+    # Catalog cache shared by all workers through a Unix socket server; empty
+    # keeps the cache per process. With SHARED_CACHE_EMBED the first worker to
+    # start hosts the server and any worker restarts it if that one exits,
+    # otherwise run `python -m app.utils.shared_cache`
+    SHARED_CACHE_SOCKET = os.getenv('SHARED_CACHE_SOCKET', '')
+    SHARED_CACHE_EMBED = os.getenv('SHARED_CACHE_EMBED', 'true').lower() == 'true'
+    SHARED_CACHE_MAX_BYTES = int(os.getenv('SHARED_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    SHARED_CACHE_LEASE_MS = float(os.getenv('SHARED_CACHE_LEASE_MS', 2000))
+
+    # Prebuilt, pre-compressed first pages of the all/featured/per-category
+    # listings, shared by all workers (one subdirectory per database); set a
+    # directory to enable them. Older than SNAPSHOT_MAX_AGE_SECONDS they are
+    # rebuilt, which bounds how long writes made elsewhere go unseen
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', '')
+    SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv('SNAPSHOT_MAX_AGE_SECONDS', 60))
+
+    # Readiness probes answer from a status a background thread refreshes by
+    # pinging Mongo this often; older than 3 intervals counts as not ready
+    HEALTH_HEARTBEAT_SECONDS = float(os.getenv('HEALTH_HEARTBEAT_SECONDS', 2))
+
+    # Per-route latency metrics; workers sharing METRICS_DIR are aggregated
+    # by /api/metrics (leave unset for a single process)
+    METRICS_DIR = os.getenv('METRICS_DIR') or None
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 1))
+
+    # Admission control: adaptive per-worker concurrency limit between MIN
+    # and MAX, a wait queue of ADMISSION_MAX_QUEUE requests for at most
+    # ADMISSION_MAX_WAIT_MS, then a 503 with Retry-After. The limit is capped
+    # at ADMISSION_WORKER_CONCURRENCY, the requests a worker actually serves
+    # at once; gunicorn.conf.py sets it from the worker profile
+    ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+    ADMISSION_INITIAL_LIMIT = int(os.getenv('ADMISSION_INITIAL_LIMIT', 32))
+    ADMISSION_MIN_LIMIT = int(os.getenv('ADMISSION_MIN_LIMIT', 1))
+    ADMISSION_MAX_LIMIT = int(os.getenv('ADMISSION_MAX_LIMIT', 128))
+    ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 16))
+    ADMISSION_WORKER_CONCURRENCY = int(os.getenv('ADMISSION_WORKER_CONCURRENCY', 0))
+    ADMISSION_MAX_WAIT_MS = int(os.getenv('ADMISSION_MAX_WAIT_MS', 500))
+    # Shrink the limit once recent Mongo time exceeds this multiple of its baseline
+    ADMISSION_LATENCY_TOLERANCE = float(os.getenv('ADMISSION_LATENCY_TOLERANCE', 2.0))
+
+    # Structured JSON logging through a background writer thread. LOG_FILE
+    # contains {pid} so each worker writes and rotates a file of its own:
+    # processes rotating one shared file would rename it under each other.
+    # Empty disables it
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FILE = os.getenv('LOG_FILE', 'api.{pid}.log')
+    LOG_FILE_LEVEL = os.getenv('LOG_FILE_LEVEL', 'ERROR').upper()
+    LOG_ROTATE_BYTES = int(os.getenv('LOG_ROTATE_BYTES', 10 * 1024 * 1024))
+    LOG_ROTATE_SECONDS = int(os.getenv('LOG_ROTATE_SECONDS', 86400))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 7))
+    # Records waiting for the writer; beyond this they are dropped, not waited on
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # Records let through per message per window; 0 disables sampling
+    LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 20))
+    LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv('LOG_SAMPLE_WINDOW_SECONDS', 10))
     
 class DevelopmentConfig(Config):
     """Development configuration"""
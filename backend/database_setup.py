@@ -4,22 +4,57 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-def setup_database_indexes():
-    client = MongoClient(os.getenv('MONGO_URI'))
-    db = client.get_database()
-    
+COLLECTIONS = ('products', 'subscribers', 'category_stats', 'subscriber_growth')
+
+def ensure_collections(db):
+    """Create any missing collections (one metadata round trip)"""
+    existing = set(db.list_collection_names())
+    for name in COLLECTIONS:
+        if name not in existing:
+            db.create_collection(name)
+
+def ensure_indexes(db):
+    """Create the indexes the API routes rely on (idempotent)"""
     # Create indexes for better performance
     db.products.create_index([("category", ASCENDING)])
     db.products.create_index([("featured", ASCENDING)])
     db.products.create_index([("price", ASCENDING)])
     db.products.create_index([("name", TEXT), ("description", TEXT)])
-    
+
+    # Keyset pagination walks _id within each filter
+    db.products.create_index([("category", ASCENDING), ("_id", ASCENDING)])
+    db.products.create_index([("featured", ASCENDING), ("_id", ASCENDING)])
+    db.products.create_index([("category", ASCENDING), ("featured", ASCENDING), ("_id", ASCENDING)])
+
+    # Sorted listings (Product.QUERY_SHAPES): equality, then sort key, then _id;
+    # price ranges are served by the same price indexes
+    db.products.create_index([("price", ASCENDING), ("_id", ASCENDING)])
+    db.products.create_index([("category", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING)])
+    db.products.create_index([("rating", ASCENDING), ("_id", ASCENDING)])
+    db.products.create_index([("category", ASCENDING), ("rating", ASCENDING), ("_id", ASCENDING)])
+
+    # Bulk imports upsert by supplier SKU; products created through the API have none
+    db.products.create_index([("sku", ASCENDING)], unique=True, sparse=True)
+
     db.subscribers.create_index([("email", ASCENDING)], unique=True)
     db.subscribers.create_index([("subscribed_at", ASCENDING)])
-    
+    db.subscribers.create_index([("is_active", ASCENDING), ("_id", ASCENDING)])
+    # Backfilling subscriber_growth groups unsubscribes by time, like subscribed_at
+    db.subscribers.create_index([("unsubscribed_at", ASCENDING)])
+
+    # One document per (unit, start) growth bucket; dashboards range-scan it
+    db.subscriber_growth.create_index([("unit", ASCENDING), ("start", ASCENDING)], unique=True)
+
+def setup_database_indexes():
+    client = MongoClient(os.getenv('MONGO_URI'))
+    db = client.get_database()
+
+    ensure_collections(db)
+    ensure_indexes(db)
+
     print("✅ Database indexes created successfully!")
-    
+
     client.close()
 
 if __name__ == "__main__":
-    setup_database_indexes()
\ No newline at end of file
+    setup_database_indexes()
@@ -0,0 +1,83 @@
+"""Gunicorn settings for the API; `gunicorn wsgi:app` loads this file from backend/.
+
+GUNICORN_PROFILE picks the worker model:
+
+    gthread (default)  2 x cores workers with GUNICORN_THREADS threads each;
+                       Mongo round trips release the GIL, so threads overlap them.
+                       With admission control on, each worker also gets
+                       ADMISSION_MAX_QUEUE threads that wait for a slot and
+                       GUNICORN_THREADS more that answer 503 once that queue
+                       is full, so overload is shed by the app instead of
+                       piling up in gunicorn's queue
+    gevent             one worker per core, up to GUNICORN_WORKER_CONNECTIONS
+                       concurrent requests each (pip install gevent)
+
+WEB_CONCURRENCY overrides the worker count. The app is preloaded in the
+master by default (GUNICORN_PRELOAD=false turns it off): it is imported once
+and shared copy-on-write, and MongoClients are only opened after fork.
+"""
+import multiprocessing
+import os
+import sys
+
+cores = multiprocessing.cpu_count()
+profile = os.getenv('GUNICORN_PROFILE', 'gthread')
+admission = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 20
+# Longer than the load balancer's idle timeout, so it closes connections first
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+# Worker heartbeat files on tmpfs; a disk-backed /tmp can stall them under I/O load
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+if profile == 'gevent':
+    worker_class = 'gevent'
+    workers = int(os.getenv('WEB_CONCURRENCY', cores))
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+    # Every connection gets a greenlet, so the limiter sees all of them
+    concurrency = worker_connections
+    # Patch before the preloaded app creates any locks or sockets
+    from gevent import monkey
+    monkey.patch_all()
+elif profile == 'gthread':
+    worker_class = 'gthread'
+    workers = int(os.getenv('WEB_CONCURRENCY', cores * 2))
+    # Keep MONGO_MAX_POOL_SIZE at least this high, or threads queue for connections
+    concurrency = int(os.getenv('GUNICORN_THREADS', 4))
+    # Requests beyond the working threads must reach the app to be queued or
+    # shed; without spare threads they wait in gunicorn, unseen by the limiter
+    spare = int(os.getenv('ADMISSION_MAX_QUEUE', 16)) + concurrency if admission else 0
+    threads = concurrency + spare
+else:
+    sys.exit(f"Unknown GUNICORN_PROFILE {profile!r}; use gthread or gevent")
+
+# The app caps its admission limit at what a worker really serves at once
+os.environ.setdefault('ADMISSION_WORKER_CONCURRENCY', str(concurrency))
+
+
+def when_ready(server):
+    # The preloaded app used Mongo to bootstrap; workers open clients of their own
+    mongo = sys.modules.get('app.utils.mongo')
+    if mongo is not None:
+        mongo.close_clients()
+
+
+def post_fork(server, worker):
+    mongo = sys.modules.get('app.utils.mongo')
+    if mongo is not None:
+        mongo.reopen_clients()
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker ready (pid: %s)", worker.pid)
+
+
+def child_exit(server, worker):
+    # Fold the exited worker's histograms into the metrics archive
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir:
+        from app.utils.http_metrics import MetricsExporter
+        MetricsExporter.archive(metrics_dir, [worker.pid])
@@ -0,0 +1,61 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from app.utils.ingest import INGEST_FORMATS, PRODUCT_OUTCOMES, detect_format, ingest_products, read_records
+from app.utils.notify import notify_api
+
+load_dotenv()
+
+def import_products(path, fmt=None, batch_size=1000, report=None):
+    """Upsert a supplier product feed from an NDJSON or CSV file by SKU"""
+    fmt = fmt or detect_format(path)
+    client = MongoClient(os.getenv('MONGO_URI'))
+    db = client.get_database()
+
+    counts = dict.fromkeys(PRODUCT_OUTCOMES, 0)
+    report_file = open(report, 'w', newline='', encoding='utf-8') if report else None
+    writer = csv.writer(report_file) if report_file else None
+    if writer:
+        writer.writerow(['row', 'sku', 'status', 'errors'])
+
+    print(f"📥 Importing {path} ({fmt})...")
+    started = time.perf_counter()
+    try:
+        with open(path, newline='', encoding='utf-8') as lines:
+            for row, sku, status, errors in ingest_products(db, read_records(lines, fmt), batch_size):
+                counts[status] += 1
+                if writer:
+                    writer.writerow([row, sku, status, '; '.join(f"{k} {v}" for k, v in (errors or {}).items())])
+                elif errors and counts['invalid'] <= 20:
+                    print(f"  ⚠️  row {row}: {errors}")
+        if counts['inserted'] or counts['updated']:
+            notify_api(db)
+    finally:
+        if report_file:
+            report_file.close()
+        client.close()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(f"✅ Processed {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else rows:.0f} rows/s)")
+    for status in PRODUCT_OUTCOMES:
+        print(f"  - {status}: {counts[status]}")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert a supplier product feed by SKU")
+    parser.add_argument('path', help="NDJSON or CSV file with one product per row and a sku field")
+    parser.add_argument('--format', choices=INGEST_FORMATS, help="defaults to the file extension")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--report', help="write per-row outcomes to this CSV file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ File not found: {args.path}")
+        sys.exit(1)
+    import_products(args.path, args.format, args.batch_size, args.report)
@@ -1,29 +1,265 @@
+import atexit
+import glob
 import logging
+import os
+import queue
+import re
 import sys
-from datetime import datetime
-
-def setup_logger():
-    logger = logging.getLogger('ecommerce_api')
-    logger.setLevel(logging.INFO)
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    
-    # File handler for production
-    file_handler = logging.FileHandler('api.log')
-    file_handler.setLevel(logging.ERROR)
-    
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(formatter)
-    file_handler.setFormatter(formatter)
-    
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
-    return logger
-
-logger = setup_logger()
\ No newline at end of file
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request
+from app.utils.procs import pid_alive
+from app.utils.serialization import dumps_bytes
+
+# Id of the request being handled, attached to every record logged during it
+request_id = ContextVar('request_id', default=None)
+
+# LogRecord attributes that are not user-supplied extra= fields
+RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, extras"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_FIELDS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = ''.join(traceback.format_exception(*record.exc_info))
+        try:
+            return dumps_bytes(entry).decode('utf-8')
+        except TypeError:
+            return dumps_bytes({k: str(v) for k, v in entry.items()}).decode('utf-8')
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id on the calling thread"""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Let through burst records per message template per window, drop the rest.
+
+    The first record of the next window reports how many were dropped, so
+    an error storm costs one dict lookup per call instead of a write.
+    """
+
+    def __init__(self, burst=20, window=10.0, max_keys=10000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+class SizeAndTimeRotatingHandler(logging.FileHandler):
+    """File handler that rotates when the file reaches max_bytes or is interval seconds old.
+
+    Rotated files are renamed <file>.<YYYYmmdd-HHMMSS>. A {pid} in the
+    filename is resolved in each (forked) process; backup_count then bounds
+    the rotated files of all processes together, and the files left behind
+    by processes that have exited count as backups too.
+    """
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=7):
+        super().__init__(filename.format(pid=os.getpid()), encoding='utf-8', delay=True)
+        self.pattern = filename
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self._opened_at = time.time()
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            # Leave the parent's stream alone; flushing it here would duplicate its buffer
+            self._pid = os.getpid()
+            self.stream = None
+            self.baseFilename = os.path.abspath(self.pattern.format(pid=self._pid))
+            self._opened_at = time.time()
+        if self.stream is not None and self._should_rotate():
+            self._rotate()
+        super().emit(record)
+
+    def _should_rotate(self):
+        if self.interval and time.time() - self._opened_at >= self.interval:
+            return True
+        return bool(self.max_bytes) and self.stream.tell() >= self.max_bytes
+
+    def _rotate(self):
+        self.stream.close()
+        self.stream = None
+        target = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S')}"
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S')}.{suffix}"
+            suffix += 1
+        os.replace(self.baseFilename, target)
+        self._opened_at = time.time()
+        if not self.backup_count:
+            return
+        backups = sorted(self._backups(), key=os.path.getmtime)
+        for old in backups[:-self.backup_count]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass  # another worker pruned it first
+
+    def _backups(self):
+        # Rotated files for every pid, plus the live files of exited processes
+        if '{pid}' not in self.pattern:
+            return glob.glob(glob.escape(self.baseFilename) + '.*')
+        pattern = os.path.abspath(self.pattern)
+        live = glob.escape(pattern).format(pid='*')
+        owner = re.compile(re.escape(pattern).replace(re.escape('{pid}'), r'(\d+)') + '$')
+        backups = glob.glob(live + '.*')
+        for path in glob.glob(live):
+            match = owner.match(path)
+            if match and path != self.baseFilename and not pid_alive(int(match.group(1))):
+                backups.append(path)
+        return backups
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that never blocks the request thread.
+
+    Records are handed to a background listener; when the bounded queue is
+    full they are dropped and counted. The listener is restarted in a forked
+    child, whose copy of the thread does not run.
+    """
+
+    def __init__(self, handlers, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = handlers
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+
+    def stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+    def prepare(self, record):
+        # Only merge the message here; exceptions are formatted on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        if self.dropped:
+            # Report what the full queue cost on the next record that gets through
+            record.dropped, self.dropped = self.dropped, 0
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1 + getattr(record, 'dropped', 0)
+
+
+def setup_logging(config):
+    """Route all logging through one queue to JSON stdout and file writers.
+
+    Reads LOG_* settings from a Config mapping. Safe to call again; the
+    previous pipeline is flushed and replaced.
+    """
+    formatter = JsonFormatter()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    handlers = [console]
+    if config['LOG_FILE']:
+        file_handler = SizeAndTimeRotatingHandler(
+            config['LOG_FILE'],
+            max_bytes=config['LOG_ROTATE_BYTES'],
+            interval=config['LOG_ROTATE_SECONDS'],
+            backup_count=config['LOG_BACKUP_COUNT']
+        )
+        file_handler.setLevel(config['LOG_FILE_LEVEL'])
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    handler = NonBlockingQueueHandler(handlers, config['LOG_QUEUE_SIZE'])
+    handler.addFilter(SamplingFilter(config['LOG_SAMPLE_BURST'], config['LOG_SAMPLE_WINDOW_SECONDS']))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+        if isinstance(old, NonBlockingQueueHandler):
+            old.stop()
+            atexit.unregister(old.stop)
+    root.addHandler(handler)
+    root.setLevel(config['LOG_LEVEL'])
+    handler.start()
+    atexit.register(handler.stop)
+    return handler
+
+
+def init_request_logging(app):
+    """Give every request an id (X-Request-ID if the client sent one)"""
+    @app.before_request
+    def assign_request_id():
+        rid = (request.headers.get('X-Request-ID') or '')[:64] or uuid.uuid4().hex
+        g.request_id_token = request_id.set(rid)
+
+    @app.after_request
+    def echo_request_id(response):
+        response.headers['X-Request-ID'] = request_id.get() or ''
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            request_id.reset(token)
+
+
+logger = logging.getLogger('ecommerce_api')
@@ -0,0 +1,45 @@
+import argparse
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from app.models.category_stats import COUNTERS, CategoryStats
+
+load_dotenv()
+
+FIELDS = COUNTERS + ('min_price', 'max_price')
+
+def find_drift(db):
+    """Compare category_stats with a fresh aggregation; return the differing categories"""
+    stored = {doc['_id']: doc for doc in db.category_stats.find({'count': {'$gt': 0}})}
+    pipeline = CategoryStats.pipeline()
+    actual = {doc['_id']: doc for doc in db.products.aggregate(pipeline)}
+    drift = {}
+    for category in stored.keys() | actual.keys():
+        have, want = stored.get(category, {}), actual.get(category, {})
+        diff = {f: (have.get(f), want.get(f)) for f in FIELDS if have.get(f) != want.get(f)}
+        if diff:
+            drift[category] = diff
+    return drift
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check the category_stats summary")
+    parser.add_argument('--check', action='store_true', help="only report categories that drifted")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGO_URI'))
+    try:
+        db = client.get_database()
+        if args.check:
+            drift = find_drift(db)
+            for category, diff in sorted(drift.items(), key=lambda item: str(item[0])):
+                print(f"  ⚠️  {category}: " + ', '.join(f"{f} stored {a} actual {b}" for f, (a, b) in diff.items()))
+            print(f"{'❌' if drift else '✅'} {len(drift)} categories drifted")
+            return 1 if drift else 0
+        print(f"✅ Corrected category_stats for {CategoryStats.rebuild(db)} categories")
+        return 0
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
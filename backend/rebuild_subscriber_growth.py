@@ -0,0 +1,56 @@
+import argparse
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from app.models.subscriber_growth import BACKFILL_FIELDS, RebuildInProgress, SubscriberGrowth
+
+load_dotenv()
+
+def find_drift(db):
+    """Compare stored buckets with a fresh backfill; return the ones missing events.
+
+    Only the events a backfill can recover are compared: reactivations are
+    counted by live writes alone, and a bucket holding more events than the
+    backfill finds keeps history the subscribers no longer carry.
+    """
+    events = tuple(BACKFILL_FIELDS)
+    stored = SubscriberGrowth.stored(db)
+    actual = SubscriberGrowth.aggregate(db)
+    drift = {}
+    for bucket in stored.keys() | actual.keys():
+        have, want = stored.get(bucket, {}), actual.get(bucket, {})
+        diff = {e: (have.get(e, 0), want.get(e, 0)) for e in events if have.get(e, 0) < want.get(e, 0)}
+        if diff:
+            drift[bucket] = diff
+    return drift
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or check the subscriber_growth buckets")
+    parser.add_argument('--check', action='store_true', help="only report buckets missing events")
+    parser.add_argument('--force', action='store_true',
+                        help="clear the lock left by a rebuild that died, then rebuild")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGO_URI'))
+    try:
+        db = client.get_database()
+        if args.check:
+            drift = find_drift(db)
+            for (unit, start), diff in sorted(drift.items()):
+                print(f"  ⚠️  {unit} {start.isoformat()}: "
+                      + ', '.join(f"{e} stored {a} actual {b}" for e, (a, b) in diff.items()))
+            print(f"{'❌' if drift else '✅'} {len(drift)} buckets drifted")
+            return 1 if drift else 0
+        try:
+            corrected = SubscriberGrowth.rebuild(db, force=args.force)
+        except RebuildInProgress as e:
+            print(f"❌ {e}; rerun with --force if that process is gone")
+            return 1
+        print(f"✅ Added missing events to {corrected} subscriber_growth buckets (history kept)")
+        return 0
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,29 +1,97 @@
+import argparse
+import math
 import os
+import random
+import struct
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
 import pymongo
+from bson import ObjectId
 from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+from database_setup import ensure_collections, ensure_indexes
 
 # Load environment variables
 load_dotenv()
 
+# MongoDB duplicate key error code; resumed batches hit it for rows already written
+DUPLICATE_KEY = 11000
+
+# Generated _ids are <timestamp><kind><seed><index> so a document's _id only
+# depends on its position, and a rerun can tell which batches already landed
+ID_EPOCH = 1672531200  # 2023-01-01T00:00:00Z
+ID_KINDS = {'products': 1, 'subscribers': 2}
+
+# Category vocabularies; weights follow a Zipf-like skew so a few
+# categories hold most of the catalog, as in real stores
+CATALOG = [
+    ('Electronics', 60, ['Headphones', 'Earbuds', 'Speaker', 'Smartwatch', 'Charger', 'Keyboard',
+                         'Mouse', 'Monitor', 'Webcam', 'Power Bank', 'Router', 'Tablet Stand']),
+    ('Clothing', 35, ['T-Shirt', 'Hoodie', 'Jacket', 'Jeans', 'Sweater', 'Dress', 'Shorts',
+                      'Socks', 'Polo Shirt', 'Raincoat']),
+    ('Home & Kitchen', 40, ['Coffee Maker', 'Blender', 'Cookware Set', 'Knife Block', 'Kettle',
+                            'Toaster', 'Cutting Board', 'Food Container', 'Dinner Plates', 'Mixing Bowl']),
+    ('Accessories', 30, ['Backpack', 'Wallet', 'Sunglasses', 'Belt', 'Watch Strap', 'Tote Bag',
+                         'Laptop Sleeve', 'Phone Case', 'Umbrella']),
+    ('Sports & Outdoors', 45, ['Yoga Mat', 'Water Bottle', 'Tent', 'Sleeping Bag', 'Dumbbells',
+                               'Running Shoes', 'Bike Light', 'Hiking Poles', 'Jump Rope']),
+    ('Beauty', 25, ['Face Serum', 'Moisturizer', 'Shampoo', 'Lip Balm', 'Hair Dryer', 'Sunscreen',
+                    'Body Lotion', 'Makeup Brush Set']),
+    ('Books', 20, ['Cookbook', 'Novel', 'Travel Guide', 'Notebook', 'Planner', 'Sketchbook']),
+    ('Toys & Games', 30, ['Puzzle', 'Board Game', 'Building Blocks', 'Plush Toy', 'Card Game',
+                          'RC Car', 'Kite']),
+    ('Garden', 40, ['Planter', 'Garden Hose', 'Pruning Shears', 'Seed Kit', 'Watering Can',
+                    'Bird Feeder', 'Solar Lantern']),
+    ('Pet Supplies', 35, ['Dog Bed', 'Cat Tree', 'Leash', 'Pet Bowl', 'Chew Toy', 'Grooming Brush']),
+    ('Office', 30, ['Desk Lamp', 'Desk Organizer', 'Office Chair Cushion', 'Pen Set', 'Whiteboard',
+                    'Monitor Riser']),
+    ('Grocery', 8, ['Green Tea', 'Coffee Beans', 'Olive Oil', 'Honey', 'Granola', 'Dark Chocolate']),
+]
+CATEGORY_WEIGHTS = [1 / (rank + 1) ** 1.1 for rank in range(len(CATALOG))]
+
+BRANDS = ['Acme', 'Northwind', 'Lumina', 'Everpeak', 'Solace', 'Brightline', 'Kestrel', 'Orbit',
+          'Tidewater', 'Maple & Co', 'Vantage', 'Nimbus', 'Harbor', 'Fable', 'Quartz']
+ADJECTIVES = ['Wireless', 'Organic', 'Portable', 'Premium', 'Compact', 'Ergonomic', 'Classic',
+              'Lightweight', 'Durable', 'Eco-Friendly', 'Smart', 'Vintage', 'Waterproof', 'Foldable']
+MATERIALS = ['cotton', 'bamboo', 'stainless steel', 'leather', 'recycled plastic', 'ceramic',
+             'aluminium', 'oak', 'silicone', 'linen']
+FEATURES = ['noise cancellation', 'all-day battery life', 'a lifetime warranty', 'fast charging',
+            'machine-washable fabric', 'a non-slip base', 'dishwasher-safe parts', 'a travel case',
+            'adjustable straps', 'a minimalist design', 'reinforced stitching', 'quiet operation']
+USES = ['everyday use', 'travel', 'the office', 'outdoor adventures', 'small apartments', 'gifting',
+        'home workouts', 'busy mornings', 'weekend trips']
+
+FIRST_NAMES = ['james', 'mary', 'ali', 'fatima', 'wei', 'sofia', 'liam', 'olivia', 'noah', 'emma',
+               'rahim', 'nadia', 'lucas', 'mia', 'arjun', 'chloe', 'omar', 'zara', 'leo', 'ava']
+LAST_NAMES = ['smith', 'khan', 'garcia', 'chen', 'rahman', 'muller', 'rossi', 'silva', 'kim',
+              'hossain', 'brown', 'patel', 'nguyen', 'ahmed', 'lopez', 'martin']
+EMAIL_DOMAINS = [('gmail.com', 50), ('yahoo.com', 12), ('outlook.com', 12), ('hotmail.com', 8),
+                 ('icloud.com', 8), ('proton.me', 3), ('example.org', 7)]
+
+# Signups per hour of day (local time), quiet at night, peaking in the evening
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 9, 8, 7, 7, 8, 9, 10, 11, 10, 8, 5, 3]
+
+
 def connect_to_mongodb():
     try:
         # Get MongoDB URI from environment variables - using MONGO_URI instead of MONGODB_URI
         MONGO_URI = os.getenv('MONGO_URI')
-        
+
         print(f"🔍 Debug: MONGO_URI = {MONGO_URI}")
-        
+
         if not MONGO_URI:
             raise ValueError("❌ MONGO_URI not found in environment variables")
-        
+
         print("🔗 Connecting to MongoDB...")
         client = pymongo.MongoClient(MONGO_URI)
-        
+
         # Test the connection
         client.admin.command('ping')
         print("✅ MongoDB connection successful!")
-        
+
         return client
-    
+
     except pymongo.errors.OperationFailure as e:
         print(f"❌ Authentication failed: {e}")
         print("💡 Please check your MongoDB username and password")
@@ -32,81 +100,167 @@ def connect_to_mongodb():
         print(f"❌ Connection failed: {e}")
         return None
 
-def seed_data():
+def generated_id(collection, seed, index):
+    """Deterministic ObjectId for the index-th generated document"""
+    return ObjectId(struct.pack('>IBHBI', ID_EPOCH + index, ID_KINDS[collection],
+                                seed & 0xFFFF, 0, index & 0xFFFFFFFF))
+
+def _rng(collection, seed, index):
+    # One RNG state per document keeps output independent of batch size and workers
+    return random.Random(seed * 1_000_003 + ID_KINDS[collection] * 7_919 + index)
+
+def generate_product(seed, index):
+    """One product shaped like Product.create's documents"""
+    rng = _rng('products', seed, index)
+    category, median_price, nouns = rng.choices(CATALOG, weights=CATEGORY_WEIGHTS)[0]
+    noun = rng.choice(nouns)
+    adjective = rng.choice(ADJECTIVES)
+    brand = rng.choice(BRANDS)
+    material = rng.choice(MATERIALS)
+    features = rng.sample(FEATURES, 2)
+
+    # Log-normal prices around the category median, ending in .99
+    price = max(0.99, math.floor(median_price * rng.lognormvariate(0, 0.6)) + 0.99)
+    rating = round(min(5.0, max(1.0, rng.gauss(4.1, 0.6))), 1)
+    stock = 0 if rng.random() < 0.08 else int(rng.expovariate(1 / 60)) + 1
+    return {
+        '_id': generated_id('products', seed, index),
+        'name': f"{brand} {adjective} {noun} {rng.choice(['', 'Pro', 'Mini', 'Plus', 'Max', 'Lite'])}".strip(),
+        'description': (
+            f"{adjective} {noun.lower()} made from {material} with {features[0]} and {features[1]}. "
+            f"Designed by {brand} for {rng.choice(USES)}."
+        ),
+        'price': round(price, 2),
+        'category': category,
+        'image_url': f"/images/{category.lower().replace(' & ', '-').replace(' ', '-')}/{index % 500}.jpg",
+        'featured': rng.random() < 0.02,
+        'stock': stock,
+        'rating': float(rating),
+    }
+
+def generate_subscriber(seed, index, days=730, growth=3.0, now=None):
+    """One subscriber; signups grow exponentially towards now with a daily rhythm"""
+    rng = _rng('subscribers', seed, index)
+    now = now or datetime(2025, 1, 1)
+
+    # Inverse CDF of an exponential growth curve over the window, so recent
+    # days get more signups than the start of the window
+    u = rng.random()
+    position = math.log1p(u * math.expm1(growth)) / growth
+    day = (now - timedelta(days=days) + timedelta(days=position * days)).date()
+    if day.weekday() >= 5 and rng.random() < 0.3:
+        day -= timedelta(days=day.weekday() - 4)  # weekends are quieter
+    hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+    subscribed_at = datetime(day.year, day.month, day.day, hour,
+                             rng.randrange(60), rng.randrange(60), rng.randrange(1000) * 1000)
+
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    domain = rng.choices([d for d, _ in EMAIL_DOMAINS], weights=[w for _, w in EMAIL_DOMAINS])[0]
+    return {
+        '_id': generated_id('subscribers', seed, index),
+        'email': f"{first}.{last}{index}@{domain}",
+        'subscribed_at': min(subscribed_at, now),
+        'is_active': rng.random() >= 0.08,
+    }
+
+GENERATORS = {'products': generate_product, 'subscribers': generate_subscriber}
+
+def write_batch(db, collection, seed, start, end):
+    """Insert documents start..end-1 unless they are already there.
+
+    Returns the number of documents written by this call.
+    """
+    # The exact ids, not an _id range: ids from another seed or kind can sort inside it
+    ids = [generated_id(collection, seed, i) for i in range(start, end)]
+    if db[collection].count_documents({'_id': {'$in': ids}}) == end - start:
+        return 0
+
+    generate = GENERATORS[collection]
+    docs = [generate(seed, i) for i in range(start, end)]
+    try:
+        return len(db[collection].insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # A partial batch from an interrupted run: keep going past its rows
+        if any(err['code'] != DUPLICATE_KEY for err in e.details['writeErrors']):
+            raise
+        return e.details['nInserted']
+
+_worker_db = None
+
+def _init_worker(uri):
+    # Each process needs its own client; MongoClient is not fork-safe
+    global _worker_db
+    _worker_db = pymongo.MongoClient(uri).get_default_database('ecommerce')
+
+def _write_batch(task):
+    return write_batch(_worker_db, *task)
+
+def seed_collection(collection, count, db=None, uri=None, seed=42, batch_size=5000, workers=1):
+    """Generate count documents into collection, resuming a previous run.
+
+    With workers > 1 batches are written from a process pool connected to
+    uri; otherwise they go through db in this process.
+    """
+    tasks = [(collection, seed, start, min(start + batch_size, count))
+             for start in range(0, count, batch_size)]
+    started = time.perf_counter()
+    written = 0
+
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(uri,)) as pool:
+            for done, n in enumerate(pool.imap_unordered(_write_batch, tasks), 1):
+                written += n
+                if done % 20 == 0 or done == len(tasks):
+                    print(f"  {collection}: {done}/{len(tasks)} batches, {written} new documents")
+    else:
+        for task in tasks:
+            written += write_batch(db, *task)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {collection}: {written} new of {count} documents in {elapsed:.1f}s")
+    return written
+
+def seed_data(products=1000, subscribers=0, seed=42, batch_size=5000, workers=None, reset=False):
     # Connect to MongoDB
     client = connect_to_mongodb()
-    
+
     if not client:
         print("🚫 Cannot proceed without database connection")
         return
-    
+
     try:
         # Get database
-        db = client.ecommerce
-        
-        # Clear existing data
-        print("🗑️ Clearing existing products...")
-        db.products.delete_many({})
-        
-        # Sample products data
-        products = [
-            {
-                "name": "Wireless Bluetooth Headphones",
-                "price": 99.99,
-                "category": "Electronics",
-                "image": "/images/headphones.jpg",
-                "description": "High-quality wireless headphones with noise cancellation",
-                "stock": 50,
-                "rating": 4.5
-            },
-            {
-                "name": "Smart Fitness Watch",
-                "price": 199.99,
-                "category": "Electronics", 
-                "image": "/images/smartwatch.jpg",
-                "description": "Track your fitness and stay connected",
-                "stock": 30,
-                "rating": 4.3
-            },
-            {
-                "name": "Organic Cotton T-Shirt",
-                "price": 29.99,
-                "category": "Clothing",
-                "image": "/images/tshirt.jpg", 
-                "description": "Comfortable and sustainable cotton t-shirt",
-                "stock": 100,
-                "rating": 4.7
-            },
-            {
-                "name": "Laptop Backpack",
-                "price": 49.99,
-                "category": "Accessories",
-                "image": "/images/backpack.jpg",
-                "description": "Durable backpack with laptop compartment",
-                "stock": 75,
-                "rating": 4.6
-            },
-            {
-                "name": "Coffee Maker",
-                "price": 79.99,
-                "category": "Home & Kitchen",
-                "image": "/images/coffeemaker.jpg",
-                "description": "Programmable coffee maker with thermal carafe",
-                "stock": 25,
-                "rating": 4.4
-            }
-        ]
-        
-        # Insert products
-        print("📦 Inserting products...")
-        result = db.products.insert_many(products)
-        print(f"✅ Successfully inserted {len(result.inserted_ids)} products")
-        
-        # Display inserted products
-        print("\n📋 Inserted Products:")
-        for product in db.products.find():
-            print(f"  - {product['name']} (${product['price']})")
-            
+        db = client.get_default_database('ecommerce')
+
+        if reset:
+            print("🗑️ Dropping existing products and subscribers...")
+            db.products.drop()
+            db.subscribers.drop()
+
+        # Indexes first, so resume checks and the unique email index apply
+        ensure_collections(db)
+        ensure_indexes(db)
+
+        workers = workers or os.cpu_count() or 1
+        uri = os.getenv('MONGO_URI')
+        print(f"📦 Generating {products} products and {subscribers} subscribers "
+              f"(seed {seed}, {workers} workers)...")
+        if products:
+            seed_collection('products', products, db, uri, seed, batch_size, workers)
+        if subscribers:
+            seed_collection('subscribers', subscribers, db, uri, seed, batch_size, workers)
+        if products:
+            # Seeding writes products directly, so recount the category summary
+            from app.models.category_stats import CategoryStats
+            print(f"📊 Corrected category_stats for {CategoryStats.rebuild(db)} categories")
+            # Running APIs on this host would serve the old listings until then
+            from app.utils.notify import notify_api
+            notify_api(db)
+        if subscribers:
+            # Likewise for the subscriber growth buckets
+            from app.models.subscriber_growth import SubscriberGrowth
+            print(f"📈 Corrected {SubscriberGrowth.rebuild(db)} subscriber_growth buckets")
+
     except Exception as e:
         print(f"❌ Error during seeding: {e}")
     finally:
@@ -114,4 +268,12 @@ def seed_data():
         print("🔌 Database connection closed")
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic catalog")
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--subscribers', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=42, help="same seed, same documents")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, help="processes (default: CPU count)")
+    parser.add_argument('--reset', action='store_true', help="drop products and subscribers first")
+    args = parser.parse_args()
+    seed_data(args.products, args.subscribers, args.seed, args.batch_size, args.workers, args.reset)
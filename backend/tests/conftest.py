@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import app, config and validators the way the entry points do, from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
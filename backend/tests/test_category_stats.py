@@ -0,0 +1,29 @@
+import pytest
+
+from app.models.category_stats import CategoryStats
+from app.models.product import Product
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def facet(db, category):
+    return next(f for f in CategoryStats.to_facets(CategoryStats.get_all(db)) if f['category'] == category)
+
+
+def test_price_range_recovers_after_category_empties(db):
+    Product.bulk_upsert(db, [{'sku': 'a', 'name': 'Lamp', 'category': 'home', 'price': 40.0}])
+    Product.bulk_upsert(db, [{'sku': 'a', 'name': 'Lamp', 'category': 'garden', 'price': 40.0}])
+    stored = db.category_stats.find_one({'_id': 'home'})
+    assert stored['count'] == 0
+    assert 'min_price' not in stored and 'max_price' not in stored
+
+    Product.bulk_upsert(db, [{'sku': 'b', 'name': 'Rug', 'category': 'home', 'price': 25.0}])
+    assert facet(db, 'home') == {
+        'category': 'home', 'count': 1, 'featured_count': 0, 'in_stock_count': 0,
+        'min_price': 25.0, 'max_price': 25.0,
+    }
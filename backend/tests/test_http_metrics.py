@@ -0,0 +1,31 @@
+import json
+import os
+
+from app.utils.http_metrics import ARCHIVE, MetricsExporter, RequestMetrics
+
+
+def worker_state(requests, in_flight=0):
+    metrics = RequestMetrics()
+    for _ in range(requests):
+        metrics.observe('/api/products', 'GET', 200, 3.0)
+    metrics.in_flight = in_flight
+    return metrics.state()
+
+
+def test_exited_workers_keep_their_counts(tmp_path):
+    exporter = MetricsExporter(str(tmp_path))
+    # pid 1 is always alive; pids this high are not
+    for pid, requests in ((1, 2), (4194301, 3), (4194302, 4)):
+        with open(MetricsExporter.path(str(tmp_path), pid), 'w') as f:
+            json.dump(worker_state(requests, in_flight=1), f)
+
+    merged = exporter.collect()
+    assert merged['http'][('/api/products', 'GET', '200')].count == 9
+    assert merged['in_flight'] == 1
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.json')) == ['1.json', ARCHIVE]
+
+    # A scrape after the archive was written counts the dead workers once
+    MetricsExporter.archive(str(tmp_path), [1])
+    merged = exporter.collect()
+    assert merged['http'][('/api/products', 'GET', '200')].count == 9
+    assert merged['in_flight'] == 0
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.shared_cache import CacheServer, SharedCacheClient, ensure_server
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    servers = []
+
+    def start(max_bytes=64 * 1024):
+        server = CacheServer(str(tmp_path / f'cache-{len(servers)}.sock'), max_bytes).start()
+        servers.append(server)
+        return server, SharedCacheClient(server.server_address, lease_seconds=5.0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_misses_compute_once(start_server):
+    server, client = start_server()
+    threads = 8
+    barrier = threading.Barrier(threads)
+    computed = []
+    results = []
+
+    def compute():
+        computed.append(1)
+        time.sleep(0.2)  # long enough for every other thread to queue on the lease
+        return b'page'
+
+    def worker():
+        barrier.wait()
+        results.append(client.fetch('catalog', 'GET /api/products', compute, ttl=60))
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    assert len(computed) == 1
+    assert sorted(results) == [(b'page', False)] + [(b'page', True)] * (threads - 1)
+    stats = server.store.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == threads - 1
+    assert stats['collapsed'] == threads - 1
+
+
+def test_evicts_least_recently_used_under_byte_limit(start_server):
+    server, client = start_server(max_bytes=100)
+    for key in ('a', 'b', 'c'):
+        client.fetch('catalog', key, lambda: b'x' * 40, ttl=60)
+
+    stats = server.store.stats()
+    assert stats['bytes'] <= 100
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+    # 'a' was the oldest entry, so it is the one computed again
+    assert client.fetch('catalog', 'a', lambda: b'y' * 40, ttl=60) == (b'y' * 40, False)
+    assert client.fetch('catalog', 'c', lambda: b'z', ttl=60) == (b'x' * 40, True)
+
+
+def test_stats_counters(start_server):
+    server, client = start_server(max_bytes=100)
+    client.fetch('catalog', 'page', lambda: b'body', ttl=60)
+    client.fetch('catalog', 'page', lambda: b'body', ttl=60)
+    client.fetch('catalog', 'short', lambda: b'body', ttl=0.05)
+    time.sleep(0.1)
+    client.fetch('catalog', 'short', lambda: b'body', ttl=60)
+    client.fetch('catalog', 'huge', lambda: b'x' * 200, ttl=60)
+    client.bump('catalog')
+    assert client.fetch('catalog', 'page', lambda: b'new', ttl=60) == (b'new', False)
+
+    stats = client.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 5
+    assert stats['expirations'] == 1
+    assert stats['rejected'] == 1
+    assert stats['versions'] == {'catalog': 1}
+    assert stats['client_errors'] == 0
+    assert stats['hit_ratio'] == round(1 / 6, 4)
+
+
+def test_embedded_client_restarts_a_dead_server(tmp_path):
+    path = str(tmp_path / 'cache.sock')
+    first = ensure_server(path, 64 * 1024)
+    client = SharedCacheClient(path, lease_seconds=5.0, embed_max_bytes=64 * 1024)
+    assert client.fetch('catalog', 'page', lambda: b'old', ttl=60) == (b'old', False)
+
+    # The hosting worker exits, leaving its socket file behind; another
+    # worker's client is the next to connect
+    first.shutdown()
+    first.server_close()
+    client = SharedCacheClient(path, lease_seconds=5.0, embed_max_bytes=64 * 1024)
+    assert client.fetch('catalog', 'page', lambda: b'new', ttl=60) == (b'new', False)
+    assert client.fetch('catalog', 'page', lambda: b'other', ttl=60) == (b'new', True)
+    assert client.stats()['client_restarts'] == 1
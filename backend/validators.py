@@ -1,35 +1,225 @@
+import math
 import re
-from datetime import datetime
+
+# Compiled once; re.match with a pattern string pays a cache lookup per call
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+UNSAFE_CHARS = re.compile(r'[<>]')
+
+# Default for fields with no default: they are left out of the document
+MISSING = object()
+
+# Strings accepted for boolean fields (CSV uploads)
+BOOLEAN_STRINGS = {'true': True, 'false': False}
+
+
+def text(required=False, default=MISSING, min_length=0, max_length=None, email=False):
+    """String field, stripped; email=True also lowercases and checks the format"""
+    return {'kind': 'text', 'required': required, 'default': default,
+            'min_length': min_length, 'max_length': max_length, 'email': email}
+
+
+def number(required=False, default=MISSING, minimum=None, maximum=None, exclusive_minimum=False,
+           integer=False):
+    """Float (or int) field; numeric strings are coerced, booleans are not numbers"""
+    return {'kind': 'integer' if integer else 'number', 'required': required, 'default': default,
+            'minimum': minimum, 'maximum': maximum, 'exclusive_minimum': exclusive_minimum}
+
+
+def boolean(required=False, default=MISSING):
+    """true/false, also as the strings 'true'/'false' (CSV uploads)"""
+    return {'kind': 'boolean', 'required': required, 'default': default}
+
+
+def _range_check(spec):
+    """Function returning the range error for a number, or None"""
+    minimum, maximum = spec['minimum'], spec['maximum']
+    exclusive = spec['exclusive_minimum']
+    low = f"must be {'greater than' if exclusive else 'at least'} {minimum}"
+    high = f"must be at most {maximum}"
+
+    def check(value):
+        if minimum is not None and (value <= minimum if exclusive else value < minimum):
+            return low
+        if maximum is not None and value > maximum:
+            return high
+        return None
+    return check
+
+
+def _text_check(spec):
+    email, min_length, max_length = spec['email'], spec['min_length'], spec['max_length']
+    short = "must not be empty" if min_length == 1 else f"must be at least {min_length} characters"
+    long = f"must be at most {max_length} characters"
+
+    def check(value):
+        if not isinstance(value, str):
+            return None, "must be a string"
+        value = value.strip()
+        if email:
+            value = value.lower()
+            if EMAIL_PATTERN.match(value) is None:
+                return None, "must be a valid email address"
+        if len(value) < min_length:
+            return None, short
+        if max_length is not None and len(value) > max_length:
+            return None, long
+        return value, None
+    return check
+
+
+def _number_check(spec):
+    out_of_range = _range_check(spec)
+
+    def check(value):
+        if value.__class__ is bool:
+            return None, "must be a number"
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None, "must be a number"
+        if not math.isfinite(value):
+            return None, "must be a number"
+        return value, out_of_range(value)
+    return check
+
+
+def _integer_check(spec):
+    out_of_range = _range_check(spec)
+
+    def check(value):
+        if value.__class__ is bool or (value.__class__ is float and not value.is_integer()):
+            return None, "must be an integer"
+        try:
+            value = int(value)
+        except (TypeError, ValueError, OverflowError):
+            return None, "must be an integer"
+        return value, out_of_range(value)
+    return check
+
+
+def _boolean_check(spec):
+    def check(value):
+        if value is True or value is False:
+            return value, None
+        if value.__class__ is str and value.strip().lower() in BOOLEAN_STRINGS:
+            return BOOLEAN_STRINGS[value.strip().lower()], None
+        return None, "must be true or false"
+    return check
+
+
+# Builds the check for a field spec: check(value) -> (normalized value, error or None)
+CHECKS = {'text': _text_check, 'number': _number_check, 'integer': _integer_check,
+          'boolean': _boolean_check}
+
+
+def compile_schema(fields):
+    """Compile {name: field} into validate(record) -> (document, errors).
+
+    Each field's options are bound into a check function once, so
+    validating a record is one loop over ready-made checks. document holds
+    only the schema's fields, normalized and with defaults filled in;
+    errors maps field names to messages and is None when the record is
+    valid (document is then None instead).
+    """
+    checks = [(name, spec['required'], spec['default'], CHECKS[spec['kind']](spec))
+              for name, spec in fields.items()]
+
+    def validate(record):
+        if not isinstance(record, dict):
+            return None, {'record': 'must be a JSON object'}
+        document = {}
+        errors = None
+        get = record.get
+        for name, required, default, check in checks:
+            value = get(name)
+            if value is None:
+                if required:
+                    errors = errors or {}
+                    errors[name] = "is required"
+                elif default is not MISSING:
+                    document[name] = default
+                continue
+            value, error = check(value)
+            if error is None:
+                document[name] = value
+            else:
+                errors = errors or {}
+                errors[name] = error
+        return (None, errors) if errors else (document, None)
+    return validate
+
+
+def validate_batch(validate, records):
+    """Validate records with a compiled schema.
+
+    Returns (valid, invalid): lists of (index, document) and (index, errors)
+    in input order.
+    """
+    valid = []
+    invalid = []
+    for index, record in enumerate(records):
+        document, errors = validate(record)
+        if errors is None:
+            valid.append((index, document))
+        else:
+            invalid.append((index, errors))
+    return valid, invalid
+
+
+def describe(errors):
+    """One-line message for an errors mapping, e.g. 'price must be a number'"""
+    return '; '.join(f"{name} {message}" for name, message in errors.items())
+
+
+PRODUCT_FIELDS = {
+    'name': text(required=True, min_length=2, max_length=200),
+    'description': text(default='', max_length=5000),
+    'price': number(required=True, minimum=0, exclusive_minimum=True),
+    'category': text(required=True, min_length=1, max_length=100),
+    'image_url': text(default='', max_length=2000),
+    'featured': boolean(default=False),
+    'stock': number(default=0, minimum=0, integer=True),
+    'rating': number(default=0.0, minimum=0, maximum=5),
+}
+
+PRODUCT_SCHEMA = compile_schema(PRODUCT_FIELDS)
+
+# Supplier feed rows carry a stable SKU that imports upsert by
+PRODUCT_IMPORT_SCHEMA = compile_schema({'sku': text(required=True, min_length=1, max_length=64), **PRODUCT_FIELDS})
+
+SUBSCRIBER_SCHEMA = compile_schema({
+    'email': text(required=True, max_length=254, email=True),
+})
+
+def normalize_email(email):
+    """Stripped, lowercased email, or None if it is not a valid address"""
+    subscriber, _ = SUBSCRIBER_SCHEMA({'email': email})
+    return subscriber and subscriber['email']
+
 
 def validate_email(email):
     """Validate email format"""
-    if not email or not isinstance(email, str):
-        return False
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email.strip().lower()) is not None
+    return normalize_email(email) is not None
+
+
+# The checks validate_product_data has always applied: a name, a description
+# of at least 10 characters and a positive price
+PRODUCT_DATA_SCHEMA = compile_schema({
+    'name': text(required=True, min_length=2),
+    'description': text(required=True, min_length=10),
+    'price': number(required=True, minimum=0, exclusive_minimum=True),
+})
+
 
 def validate_product_data(data):
     """Validate product data"""
-    errors = []
-    
-    if not data.get('name') or len(data['name']) < 2:
-        errors.append("Product name must be at least 2 characters")
-    
-    if not data.get('description') or len(data['description']) < 10:
-        errors.append("Description must be at least 10 characters")
-    
-    try:
-        price = float(data.get('price', 0))
-        if price <= 0:
-            errors.append("Price must be greater than 0")
-    except (ValueError, TypeError):
-        errors.append("Price must be a valid number")
-    
-    return errors
+    _, errors = PRODUCT_DATA_SCHEMA(data)
+    return [f"{name} {message}" for name, message in (errors or {}).items()]
+
 
 def sanitize_input(text):
     """Basic input sanitization"""
     if not text:
         return ""
     # Remove potentially dangerous characters
-    return re.sub(r'[<>]', '', text).strip()
\ No newline at end of file
+    return UNSAFE_CHARS.sub('', text).strip()
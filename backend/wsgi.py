@@ -1,4 +1,8 @@
-from app import app
+import os
+from app import create_app
+
+# gunicorn wsgi:app reads gunicorn.conf.py from this directory
+app = create_app(os.getenv('FLASK_ENV', 'production'))
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file
@@ -20,6 +20,18 @@ export const getProducts = async (filters = {}) => {
   return response.data;
 };
 
+export const searchProducts = async (q, filters = {}) => {
+  const params = new URLSearchParams({ q, ...filters }).toString();
+  const response = await api.get(`/products/search?${params}`);
+  return response.data;
+};
+
+export const suggestProducts = async (q) => {
+  const params = new URLSearchParams({ q }).toString();
+  const response = await api.get(`/products/suggest?${params}`);
+  return response.data;
+};
+
 export const getCategories = async () => {
   const response = await api.get('/categories');
   return response.data;